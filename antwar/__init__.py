@@ -1 +1 @@
-__all__ = ["controller", "coord", "gamedata", "gamestate", "pheromone", "protocol", "rawio"]
\ No newline at end of file
+__all__ = ["analytics", "arena", "batch", "controller", "coord", "gamedata", "gamestate", "geometry", "pheromone", "profiling", "protocol", "rawio", "replay", "rollout", "tournament", "transposition"]
\ No newline at end of file
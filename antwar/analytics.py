@@ -0,0 +1,389 @@
+"""
+大量回放文件的并行统计。
+
+统计以 :class:`Reducer` 为单位：每个统计逐回合地接收 :class:`.replay.MiniReplayFrame` ，维护自己的部分结果，
+最后合并为一张列式的表（列名到等长列表的映射）。 :func:`analyze` 把回放文件分批交给多个工作进程，
+每个进程流式地读取文件、把回合交给各个统计的副本，主进程再把各批的部分结果合并起来。
+迷你回放文本（ :meth:`.gamestate.GameState.dump_mini_replay` 的输出拼接而成）和 :mod:`.replay` 的二进制回放都可以作为输入。
+
+内置的统计有防御塔类型的使用情况 :class:`TowerUsage` 、按路线统计的蚂蚁结局 :class:`AntSurvival` 、
+信息素热点 :class:`PheromoneHeat` 和金币与血量曲线 :class:`CoinCurve` 。自定义统计只需继承 :class:`Reducer` 。
+统计对象会被传递给工作进程，因此必须可以被 ``pickle`` 。
+
+.. code-block:: python
+
+    result = analyze(glob.glob("replays/*.txt"), [TowerUsage(), CoinCurve()])
+    write_tables(result.tables, "out")
+"""
+import copy
+import csv
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from .coord import Coord, distance, headquarter_coord
+from .gamedata import Ant, TowerType
+from .replay import MAGIC, MiniReplayFrame, ReplayReader, iter_mini_replay_frames
+
+try:
+    import numpy as np
+except ImportError:  # NumPy是可选依赖，仅输出 .npz 时需要
+    np = None
+
+Table = dict[str, list]
+"""列式的表：列名到等长列表的映射"""
+
+
+class Reducer:
+    """
+    逐回合统计的基类。子类至少需要实现 :meth:`add_round` 、 :meth:`merge` 和 :meth:`table` ；
+    需要跨回合跟踪同一局中的对象时，再实现 :meth:`begin_game` 和 :meth:`end_game` 。
+    """
+
+    name: str = ""  #: 统计的名字，也是输出文件名
+
+    def begin_game(self, path: str) -> None:
+        """开始处理一个回放文件"""
+
+    def add_round(self, frame: MiniReplayFrame) -> None:
+        """处理一个回合"""
+        raise NotImplementedError
+
+    def end_game(self) -> None:
+        """一个回放文件处理完毕。文件损坏时也会调用，此时只处理了损坏之前的回合。"""
+
+    def merge(self, other: "Reducer") -> None:
+        """把同类统计 ``other`` 的部分结果合并进来"""
+        raise NotImplementedError
+
+    def table(self) -> Table:
+        """统计结果"""
+        raise NotImplementedError
+
+
+class TowerUsage(Reducer):
+    """各类型防御塔的使用情况：存在的总回合数（每座塔每回合计一次）以及出现过该类型的对局数。"""
+
+    name = "tower_usage"
+
+    def __init__(self):
+        self.tower_rounds: dict[tuple[int, int], int] = {}  #: ``(player, type)`` 到塔·回合数的映射
+        self.games: dict[tuple[int, int], int] = {}  #: ``(player, type)`` 到出现过的对局数的映射
+        self._seen: set[tuple[int, int]] = set()
+
+    def begin_game(self, path: str) -> None:
+        self._seen = set()
+
+    def add_round(self, frame: MiniReplayFrame) -> None:
+        for _, player, _, _, ttype, _ in frame.towers:
+            key = (player, ttype)
+            self.tower_rounds[key] = self.tower_rounds.get(key, 0) + 1
+            self._seen.add(key)
+
+    def end_game(self) -> None:
+        for key in self._seen:
+            self.games[key] = self.games.get(key, 0) + 1
+
+    def merge(self, other: "TowerUsage") -> None:
+        for key, n in other.tower_rounds.items():
+            self.tower_rounds[key] = self.tower_rounds.get(key, 0) + n
+        for key, n in other.games.items():
+            self.games[key] = self.games.get(key, 0) + n
+
+    def table(self) -> Table:
+        keys = sorted(self.tower_rounds)
+        return {
+            "player": [p for p, _ in keys],
+            "type": [TowerType(t).name for _, t in keys],
+            "tower_rounds": [self.tower_rounds[k] for k in keys],
+            "games": [self.games.get(k, 0) for k in keys],
+        }
+
+
+class AntSurvival(Reducer):
+    """
+    按路线统计蚂蚁的结局。路线是蚂蚁出生后经过的前 ``prefix`` 个不同位置，足以区分从大本营出发后选择的方向。
+
+    迷你回放只记录结算后仍然存活的蚂蚁，因此结局是从蚂蚁消失前最后一次出现的状态推断的：年龄已达上限的记为老死；
+    与对方大本营相邻的蚂蚁按对方大本营血量的减少量记为攻入，其余记为阵亡；对局结束时仍然存活的记为存活。
+    回放开始时已经出生的蚂蚁路线不完整，不计入统计。
+    """
+
+    name = "ant_survival"
+
+    def __init__(self, prefix: int = 4):
+        """
+        :param prefix: 路线包含的位置数
+        """
+        self.prefix = prefix
+        self.outcomes: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+        """ ``(player, route)`` 到 ``[reached, killed, too_old, alive]`` 的映射，路线为格点下标的元组"""
+        self._ants: dict[int, tuple[int, list[int], int, int]] = {}
+        self._hp: Optional[tuple[int, int]] = None
+
+    def begin_game(self, path: str) -> None:
+        self._ants = {}
+        self._hp = None
+
+    def _record(self, player: int, route: list[int], outcome: int) -> None:
+        counts = self.outcomes.setdefault((player, tuple(route)), [0, 0, 0, 0])
+        counts[outcome] += 1
+
+    def add_round(self, frame: MiniReplayFrame) -> None:
+        current = {ant[0] for ant in frame.ants}
+        vanished = [id for id in self._ants if id not in current]
+        if vanished:
+            # 每一方攻入的蚂蚁数等于对方大本营血量的减少量
+            reached_quota = [
+                self._hp[1 - p] - frame.hp[1 - p] if self._hp is not None else len(vanished) for p in range(2)
+            ]
+            for id in sorted(vanished):
+                player, route, cell, age = self._ants.pop(id)
+                if age + 1 > Ant.max_age():
+                    outcome = 2
+                elif reached_quota[player] > 0 and distance(
+                        Coord(*divmod(cell, 19)), headquarter_coord(1 - player)) == 1:
+                    reached_quota[player] -= 1
+                    outcome = 0
+                else:
+                    outcome = 1
+                self._record(player, route, outcome)
+
+        for id, player, x, y, _, _, age, _ in frame.ants:
+            cell = x * 19 + y
+            tracked = self._ants.get(id)
+            if tracked is None:
+                if age == 0:
+                    self._ants[id] = (player, [cell], cell, age)
+                continue
+            route = tracked[1]
+            if len(route) < self.prefix and route[-1] != cell:
+                route.append(cell)
+            self._ants[id] = (player, route, cell, age)
+        self._hp = frame.hp
+
+    def end_game(self) -> None:
+        for player, route, _, _ in self._ants.values():
+            self._record(player, route, 3)
+        self._ants = {}
+
+    def merge(self, other: "AntSurvival") -> None:
+        for key, counts in other.outcomes.items():
+            mine = self.outcomes.setdefault(key, [0, 0, 0, 0])
+            for i, n in enumerate(counts):
+                mine[i] += n
+
+    def table(self) -> Table:
+        keys = sorted(self.outcomes)
+        rows = [self.outcomes[k] for k in keys]
+        return {
+            "player": [p for p, _ in keys],
+            "route": [" ".join(f"{c // 19},{c % 19}" for c in route) for _, route in keys],
+            "ants": [sum(r) for r in rows],
+            "reached": [r[0] for r in rows],
+            "killed": [r[1] for r in rows],
+            "too_old": [r[2] for r in rows],
+            "alive": [r[3] for r in rows],
+            "reach_rate": [r[0] / sum(r) for r in rows],
+        }
+
+
+class PheromoneHeat(Reducer):
+    """每个位置上双方信息素的平均值与最大值，按平均值从高到低排列。"""
+
+    name = "pheromone_heat"
+
+    def __init__(self):
+        self.rounds = 0  #: 统计的回合数
+        self.total = array("d", [0.0] * 722)  #: 信息素之和，排列方式与 :attr:`.replay.MiniReplayFrame.pheromone` 相同
+        self.peak = array("d", [float("-inf")] * 722)  #: 信息素最大值
+
+    def add_round(self, frame: MiniReplayFrame) -> None:
+        self.rounds += 1
+        total, peak = self.total, self.peak
+        for i, v in enumerate(frame.pheromone):
+            total[i] += v
+            if v > peak[i]:
+                peak[i] = v
+
+    def merge(self, other: "PheromoneHeat") -> None:
+        self.rounds += other.rounds
+        for i in range(722):
+            self.total[i] += other.total[i]
+            self.peak[i] = max(self.peak[i], other.peak[i])
+
+    def table(self) -> Table:
+        n = max(self.rounds, 1)
+        order = sorted(range(722), key=lambda i: self.total[i], reverse=True)
+        return {
+            "player": [i // 361 for i in order],
+            "x": [i % 361 // 19 for i in order],
+            "y": [i % 19 for i in order],
+            "mean": [self.total[i] / n for i in order],
+            "max": [self.peak[i] for i in order],
+        }
+
+
+class CoinCurve(Reducer):
+    """按回合数统计双方金币与大本营血量的平均值。"""
+
+    name = "coin_curve"
+
+    def __init__(self):
+        self.sums: dict[int, list[int]] = {}
+        """回合数到 ``[games, coin0, coin1, hp0, hp1]`` 之和的映射"""
+
+    def add_round(self, frame: MiniReplayFrame) -> None:
+        s = self.sums.get(frame.round)
+        if s is None:
+            s = self.sums[frame.round] = [0, 0, 0, 0, 0]
+        s[0] += 1
+        s[1] += frame.coin[0]
+        s[2] += frame.coin[1]
+        s[3] += frame.hp[0]
+        s[4] += frame.hp[1]
+
+    def merge(self, other: "CoinCurve") -> None:
+        for round, values in other.sums.items():
+            mine = self.sums.setdefault(round, [0, 0, 0, 0, 0])
+            for i, v in enumerate(values):
+                mine[i] += v
+
+    def table(self) -> Table:
+        rounds = sorted(self.sums)
+        rows = [self.sums[r] for r in rounds]
+        return {
+            "round": rounds,
+            "games": [r[0] for r in rows],
+            "coin0": [r[1] / r[0] for r in rows],
+            "coin1": [r[2] / r[0] for r in rows],
+            "hp0": [r[3] / r[0] for r in rows],
+            "hp1": [r[4] / r[0] for r in rows],
+        }
+
+
+def iter_frames(path: str) -> Iterator[MiniReplayFrame]:
+    """
+    流式读取回放文件中的回合。按文件头判断是 :mod:`.replay` 的二进制回放还是迷你回放文本。
+
+    :param path: 回放文件路径
+    """
+    with open(path, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    if binary:
+        with ReplayReader(path) as reader:
+            for state in reader:
+                yield MiniReplayFrame.from_state(state)
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from iter_mini_replay_frames(f)
+
+
+@dataclass
+class AnalysisResult:
+    """:func:`analyze` 的结果"""
+    tables: dict[str, Table] = field(default_factory=dict)  #: 统计名到结果表的映射
+    files: int = 0  #: 处理的文件数
+    rounds: int = 0  #: 处理的回合数
+    errors: list[tuple[str, str]] = field(default_factory=list)
+    """
+    损坏的文件及错误信息。这些文件在损坏之前的回合仍然计入统计。
+    工作进程出错（例如崩溃）时，同一任务中的全部文件都会记入这里，它们都不计入统计。
+    """
+
+
+def _analyze(paths: list[str], reducers: list[Reducer]) -> tuple[list[Reducer], int, list[tuple[str, str]]]:
+    reducers = copy.deepcopy(reducers)
+    rounds = 0
+    errors = []
+    for path in paths:
+        for r in reducers:
+            r.begin_game(path)
+        try:
+            for frame in iter_frames(path):
+                rounds += 1
+                for r in reducers:
+                    r.add_round(frame)
+        except (OSError, ValueError, struct.error) as e:
+            errors.append((path, str(e)))
+        for r in reducers:
+            r.end_game()
+    return reducers, rounds, errors
+
+
+def analyze(
+        paths: Iterable[str],
+        reducers: list[Reducer],
+        max_workers: Optional[int] = None,
+        chunk_size: int = 16,
+) -> AnalysisResult:
+    """
+    对一批回放文件进行统计。
+
+    :param paths: 回放文件路径
+    :param reducers: 统计对象，作为原型使用，本身不会被修改
+    :param max_workers: 工作进程数量，默认为CPU核数。为0时在当前进程中串行进行，便于调试。
+    :param chunk_size: 每个任务处理的文件数
+    :return: 统计结果
+    """
+    paths = list(paths)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    merged = copy.deepcopy(reducers)
+    result = AnalysisResult(files=len(paths))
+
+    def collect(partial: list[Reducer], rounds: int, errors: list[tuple[str, str]]) -> None:
+        for mine, theirs in zip(merged, partial):
+            mine.merge(theirs)
+        result.rounds += rounds
+        result.errors += errors
+
+    if max_workers == 0:
+        for chunk in chunks:
+            collect(*_analyze(chunk, reducers))
+    else:
+        with ProcessPoolExecutor(max_workers) as pool:
+            futures = [pool.submit(_analyze, chunk, reducers) for chunk in chunks]
+            # 按提交顺序合并，使结果与进程数和完成顺序无关
+            for chunk, future in zip(chunks, futures):
+                try:
+                    partial = future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    result.errors += [(path, f"worker failed: {e!r}") for path in chunk]
+                    continue
+                collect(*partial)
+    result.tables = {r.name: r.table() for r in merged}
+    return result
+
+
+def write_table(table: Table, path: str) -> None:
+    """
+    写入一张表。扩展名为 ``.npz`` 时每列保存为一个NumPy数组（需要NumPy），否则写入CSV。
+
+    :param table: 表
+    :param path: 文件路径
+    """
+    if path.endswith(".npz"):
+        if np is None:
+            raise ImportError("writing .npz tables requires numpy")
+        np.savez(path, **{name: np.asarray(column) for name, column in table.items()})
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.keys())
+        writer.writerows(zip(*table.values()))
+
+
+def write_tables(tables: dict[str, Table], directory: str, format: str = "csv") -> None:
+    """
+    把 :attr:`AnalysisResult.tables` 中的每张表写入 ``directory/<name>.<format>`` 。
+
+    :param tables: 统计名到表的映射
+    :param directory: 输出目录，不存在时会被创建
+    :param format: ``"csv"`` 或 ``"npz"``
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, table in tables.items():
+        write_table(table, os.path.join(directory, f"{name}.{format}"))
@@ -0,0 +1,120 @@
+"""
+进程内的本地对战平台。
+
+:func:`play_match` 在同一个进程中让两个决策函数对战，不需要评测机，也不需要子进程和管道。行动顺序与
+:func:`.controller.run_antwar_ai` 完全相同：每回合先手先行动，后手能看到先手本回合的操作，然后结算。
+对局以一个权威的 :class:`.gamestate.GameState` 为准，每个决策函数拿到的是它的完全独立的副本
+（参见 :meth:`.gamestate.GameState.fork` 的 ``isolated`` 参数），因此无法通过修改局面作弊；
+返回的操作与真实的控制器一样，只执行第一个无效操作之前的部分。返回的不是操作列表等导致执行出错时，按决策函数抛出异常处理。
+
+.. note::
+    胜负只按照大本营血量判断：某一方血量降到0时对局立即结束，达到回合上限时血量高者获胜，血量相同记为平局。
+    游戏规则中更细的平局判定没有在这里实现。
+"""
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .gamestate import GameState
+from .pheromone import Pheromone
+from .protocol import Operation
+
+AiFunc = Callable[[int, GameState], list[Operation]]
+"""决策函数，与 :func:`.controller.run_antwar_ai` 的参数相同"""
+
+MAX_ROUND = 512  #: 默认的回合上限
+
+
+@dataclass
+class MatchResult:
+    """一局对战的结果"""
+    seed: int  #: 初始化信息素所用的随机种子
+    winner: Optional[int] = None  #: 获胜方的位置，平局为 ``None``
+    reason: str = ""  #: 对局结束的原因： ``"hp"`` 、 ``"max_round"`` 或 ``"error"``
+    rounds: int = 0  #: 进行的回合数
+    hp: list[int] = field(default_factory=list)  #: 结束时双方大本营血量
+    coin: list[int] = field(default_factory=list)  #: 结束时双方金币
+    errors: list[Optional[str]] = field(default_factory=lambda: [None, None])
+    """双方决策函数抛出的异常信息，没有异常为 ``None`` 。抛出异常的一方判负。"""
+    rejected: list[int] = field(default_factory=lambda: [0, 0])  #: 双方因为无效而未执行的操作总数
+    operations: list[tuple[list[Operation], list[Operation]]] = field(default_factory=list)
+    """每回合双方实际执行的操作列表"""
+    timings: list[tuple[float, float]] = field(default_factory=list)  #: 每回合双方决策函数的耗时（秒）
+    replays: Optional[list[str]] = None
+    """每回合结算后的迷你回放，参见 :meth:`.gamestate.GameState.dump_mini_replay` 。仅在 ``record_replay`` 为真时记录。"""
+
+    def total_time(self, seat: int) -> float:
+        """某一方决策函数的总耗时"""
+        return sum(t[seat] for t in self.timings)
+
+    def max_time(self, seat: int) -> float:
+        """某一方决策函数单回合的最大耗时"""
+        return max((t[seat] for t in self.timings), default=0.0)
+
+
+def _apply_valid_prefix(state: GameState, seat: int, ops: list[Operation]) -> list[Operation]:
+    # 与 GameController.try_apply_our_ops 一致：遇到第一个无效操作就停止
+    return ops[:state.apply_operations(seat, ops, atomic=False).applied]
+
+
+def play_match(
+        ai0: AiFunc,
+        ai1: AiFunc,
+        seed: int,
+        max_round: int = MAX_ROUND,
+        record_replay: bool = False,
+        pheromone_type: type[Pheromone] = Pheromone,
+) -> MatchResult:
+    """
+    进行一局对战。
+
+    :param ai0: 先手的决策函数
+    :param ai1: 后手的决策函数
+    :param seed: 初始化信息素所用的随机种子
+    :param max_round: 回合上限
+    :param record_replay: 是否记录每回合的迷你回放
+    :param pheromone_type: 信息素的实现，参见 :meth:`.gamestate.GameState.init_with_seed`
+    :return: 对战结果
+    """
+    state = GameState()
+    state.init_with_seed(seed, pheromone_type)
+    ais = (ai0, ai1)
+    result = MatchResult(seed, replays=[] if record_replay else None)
+
+    while state.round < max_round:
+        applied: list[list[Operation]] = [[], []]
+        spent = [0.0, 0.0]
+        for seat in range(2):
+            start = time.perf_counter()
+            try:
+                # 决策函数可以返回任意可迭代对象（如生成器），迭代过程同样计入耗时，出错时按决策函数出错处理
+                ops = list(ais[seat](seat, state.fork(isolated=True)))
+                spent[seat] = time.perf_counter() - start
+                applied[seat] = _apply_valid_prefix(state, seat, ops)
+            except Exception:  # pylint: disable=broad-except
+                spent[seat] = time.perf_counter() - start
+                result.errors[seat] = traceback.format_exc()
+                result.winner, result.reason = 1 - seat, "error"
+                break
+            result.rejected[seat] += len(ops) - len(applied[seat])
+        result.operations.append((applied[0], applied[1]))
+        result.timings.append((spent[0], spent[1]))
+        if result.reason == "error":
+            break
+
+        state.simulate_next_round()
+        if record_replay:
+            result.replays.append(state.dump_mini_replay())
+        if state.hp[0] <= 0 or state.hp[1] <= 0:
+            result.reason = "hp"
+            break
+    else:
+        result.reason = "max_round"
+
+    if result.reason != "error" and state.hp[0] != state.hp[1]:
+        result.winner = 0 if state.hp[0] > state.hp[1] else 1
+    result.rounds = state.round
+    result.hp = state.hp[:]
+    result.coin = state.coin[:]
+    return result
@@ -0,0 +1,709 @@
+"""
+批量对局模拟引擎。
+
+:class:`BatchGameState` 以“数组结构”的形式同时保存N局独立的游戏：信息素是形状为 ``(N, 2, 19, 19)`` 的数组，
+蚂蚁、防御塔与超级武器都是按ID顺序排列、末尾补齐的定长数组。:meth:`BatchGameState.simulate_next_round`
+严格按照 :meth:`.gamestate.GameState.simulate_next_round` 文档中的结算顺序，对所有对局同时进行向量化的计算，
+结果与逐局调用 :class:`.gamestate.GameState` 完全一致（包括信息素的浮点数值）。
+
+本模块需要安装NumPy。
+"""
+# pylint: disable=too-many-instance-attributes, too-many-locals, too-many-statements
+from typing import Optional
+
+import numpy as np
+
+from .coord import Coord, headquarter_coord, is_player_highland
+from .gamedata import (
+    Ant,
+    AntState,
+    SuperWeapon,
+    SuperWeaponType,
+    Tower,
+    TowerType,
+    can_tower_upgrade_to,
+)
+from .gamestate import GameState
+from .geometry import (
+    CELL_COUNT,
+    GRID_SIZE,
+    ant_can_go_mask,
+    axial_distance,
+    distance_table,
+    in_map_mask,
+    neighbor_table,
+    terrain,
+)
+from .pheromone import Pheromone
+from .protocol import Operation, OperationType
+
+_DIST = np.array(distance_table, dtype=np.int64).reshape(CELL_COUNT, CELL_COUNT)
+_NEIGHBOR = np.array(neighbor_table, dtype=np.int64).reshape(CELL_COUNT, 6)
+_NEIGHBOR_IN_MAP = (_NEIGHBOR >= 0) & np.array(in_map_mask)[np.maximum(_NEIGHBOR, 0)]
+_NEIGHBOR_WALKABLE = (_NEIGHBOR >= 0) & np.array(ant_can_go_mask)[np.maximum(_NEIGHBOR, 0)]
+_NEIGHBOR_SAFE = np.maximum(_NEIGHBOR, 0)
+_HQ_CELL = np.array([headquarter_coord(p).x * GRID_SIZE + headquarter_coord(p).y for p in range(2)])
+
+
+def _build_eta() -> np.ndarray:
+    # _ETA[cell, player, direction] 即 Pheromone.multiplier_of_neighbors 对蚂蚁归属玩家的结果
+    eta = np.ones((CELL_COUNT, 2, 6), dtype=np.float64)
+    for cell in range(CELL_COUNT):
+        for player in range(2):
+            target = _HQ_CELL[1 - player]
+            for direction in range(6):
+                nb = neighbor_table[cell * 6 + direction]
+                if nb >= 0:
+                    delta = _DIST[nb, target] - _DIST[cell, target]
+                    eta[cell, player, direction] = [1.25, 1.00, 0.75][delta + 1]
+    return eta
+
+
+_ETA = _build_eta()
+
+
+def _tower_table(attr: str) -> np.ndarray:
+    table = np.zeros(max(TowerType) + 1, dtype=np.int64)
+    for ttype in TowerType:
+        table[ttype.value] = getattr(Tower.config_of_type(ttype), attr)
+    return table
+
+
+_TOWER_DAMAGE = _tower_table("damage")
+_TOWER_INTERVAL = _tower_table("interval")
+_TOWER_RANGE = _tower_table("range")
+_TOWER_AOE = _tower_table("aoe")
+_SW_RANGE = np.array([0] + [SuperWeapon.config_of_type(t).range for t in SuperWeaponType])
+_COIN_OF_LEVEL = np.array([Ant.coin_of_level(lv) for lv in range(3)])
+_MAXHP_OF_LEVEL = np.array([Ant.maxhp_of_level(lv) for lv in range(3)])
+_GEN_SPEED_OF_LEVEL = np.array([Ant.gen_speed_of_level(lv) for lv in range(3)])
+
+_NO_TARGET = np.iinfo(np.int64).max
+
+
+def _axial_distance(x0, y0, x1, y1):
+    q0, r0 = y0, x0 - (y0 + (y0 & 1)) // 2
+    q1, r1 = y1, x1 - (y1 + (y1 & 1)) // 2
+    return (np.abs(q0 - q1) + np.abs(q0 + r0 - q1 - r1) + np.abs(r0 - r1)) // 2
+
+
+class BatchGameState:
+    """
+    N局独立游戏的批量状态。
+
+    各个数组的第一维都是对局编号。蚂蚁数组的第二维是蚂蚁在对应 :attr:`.gamestate.GameState.ants` 列表中的位置，
+    只有前 ``ant_count[n]`` 项有效；防御塔与超级武器同理。坐标都以格点下标 ``x * 19 + y`` 表示，参见 :mod:`antwar.geometry` 。
+    超级武器可以部署在地图之外，因此单独保存其横纵坐标。
+    """
+
+    def __init__(
+            self,
+            n: int,
+            ant_capacity: int = 2 * (Ant.max_age() + 2),
+            tower_capacity: int = 2 * 33,
+            path_capacity: int = Ant.max_age() + 2,
+            super_weapon_capacity: int = 8,
+    ):
+        """
+        创建N局处于初始状态的游戏。信息素为全0，请使用 :meth:`init_with_seeds` 初始化。
+
+        :param n: 对局数量
+        :param ant_capacity: 每局最多同时存在的蚂蚁数量
+        :param tower_capacity: 每局最多同时存在的防御塔数量
+        :param path_capacity: 蚂蚁路径的最大长度
+        :param super_weapon_capacity: 每局最多同时生效的超级武器数量
+        """
+        a, t, s = ant_capacity, tower_capacity, super_weapon_capacity
+        init = GameState()
+        self.n: int = n  #: 对局数量
+        self.round = np.zeros(n, dtype=np.int64)  #: 各局当前回合数
+        self.coin = np.tile(np.array(init.coin, dtype=np.int64), (n, 1))  #: ``(N, 2)`` 双方金币
+        self.hp = np.tile(np.array(init.hp, dtype=np.int64), (n, 1))  #: ``(N, 2)`` 双方大本营血量
+        self.gen_speed_lv = np.zeros((n, 2), dtype=np.int64)  #: ``(N, 2)`` 蚂蚁生产速度等级
+        self.ant_maxhp_lv = np.zeros((n, 2), dtype=np.int64)  #: ``(N, 2)`` 蚂蚁最大血量等级
+        self.super_weapon_cd = np.zeros((n, 2, 4), dtype=np.int64)  #: ``(N, 2, 4)`` 超级武器冷却时间
+        self.next_ant_id = np.zeros(n, dtype=np.int64)  #: 各局下一个蚂蚁ID
+        self.next_tower_id = np.zeros(n, dtype=np.int64)  #: 各局下一个防御塔ID
+        self.phero = np.zeros((n, 2, CELL_COUNT), dtype=np.float64)
+        """``(N, 2, 361)`` 双方信息素，:attr:`pheromone` 是它形状为 ``(N, 2, 19, 19)`` 的视图"""
+        self.operated_tower_id: list[list[int]] = [[] for _ in range(n)]  #: 各局本回合已经操作过的防御塔ID
+
+        self.ant_count = np.zeros(n, dtype=np.int64)  #: 各局蚂蚁数量
+        self.ant_id = np.zeros((n, a), dtype=np.int64)
+        self.ant_player = np.zeros((n, a), dtype=np.int64)
+        self.ant_hp = np.zeros((n, a), dtype=np.int64)
+        self.ant_maxhp = np.zeros((n, a), dtype=np.int64)
+        self.ant_cell = np.zeros((n, a), dtype=np.int64)
+        self.ant_level = np.zeros((n, a), dtype=np.int64)
+        self.ant_age = np.zeros((n, a), dtype=np.int64)
+        self.ant_evasion = np.zeros((n, a), dtype=np.int64)
+        self.ant_state = np.zeros((n, a), dtype=np.int64)
+        self.ant_path = np.zeros((n, a, path_capacity), dtype=np.int64)  #: ``(N, A, P)`` 蚂蚁路径
+        self.ant_path_len = np.zeros((n, a), dtype=np.int64)
+
+        self.tower_count = np.zeros(n, dtype=np.int64)  #: 各局防御塔数量
+        self.tower_id = np.zeros((n, t), dtype=np.int64)
+        self.tower_player = np.zeros((n, t), dtype=np.int64)
+        self.tower_cell = np.zeros((n, t), dtype=np.int64)
+        self.tower_type = np.zeros((n, t), dtype=np.int64)
+        self.tower_cd = np.zeros((n, t), dtype=np.int64)
+
+        self.sw_count = np.zeros(n, dtype=np.int64)  #: 各局生效中的超级武器数量
+        self.sw_player = np.zeros((n, s), dtype=np.int64)
+        self.sw_type = np.zeros((n, s), dtype=np.int64)
+        self.sw_x = np.zeros((n, s), dtype=np.int64)
+        self.sw_y = np.zeros((n, s), dtype=np.int64)
+        self.sw_duration = np.zeros((n, s), dtype=np.int64)
+
+    _ANT_FIELDS = [
+        "ant_id", "ant_player", "ant_hp", "ant_maxhp", "ant_cell", "ant_level",
+        "ant_age", "ant_evasion", "ant_state", "ant_path", "ant_path_len",
+    ]
+    _TOWER_FIELDS = ["tower_id", "tower_player", "tower_cell", "tower_type", "tower_cd"]
+    _SW_FIELDS = ["sw_player", "sw_type", "sw_x", "sw_y", "sw_duration"]
+
+    @property
+    def pheromone(self) -> np.ndarray:
+        """``(N, 2, 19, 19)`` 的信息素视图"""
+        return self.phero.reshape(self.n, 2, GRID_SIZE, GRID_SIZE)
+
+    def init_with_seeds(self, seeds: list[int]) -> None:
+        """用给定的随机种子分别初始化各局的双方信息素，参见 :meth:`.gamestate.GameState.init_with_seed` 。"""
+        for i, seed in enumerate(seeds):
+            state = GameState()
+            state.init_with_seed(seed)
+            for p in range(2):
+                self.phero[i, p] = np.array(state.phero[p].value_view(), dtype=np.float64).reshape(-1)
+
+    @staticmethod
+    def from_states(states: list[GameState]) -> "BatchGameState":
+        """
+        由若干 :class:`.gamestate.GameState` 创建批量状态，容量会自动扩大以容纳所有实体。
+
+        :param states: 各局的游戏状态
+        :return: 批量状态
+        """
+        batch = BatchGameState(
+            len(states),
+            ant_capacity=max([2 * (Ant.max_age() + 2)] + [len(s.ants) for s in states]),
+            tower_capacity=max([2 * 33] + [len(s.towers) for s in states]),
+            path_capacity=max([Ant.max_age() + 2] + [len(a.path) + 1 for s in states for a in s.ants]),
+            super_weapon_capacity=max([8] + [len(s.active_super_weapon) for s in states]),
+        )
+        for i, s in enumerate(states):
+            batch.round[i] = s.round
+            batch.coin[i] = s.coin
+            batch.hp[i] = s.hp
+            batch.gen_speed_lv[i] = s.gen_speed_lv
+            batch.ant_maxhp_lv[i] = s.ant_maxhp_lv
+            batch.super_weapon_cd[i] = s.super_weapon_cd
+            batch.next_ant_id[i] = s.next_ant_id
+            batch.next_tower_id[i] = s.next_tower_id
+            batch.operated_tower_id[i] = list(s.operated_tower_id)
+            for p in range(2):
+                if len(s.phero[p].value_view()) > 0:  # 未初始化的信息素保持全0
+                    batch.phero[i, p] = np.array(s.phero[p].value_view(), dtype=np.float64).reshape(-1)
+            batch.ant_count[i] = len(s.ants)
+            for j, ant in enumerate(s.ants):
+                batch.ant_id[i, j] = ant.id
+                batch.ant_player[i, j] = ant.player
+                batch.ant_hp[i, j] = ant.hp
+                batch.ant_maxhp[i, j] = ant.maxhp
+                batch.ant_cell[i, j] = ant.coord.x * GRID_SIZE + ant.coord.y
+                batch.ant_level[i, j] = ant.level
+                batch.ant_age[i, j] = ant.age
+                batch.ant_evasion[i, j] = ant.evasion_count
+                batch.ant_state[i, j] = ant.state
+                batch.ant_path_len[i, j] = len(ant.path)
+                batch.ant_path[i, j, :len(ant.path)] = [c.x * GRID_SIZE + c.y for c in ant.path]
+            batch.tower_count[i] = len(s.towers)
+            for j, tower in enumerate(s.towers):
+                batch.tower_id[i, j] = tower.id
+                batch.tower_player[i, j] = tower.player
+                batch.tower_cell[i, j] = tower.coord.x * GRID_SIZE + tower.coord.y
+                batch.tower_type[i, j] = tower.type
+                batch.tower_cd[i, j] = tower.cd
+            batch.sw_count[i] = len(s.active_super_weapon)
+            for j, sw in enumerate(s.active_super_weapon):
+                batch.sw_player[i, j] = sw.player
+                batch.sw_type[i, j] = sw.type
+                batch.sw_x[i, j] = sw.coord.x
+                batch.sw_y[i, j] = sw.coord.y
+                batch.sw_duration[i, j] = sw.duration
+        return batch
+
+    def to_state(self, i: int) -> GameState:
+        """
+        将第 ``i`` 局导出为 :class:`.gamestate.GameState` 。
+
+        :param i: 对局编号
+        :return: 对应的游戏状态
+        """
+
+        def coord(cell) -> Coord:
+            return Coord(*divmod(int(cell), GRID_SIZE))
+
+        state = GameState(
+            round=int(self.round[i]),
+            coin=self.coin[i].tolist(),
+            hp=self.hp[i].tolist(),
+            super_weapon_cd=self.super_weapon_cd[i].tolist(),
+            gen_speed_lv=self.gen_speed_lv[i].tolist(),
+            ant_maxhp_lv=self.ant_maxhp_lv[i].tolist(),
+            operated_tower_id=list(self.operated_tower_id[i]),
+            next_ant_id=int(self.next_ant_id[i]),
+            next_tower_id=int(self.next_tower_id[i]),
+        )
+        for j in range(self.ant_count[i]):
+            state.ants.append(
+                Ant(
+                    int(self.ant_id[i, j]),
+                    int(self.ant_player[i, j]),
+                    int(self.ant_hp[i, j]),
+                    int(self.ant_maxhp[i, j]),
+                    coord(self.ant_cell[i, j]),
+                    int(self.ant_level[i, j]),
+                    int(self.ant_age[i, j]),
+                    int(self.ant_evasion[i, j]),
+                    AntState(self.ant_state[i, j]),
+                    [coord(c) for c in self.ant_path[i, j, :self.ant_path_len[i, j]]],
+                )
+            )
+        for j in range(self.tower_count[i]):
+            state.towers.append(
+                Tower(
+                    int(self.tower_id[i, j]),
+                    int(self.tower_player[i, j]),
+                    coord(self.tower_cell[i, j]),
+                    TowerType(self.tower_type[i, j]),
+                    int(self.tower_cd[i, j]),
+                )
+            )
+        for j in range(self.sw_count[i]):
+            state.active_super_weapon.append(
+                SuperWeapon(
+                    int(self.sw_player[i, j]),
+                    SuperWeaponType(self.sw_type[i, j]),
+                    Coord(int(self.sw_x[i, j]), int(self.sw_y[i, j])),
+                    int(self.sw_duration[i, j]),
+                )
+            )
+        for p in range(2):
+            state.phero[p] = Pheromone()
+            state.phero[p].value = self.pheromone[i, p].tolist()
+        return state
+
+    # ------------------------------------------------------------------
+    # 操作
+
+    def _tower_slot(self, i: int, id: int) -> int:
+        hits = np.nonzero(self.tower_id[i, :self.tower_count[i]] == id)[0]
+        return int(hits[0]) if len(hits) > 0 else -1
+
+    def _in_emp_range(self, i: int, player: int, x: int, y: int) -> bool:
+        for j in range(self.sw_count[i]):
+            if (
+                    self.sw_player[i, j] != player
+                    and self.sw_type[i, j] == SuperWeaponType.EMP_BLASTER
+                    and axial_distance(x, y, int(self.sw_x[i, j]), int(self.sw_y[i, j])) <= _SW_RANGE[self.sw_type[i, j]]
+            ):
+                return True
+        return False
+
+    def _build_tower_cost(self, i: int, player: int) -> int:
+        return 15 * (2 ** int(np.count_nonzero(self.tower_player[i, :self.tower_count[i]] == player)))
+
+    def apply_operation(self, i: int, player: int, op: Operation) -> bool:
+        """
+        在第 ``i`` 局中用指定玩家的身份执行给定操作，规则与 :meth:`.gamestate.GameState.apply_operation` 完全相同。
+
+        :param i: 对局编号
+        :param player: 执行操作的玩家
+        :param op: 需要执行的操作
+        :return: 操作是否有效
+        """
+        x, y = op.arg0, op.arg1
+        if op.type == OperationType.BUILD_TOWER:
+            cost = self._build_tower_cost(i, player)
+            cell = x * GRID_SIZE + y
+            valid = (
+                    self.coin[i, player] >= cost
+                    and is_player_highland(Coord(x, y), player)
+                    and not np.any(self.tower_cell[i, :self.tower_count[i]] == cell)
+                    and not self._in_emp_range(i, player, x, y)
+            )
+            if valid:
+                j = self.tower_count[i]
+                if j >= self.tower_id.shape[1]:
+                    raise OverflowError("tower capacity exceeded")
+                self.tower_id[i, j] = self.next_tower_id[i]
+                self.tower_player[i, j] = player
+                self.tower_cell[i, j] = cell
+                self.tower_type[i, j] = TowerType.BASIC
+                self.tower_cd[i, j] = _TOWER_INTERVAL[TowerType.BASIC]
+                self.tower_count[i] += 1
+                self.next_tower_id[i] += 1
+                self.operated_tower_id[i].append(int(self.tower_id[i, j]))
+                self.coin[i, player] -= cost
+            return valid
+        if op.type in (OperationType.UPGRADE_TOWER, OperationType.DOWNGRADE_TOWER):
+            j = self._tower_slot(i, op.arg0)
+            valid = (
+                    j >= 0
+                    and op.arg0 not in self.operated_tower_id[i]
+                    and self.tower_player[i, j] == player
+            )
+            if op.type == OperationType.UPGRADE_TOWER:
+                newtype = TowerType(op.arg1)
+                cost = 200 if newtype.value > 10 else 60 if newtype.value > 0 else -1
+                valid = (
+                        valid
+                        and self.coin[i, player] >= cost
+                        and not self._in_emp_range(i, player, x, y)
+                        and can_tower_upgrade_to(TowerType(self.tower_type[i, j]), newtype)
+                )
+                if valid:
+                    self.operated_tower_id[i].append(op.arg0)
+                    self.tower_type[i, j] = newtype
+                    self.tower_cd[i, j] = _TOWER_INTERVAL[newtype]
+                    self.coin[i, player] -= cost
+                return valid
+            valid = valid and not self._in_emp_range(i, player, x, y)
+            if valid:
+                self.operated_tower_id[i].append(op.arg0)
+                if self.tower_type[i, j] == TowerType.BASIC:
+                    n = self.tower_count[i]
+                    for name in BatchGameState._TOWER_FIELDS:
+                        arr = getattr(self, name)
+                        arr[i, j:n - 1] = arr[i, j + 1:n].copy()
+                    self.tower_count[i] -= 1
+                    # 与GameState一致：防御塔拆除之后再计算返还金币，此时已经找不到该防御塔
+                    income = -1
+                else:
+                    newtype = int(self.tower_type[i, j]) // 10
+                    self.tower_type[i, j] = newtype
+                    self.tower_cd[i, j] = _TOWER_INTERVAL[newtype]
+                    if newtype > 10:
+                        income = 160
+                    elif newtype > 0:
+                        income = 48
+                    else:
+                        income = int(self._build_tower_cost(i, player) * 0.4)
+                self.coin[i, player] += income
+            return valid
+
+        sw_of_op = {
+            OperationType.DEPLOY_LIGHTNING_STORM: SuperWeaponType.LIGHTNING_STORM,
+            OperationType.DEPLOY_EMP_BLASTER: SuperWeaponType.EMP_BLASTER,
+            OperationType.DEPLOY_DEFLECTORS: SuperWeaponType.DEFLECTORS,
+            OperationType.DEPLOY_EMERGENCY_EVASION: SuperWeaponType.EMERGENCY_EVASION,
+        }
+        if op.type in sw_of_op:
+            swtype = sw_of_op[op.type]
+            config = SuperWeapon.config_of_type(swtype)
+            if self.coin[i, player] < config.cost or self.super_weapon_cd[i, player, swtype.value - 1] != 0:
+                return False
+            if swtype == SuperWeaponType.EMERGENCY_EVASION:
+                n = self.ant_count[i]
+                cells = self.ant_cell[i, :n]
+                dist = _axial_distance(cells // GRID_SIZE, cells % GRID_SIZE, x, y)
+                hit = (self.ant_player[i, :n] == player) & (dist <= config.range)
+                self.ant_evasion[i, :n][hit] += config.duration
+            else:
+                j = self.sw_count[i]
+                if j >= self.sw_type.shape[1]:
+                    raise OverflowError("super weapon capacity exceeded")
+                self.sw_player[i, j] = player
+                self.sw_type[i, j] = swtype
+                self.sw_x[i, j] = x
+                self.sw_y[i, j] = y
+                self.sw_duration[i, j] = config.duration
+                self.sw_count[i] += 1
+            self.coin[i, player] -= config.cost
+            self.super_weapon_cd[i, player, swtype.value - 1] = config.cd
+            return True
+
+        if op.type in (OperationType.UPGRADE_GENERATE_SPEED, OperationType.UPGRADE_ANT_MAXHP):
+            levels = self.gen_speed_lv if op.type == OperationType.UPGRADE_GENERATE_SPEED else self.ant_maxhp_lv
+            cost = Ant.upgrade_cost(int(levels[i, player]))
+            if self.coin[i, player] >= cost:
+                levels[i, player] += 1
+                self.coin[i, player] -= cost
+                return True
+            return False
+
+        return False
+
+    def apply_operations(self, player: int, batch_ops: list[list[Operation]]) -> list[bool]:
+        """
+        批量执行操作：第 ``i`` 个操作列表在第 ``i`` 局中依次执行，遇到无效操作即停止，与
+        :meth:`.controller.GameController.apply_enemy_ops` 的行为一致。
+
+        :param player: 执行操作的玩家
+        :param batch_ops: 长度为N的操作列表的列表
+        :return: 各局的操作列表是否全部有效
+        """
+        if len(batch_ops) != self.n:
+            raise ValueError("batch_ops must contain one operation list per game")
+        result = []
+        for i, ops in enumerate(batch_ops):
+            ok = True
+            for op in ops:
+                if not self.apply_operation(i, player, op):
+                    ok = False
+                    break
+            result.append(ok)
+        return result
+
+    # ------------------------------------------------------------------
+    # 回合结算
+
+    def _ant_valid(self) -> np.ndarray:
+        return np.arange(self.ant_id.shape[1])[None, :] < self.ant_count[:, None]
+
+    def _sw_valid(self) -> np.ndarray:
+        return np.arange(self.sw_type.shape[1])[None, :] < self.sw_count[:, None]
+
+    def _sw_cover(self, sw_mask: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        # cells: (N, K) 格点；返回 (N, K, S)，表示各格点是否在对应超级武器的范围内
+        x, y = (cells // GRID_SIZE)[:, :, None], (cells % GRID_SIZE)[:, :, None]
+        dist = _axial_distance(x, y, self.sw_x[:, None, :], self.sw_y[:, None, :])
+        return sw_mask[:, None, :] & (dist <= _SW_RANGE[self.sw_type][:, None, :])
+
+    def _search_target(self, games, player, cell, trange, skip) -> np.ndarray:
+        # 返回各局锁定的蚂蚁位置，没有目标时为-1
+        dist = _DIST[cell[:, None], self.ant_cell]
+        cand = (
+                games[:, None]
+                & self._ant_valid()
+                & (self.ant_player != player[:, None])
+                & (dist <= trange[:, None])
+                & (self.ant_id != skip[:, None])
+                & (self.ant_hp > 0)
+        )
+        key = np.where(cand, dist * (1 << 32) + self.ant_id, _NO_TARGET)
+        slot = np.argmin(key, axis=1)
+        found = key[np.arange(self.n), slot] != _NO_TARGET
+        return np.where(found, slot, -1)
+
+    def _attack(self, hit: np.ndarray, damage: np.ndarray, deflected: np.ndarray) -> None:
+        # hit: (N, A) 被攻击的蚂蚁；damage: (N,) 各局的伤害；与 GameState._try_attack_ant 相同
+        evade = hit & (self.ant_evasion > 0)
+        self.ant_evasion -= evade
+        hit = hit & ~evade
+        dmg = np.where(deflected & (damage[:, None] * 2 < self.ant_maxhp), 0, damage[:, None])
+        self.ant_hp -= np.where(hit, dmg, 0)
+        died = hit & (self.ant_hp <= 0)
+        self.ant_state[died] = AntState.FAIL
+        self._reward_kills(died)
+
+    def _reward_kills(self, died: np.ndarray) -> None:
+        games, slots = np.nonzero(died)
+        if len(games) > 0:
+            np.add.at(
+                self.coin,
+                (games, 1 - self.ant_player[games, slots]),
+                _COIN_OF_LEVEL[self.ant_level[games, slots]],
+            )
+
+    def _attack_slot(self, games: np.ndarray, slot: np.ndarray, damage: np.ndarray, deflected: np.ndarray) -> None:
+        hit = np.zeros(self.ant_id.shape, dtype=bool)
+        idx = np.nonzero(games & (slot >= 0))[0]
+        hit[idx, slot[idx]] = True
+        self._attack(hit, damage, deflected)
+
+    def _attack_area(self, games, player, center, radius, damage, deflected) -> None:
+        hit = (
+                games[:, None]
+                & self._ant_valid()
+                & (self.ant_player != player[:, None])
+                & (self.ant_hp > 0)
+                & (_DIST[center[:, None], self.ant_cell] <= radius[:, None])
+        )
+        self._attack(hit, damage, deflected)
+
+    def simulate_next_round(self) -> None:
+        """同时模拟所有对局的一个回合，结算顺序与 :meth:`.gamestate.GameState.simulate_next_round` 相同。"""
+        n_range = np.arange(self.n)
+        ant_valid = self._ant_valid()
+        self.ant_age += ant_valid
+        sw_valid = self._sw_valid()
+
+        # 1. lightning storm
+        for j in range(self.sw_type.shape[1]):
+            active = sw_valid[:, j] & (self.sw_type[:, j] == SuperWeaponType.LIGHTNING_STORM)
+            if not active.any():
+                continue
+            x, y = self.ant_cell // GRID_SIZE, self.ant_cell % GRID_SIZE
+            dist = _axial_distance(x, y, self.sw_x[:, j:j + 1], self.sw_y[:, j:j + 1])
+            hit = (
+                    active[:, None]
+                    & ant_valid
+                    & (self.ant_hp > 0)
+                    & (self.ant_player != self.sw_player[:, j:j + 1])
+                    & (dist <= _SW_RANGE[self.sw_type[:, j:j + 1]])
+            )
+            self.ant_hp -= hit * 100
+            self.ant_state[hit] = AntState.FAIL
+            self._reward_kills(hit)
+
+        # 2. tower attack
+        deflector = sw_valid & (self.sw_type == SuperWeaponType.DEFLECTORS)
+        deflected = (
+                self._sw_cover(deflector, self.ant_cell)
+                & (self.sw_player[:, None, :] == self.ant_player[:, :, None])
+        ).any(axis=2)
+        emp = sw_valid & (self.sw_type == SuperWeaponType.EMP_BLASTER)
+        emp_blocked = (
+                self._sw_cover(emp, self.tower_cell)
+                & (self.sw_player[:, None, :] != self.tower_player[:, :, None])
+        ).any(axis=2)
+        no_skip = np.full(self.n, -1)
+        for k in range(self.tower_id.shape[1]):
+            active = (k < self.tower_count) & ~emp_blocked[:, k]
+            if not active.any():
+                continue
+            cd = self.tower_cd[:, k]
+            cd[active & (cd > 0)] -= 1
+            ready = active & (cd == 0)
+            if not ready.any():
+                continue
+            player, cell, ttype = self.tower_player[:, k], self.tower_cell[:, k], self.tower_type[:, k]
+            trange, damage, aoe = _TOWER_RANGE[ttype], _TOWER_DAMAGE[ttype], _TOWER_AOE[ttype]
+            target = self._search_target(ready, player, cell, trange, no_skip)
+            fire = ready & (target >= 0)
+            cd[fire] = _TOWER_INTERVAL[ttype[fire]]
+
+            twice = fire & ((ttype == TowerType.QUICK_PLUS) | (ttype == TowerType.DOUBLE))
+            if twice.any():
+                self._attack_slot(twice, target, damage, deflected)
+                skip = np.where(ttype == TowerType.DOUBLE, self.ant_id[n_range, np.maximum(target, 0)], -1)
+                second = self._search_target(twice, player, cell, trange, skip)
+                self._attack_slot(twice, second, damage, deflected)
+            pulse = fire & (ttype == TowerType.PULSE)
+            if pulse.any():
+                self._attack_area(pulse, player, cell, trange, damage, deflected)
+            rest = fire & ~twice & ~pulse
+            single = rest & (aoe == 0)
+            if single.any():
+                ice = np.nonzero(single & (ttype == TowerType.ICE))[0]
+                self.ant_state[ice, target[ice]] = AntState.FROZEN
+                self._attack_slot(single, target, damage, deflected)
+            area = rest & (aoe > 0)
+            if area.any():
+                center = self.ant_cell[n_range, np.maximum(target, 0)]
+                self._attack_area(area, player, center, aoe, damage, deflected)
+
+        # 3. filter too-old
+        self.ant_state[ant_valid & (self.ant_hp > 0) & (self.ant_age > Ant.max_age())] = AntState.TOO_OLD
+
+        # 4. ant move
+        moving = ant_valid & (self.ant_state == AntState.ALIVE)
+        games, slots = np.nonzero(moving)
+        if len(games) > 0:
+            cell = self.ant_cell[games, slots]
+            player = self.ant_player[games, slots]
+            path_len = self.ant_path_len[games, slots]
+            last = np.where(path_len > 1, self.ant_path[games, slots, np.maximum(path_len - 2, 0)], cell)
+            nb = _NEIGHBOR_SAFE[cell]
+            valid = _NEIGHBOR_WALKABLE[cell] & (nb != last[:, None])
+            tau = np.where(_NEIGHBOR_IN_MAP[cell], self.phero[games[:, None], player[:, None], nb], -10.0)
+            eta = _ETA[cell, player]
+            max_dir = np.zeros(len(games), dtype=np.int64)
+            max_p = np.full(len(games), -1000.0)
+            rows = np.arange(len(games))
+            for i in range(6):
+                p = tau[:, i] * eta[:, i]
+                better = valid[:, i] & ((p > max_p) | ((p == max_p) & (tau[:, i] > tau[rows, max_dir])))
+                max_dir = np.where(better, i, max_dir)
+                max_p = np.where(better, p, max_p)
+            new_cell = _NEIGHBOR[cell, max_dir]
+            self.ant_cell[games, slots] = new_cell
+            if np.any(path_len >= self.ant_path.shape[2]):
+                raise OverflowError("path capacity exceeded")
+            self.ant_path[games, slots, path_len] = new_cell
+            self.ant_path_len[games, slots] += 1
+            success = new_cell == _HQ_CELL[1 - player]
+            self.ant_state[games[success], slots[success]] = AntState.SUCCESS
+            np.add.at(self.coin, (games[success], player[success]), 5)
+            np.add.at(self.hp, (games[success], 1 - player[success]), -1)
+
+        # 5. pheromone update
+        _lambda = Pheromone.decay_rate()
+        np.multiply(self.phero, _lambda, out=self.phero)
+        np.add(self.phero, (1 - _lambda) * Pheromone.tau_base(), out=self.phero)
+        gain = np.zeros(self.ant_state.shape)
+        gain[self.ant_state == AntState.FAIL] = Pheromone.failed_ant_gain()
+        gain[self.ant_state == AntState.TOO_OLD] = Pheromone.too_old_ant_gain()
+        gain[self.ant_state == AntState.SUCCESS] = Pheromone.success_ant_gain()
+        changed = ant_valid & (self.ant_state != AntState.ALIVE) & (self.ant_state != AntState.FROZEN)
+        path_slots = np.arange(self.ant_path.shape[2])
+        # 同一局中路径重叠的蚂蚁需要按顺序逐只更新（每次更新都会截断到非负），不同对局之间可以同时进行
+        for j in np.nonzero(changed.any(axis=0))[0]:
+            games = np.nonzero(changed[:, j])[0]
+            on_path = path_slots[None, :] < self.ant_path_len[games, j][:, None]
+            mask = np.zeros((len(games), CELL_COUNT), dtype=bool)
+            rows = np.broadcast_to(np.arange(len(games))[:, None], on_path.shape)
+            mask[rows[on_path], self.ant_path[games, j][on_path]] = True
+            player = self.ant_player[games, j]
+            value = self.phero[games, player]
+            updated = np.maximum(value + gain[games, j][:, None], 0.0)
+            self.phero[games, player] = np.where(mask, updated, value)
+
+        # 6. generate new ant
+        for player in range(2):
+            spawn = self.round % _GEN_SPEED_OF_LEVEL[self.gen_speed_lv[:, player]] == 0
+            games = np.nonzero(spawn)[0]
+            if len(games) == 0:
+                continue
+            slots = self.ant_count[games]
+            if np.any(slots >= self.ant_id.shape[1]):
+                raise OverflowError("ant capacity exceeded")
+            level = self.ant_maxhp_lv[games, player]
+            self.ant_id[games, slots] = self.next_ant_id[games]
+            self.ant_player[games, slots] = player
+            self.ant_hp[games, slots] = _MAXHP_OF_LEVEL[level]
+            self.ant_maxhp[games, slots] = _MAXHP_OF_LEVEL[level]
+            self.ant_cell[games, slots] = _HQ_CELL[player]
+            self.ant_level[games, slots] = level
+            self.ant_age[games, slots] = 0
+            self.ant_evasion[games, slots] = 0
+            self.ant_state[games, slots] = AntState.ALIVE
+            self.ant_path[games, slots, 0] = _HQ_CELL[player]
+            self.ant_path_len[games, slots] = 1
+            self.ant_count[games] += 1
+            self.next_ant_id[games] += 1
+
+        # 7. final update
+        self.round += 1
+        self.coin += 1
+        self.ant_state[self.ant_state == AntState.FROZEN] = AntState.ALIVE
+        self.ant_count = self._compact(
+            self._ant_valid() & (self.ant_state == AntState.ALIVE), BatchGameState._ANT_FIELDS
+        )
+        self.sw_duration -= self._sw_valid()
+        self.sw_count = self._compact(self._sw_valid() & (self.sw_duration > 0), BatchGameState._SW_FIELDS)
+        np.maximum(self.super_weapon_cd - 1, 0, out=self.super_weapon_cd)
+        self.operated_tower_id = [[] for _ in range(self.n)]
+
+    def _compact(self, keep: np.ndarray, fields: list[str]) -> np.ndarray:
+        # 稳定地把保留的元素移到数组前部，返回新的数量
+        order = np.argsort(~keep, axis=1, kind="stable")
+        for name in fields:
+            arr = getattr(self, name)
+            idx = order.reshape(order.shape + (1,) * (arr.ndim - 2))
+            setattr(self, name, np.take_along_axis(arr, idx, axis=1))
+        return keep.sum(axis=1)
+
+
+def batch_from_seeds(seeds: list[int], template: Optional[GameState] = None) -> BatchGameState:
+    """
+    创建若干局以给定随机种子初始化信息素的游戏。
+
+    :param seeds: 各局的随机种子
+    :param template: 可选的初始局面，除信息素外的状态都从它复制
+    :return: 批量状态
+    """
+    batch = BatchGameState.from_states([template or GameState()] * len(seeds))
+    batch.init_with_seeds(seeds)
+    return batch
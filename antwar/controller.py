@@ -1,7 +1,47 @@
-from typing import Callable
+import threading
+import time
+from typing import Callable, Iterator, Optional
 
 from .gamestate import GameState
 from .protocol import read_init_info, Operation, write_our_operation, RoundInfo, read_round_info, read_enemy_operations
+from .rawio import debug
+
+
+class LatencyStats:
+    """每回合决策耗时的统计数据，单位为秒。"""
+
+    def __init__(self):
+        self.samples: list[float] = []  #: 各回合的耗时，按回合顺序排列
+
+    def record(self, seconds: float) -> None:
+        """记录一个回合的耗时"""
+        self.samples.append(seconds)
+
+    def count(self) -> int:
+        """已记录的回合数"""
+        return len(self.samples)
+
+    def mean(self) -> float:
+        """平均耗时"""
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def max(self) -> float:
+        """最大耗时"""
+        return max(self.samples, default=0.0)
+
+    def percentile(self, q: float) -> float:
+        """耗时的 ``q`` 分位数， ``q`` 的取值范围为0到100"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def summary(self) -> str:
+        """一行文字的统计摘要，可以直接用 :func:`.rawio.debug` 输出"""
+        return (
+            f"rounds={self.count()} mean={self.mean() * 1000:.1f}ms "
+            f"p95={self.percentile(95) * 1000:.1f}ms max={self.max() * 1000:.1f}ms"
+        )
 
 
 class GameController:
@@ -10,16 +50,29 @@ class GameController:
     my_seat: int = 0  #: 您的位置。0代表您是先手，1代表您是后手。
     game_state: GameState = GameState()  #: 游戏状态，一个 :class:`.gamestate.GameState` 对象
     my_operation_list: list[Operation] = []  #: 我方未发送的操作列表
+    verify_sync: bool = False  #: 是否在每回合结算后用回合信息校验本地局面，参见 :meth:`next_round`
+    resync_on_mismatch: bool = False  #: 校验不一致时是否以回合信息为准修正本地局面
+
+    def __init__(self):
+        self.turn_start: float = time.perf_counter()
+        """我方本回合开始决策的时刻（ ``time.perf_counter()`` ），在收到敌方操作或回合信息时更新"""
+        self.latency: LatencyStats = LatencyStats()
+        """从 :attr:`turn_start` 到发送我方操作的耗时统计"""
+        self.desync_rounds: list[int] = []
+        """校验不一致的回合（结算后的回合数）"""
 
     def init(self) -> None:
         """初始化游戏：接受游戏初始化信息，并使用给定的随机种子初始化双方信息素。"""
         init_info = read_init_info()
+        self.turn_start = time.perf_counter()
         self.my_seat = init_info.my_seat
         self.game_state.init_with_seed(init_info.seed)
 
     def read_enemy_ops(self) -> list[Operation]:
         """读取敌方操作列表"""
-        return read_enemy_operations()
+        ops = read_enemy_operations()
+        self.turn_start = time.perf_counter()
+        return ops
 
     def apply_enemy_ops(self, ops: list[Operation]) -> bool:
         """应用敌方操作。如果返回``False``说明敌方操作不合法。"""
@@ -39,8 +92,18 @@ class GameController:
             return True
         return False
 
-    def try_apply_our_ops(self, ops: list[Operation]) -> bool:
-        """尝试执行我方若干哥操作。如果返回``False``说明我方操作不合法，并停止执行后面的操作。"""
+    def try_apply_our_ops(self, ops: list[Operation], atomic: bool = False) -> bool:
+        """
+        尝试执行我方若干哥操作。如果返回``False``说明我方操作不合法，并停止执行后面的操作。
+
+        :param ops: 需要执行的操作
+        :param atomic: 为 ``True`` 时，只要有一个操作不合法就一个也不执行，参见 :meth:`.gamestate.GameState.apply_operations`
+        """
+        if atomic:
+            if not self.game_state.apply_operations(self.my_seat, ops):
+                return False
+            self.my_operation_list += ops
+            return True
         for op in ops:
             if not self.try_apply_our_op(op):
                 return False
@@ -50,13 +113,74 @@ class GameController:
         """结束我方操作回合，将操作列表打包发送并清空。"""
         write_our_operation(self.my_operation_list)
         self.my_operation_list = []
+        self.latency.record(time.perf_counter() - self.turn_start)
+
+    def search_until_deadline(
+            self,
+            search: Callable[[int, GameState], Iterator[list[Operation]]],
+            time_limit: float,
+            safety_margin: float,
+    ) -> list[Operation]:
+        """
+        运行一个“随时可停”的搜索，返回截止时刻之前得到的最后一个操作列表。
+
+        截止时刻为 :attr:`turn_start` + ``time_limit`` - ``safety_margin`` 。截止时刻只在每次 ``yield`` 之后检查，
+        控制器无法打断正在计算的搜索：跨过截止时刻的那次计算会一直进行到下一次 ``yield`` ，其结果也会被采用，然后搜索被关闭。
+        因此每次 ``yield`` 之间的耗时应当远小于 ``safety_margin`` ，否则会超出时间限制。
+
+        :param search: 搜索函数，参数与 :func:`run_antwar_ai` 的决策函数相同，返回一个依次产出越来越好的操作列表的迭代器（如生成器）。
+            搜索过程中请不要修改传入的局面，需要时使用 :meth:`.gamestate.GameState.fork` 。
+        :param time_limit: 每回合的时间限制（秒）
+        :param safety_margin: 为通讯等开销预留的时间（秒）
+        :return: 最后得到的操作列表。若搜索没有产出任何结果，返回空列表。
+        """
+        deadline = self.turn_start + time_limit - safety_margin
+        best: list[Operation] = []
+        iterator = search(self.my_seat, self.game_state)
+        try:
+            for ops in iterator:
+                best = ops
+                if time.perf_counter() >= deadline:
+                    break
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        return best
 
     def next_round(self) -> RoundInfo:
-        """执行下一回合：读取回合信息，进行 :class:`.gamestate.GameState` 的模拟以维护游戏数据。"""
+        """
+        执行下一回合：读取回合信息，进行 :class:`.gamestate.GameState` 的模拟以维护游戏数据。
+
+        若 :attr:`verify_sync` 为真，结算后会比较局面摘要与回合信息的摘要（参见 :meth:`.gamestate.GameState.round_digest` ）。
+        不一致时记录到 :attr:`desync_rounds` ，并通过 :func:`.rawio.debug` 输出详细差异；若 :attr:`resync_on_mismatch`
+        也为真，则以回合信息为准修正局面。
+        """
         round_info = read_round_info()
+        self.turn_start = time.perf_counter()
         self.game_state.simulate_next_round()
+        if self.verify_sync:
+            self.check_sync(round_info)
         return round_info
 
+    def check_sync(self, round_info: RoundInfo) -> bool:
+        """
+        校验本地局面与回合信息是否一致，行为参见 :meth:`next_round` 。
+
+        :param round_info: 本回合的回合信息
+        :return: 是否一致
+        """
+        state = self.game_state
+        if state.round_digest() == round_info.digest():
+            return True
+        self.desync_rounds.append(state.round)
+        debug(f"desync after round {state.round}:")
+        for line in state.diff_round_info(round_info):
+            debug("  " + line)
+        if self.resync_on_mismatch:
+            state.sync_from_round_info(round_info)
+        return False
+
 
 def run_antwar_ai(ai_func: Callable[[int, GameState], list[Operation]]) -> None:
     """
@@ -82,3 +206,185 @@ def run_antwar_ai(ai_func: Callable[[int, GameState], list[Operation]]) -> None:
             game.finish_and_send_our_ops()
 
         game.next_round()
+
+
+def run_antwar_ai_anytime(
+        search: Callable[[int, GameState], Iterator[list[Operation]]],
+        time_limit: float = 1.0,
+        safety_margin: float = 0.2,
+        game: Optional[GameController] = None,
+) -> None:
+    """
+    以“随时可停”的方式执行AI。与 :func:`run_antwar_ai` 相同地处理通讯，但决策函数是一个搜索：它返回一个迭代器（通常是生成器），
+    依次 ``yield`` 越来越好的操作列表。控制器从收到敌方操作或回合信息时开始计时，到达时间限制减去安全余量后的第一次
+    ``yield`` 时停止搜索，并发送最后得到的操作列表。截止时刻只在 ``yield`` 时检查，请让每步搜索的耗时远小于安全余量。每回合的耗时记录在 :attr:`GameController.latency` 中，需要读取时请自行创建控制器并传入。
+
+    .. code-block:: python
+
+        game = GameController()
+
+        def search(my_seat: int, state: GameState):
+            debug(game.latency.summary())
+            yield []  # 先给出一个保底的结果
+            for depth in range(1, 100):
+                yield best_ops_at_depth(my_seat, state.fork(), depth)
+
+        run_antwar_ai_anytime(search, time_limit=1.0, safety_margin=0.2, game=game)
+
+    :param search: 搜索函数，参见 :meth:`GameController.search_until_deadline`
+    :param time_limit: 每回合的时间限制（秒）
+    :param safety_margin: 为通讯等开销预留的时间（秒）
+    :param game: 使用的控制器，尚未调用过 :meth:`GameController.init` 。默认新建一个
+    """
+    if game is None:
+        game = GameController()
+    game.init()
+    while True:
+        if game.my_seat == 0:
+            ops = game.search_until_deadline(search, time_limit, safety_margin)
+            game.try_apply_our_ops(ops)
+            game.finish_and_send_our_ops()
+
+            game.read_and_apply_enemy_ops()
+        else:
+            game.read_and_apply_enemy_ops()
+
+            ops = game.search_until_deadline(search, time_limit, safety_margin)
+            game.try_apply_our_ops(ops)
+            game.finish_and_send_our_ops()
+
+        game.next_round()
+
+
+EnemyPredictor = Callable[[int, GameState], list[list[Operation]]]
+"""敌方操作预测函数，参数为敌方位置和敌方决策时的局面，返回若干可能的敌方操作列表，越可能的越靠前"""
+
+
+def predict_no_operation(enemy_seat: int, state: GameState) -> list[list[Operation]]:
+    """默认的敌方操作预测：敌方什么都不做"""
+    return [[]]
+
+
+def _ops_key(ops: list[Operation]) -> tuple:
+    return tuple((int(op.type), op.arg0, op.arg1) for op in ops)
+
+
+class _Speculation:
+    # 一次推测执行的结果。每次推测使用新的对象，过期的后台线程只会写入自己的那一份
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.results: dict[tuple, tuple[GameState, list[Operation]]] = {}
+        self.simulated: Optional[GameState] = None
+
+
+class PipelinedController(GameController):
+    """
+    流水线式的游戏控制器。发送我方操作后，在等待评测机输入的同时，后台线程对预测的敌方操作进行推测执行：
+    提前完成敌方操作的应用、下一回合的模拟以及我方的决策。收到真实的敌方操作后，若与某个推测一致，则直接采用推测的结果。
+
+    收到敌方操作后，控制器不会等待后台线程：推测被标记为过期，后台线程在下一次检查时退出，其结果被丢弃。
+    因此决策函数可能被调用多次，也可能在过期的后台线程与主线程中同时运行，它不应当依赖“每回合恰好调用一次”，
+    也不应当修改全局状态。耗时较长的决策函数可以定期检查 :meth:`speculation_stopped` 并提前返回，以免与主线程争抢GIL。
+    """
+
+    def __init__(self, ai_func: Callable[[int, GameState], list[Operation]], predict: EnemyPredictor = predict_no_operation):
+        """
+        :param ai_func: 决策函数，与 :func:`run_antwar_ai` 的相同
+        :param predict: 敌方操作预测函数
+        """
+        super().__init__()
+        self.ai_func = ai_func
+        self.predict = predict
+        self.hits: int = 0  #: 推测命中的回合数
+        self.misses: int = 0  #: 推测未命中的回合数
+        self._generation = 0  # 当前推测的编号，增加后之前的推测全部过期
+        self._speculation = _Speculation(0)
+        self._local = threading.local()
+
+    def _speculate(self, base: GameState, spec: _Speculation) -> None:
+        # 先手：敌方在我方操作后的局面上决策，推测内容为“敌方操作 -> 模拟 -> 我方决策”；
+        # 后手：回合模拟与敌方无关，先模拟，再推测“敌方操作 -> 我方决策”。
+        self._local.generation = spec.generation
+        if self.my_seat == 1:
+            base.simulate_next_round()
+            spec.simulated = base
+        for enemy_ops in self.predict(1 - self.my_seat, base.fork()):
+            if spec.generation != self._generation:
+                return
+            key = _ops_key(enemy_ops)
+            if key in spec.results:
+                continue
+            state = base.fork()
+            if not all(state.apply_operation(1 - self.my_seat, op) for op in enemy_ops):
+                continue
+            if self.my_seat == 0:
+                state.simulate_next_round()
+            spec.results[key] = (state, self.ai_func(self.my_seat, state))
+
+    def start_speculation(self) -> None:
+        """在后台线程中开始推测执行。应当在发送我方操作之后调用，之前的推测随之过期。"""
+        self._generation += 1
+        self._speculation = spec = _Speculation(self._generation)
+        threading.Thread(target=self._speculate, args=(self.game_state.fork(), spec), daemon=True).start()
+
+    def speculation_stopped(self) -> bool:
+        """当前是否处于已经过期的推测中。只在后台线程中可能返回 ``True`` ，此时决策函数的结果会被丢弃。"""
+        generation = getattr(self._local, "generation", None)
+        return generation is not None and generation != self._generation
+
+    def advance(self) -> list[Operation]:
+        """
+        从发送我方操作之后推进到我方下一次决策：读取敌方操作与回合信息，维护局面，并给出我方的下一组操作。
+        若推测命中，直接采用推测的局面与决策；否则不等待后台线程，立即在主线程中正常计算。
+
+        :return: 我方的下一组操作，尚未执行
+        """
+        self.start_speculation()
+        if self.my_seat == 0:
+            enemy_ops = read_enemy_operations()
+            read_round_info(skip_entities=True)
+        else:
+            read_round_info(skip_entities=True)
+            enemy_ops = read_enemy_operations()
+        self.turn_start = time.perf_counter()
+        spec = self._speculation
+        self._generation += 1  # 使后台线程尽快退出
+        hit = spec.results.get(_ops_key(enemy_ops))
+        if hit is not None:
+            self.hits += 1
+            self.game_state, ops = hit
+            return ops
+        self.misses += 1
+        if self.my_seat == 0:
+            self.apply_enemy_ops(enemy_ops)
+            self.game_state.simulate_next_round()
+        else:
+            if spec.simulated is not None:
+                # 过期的后台线程可能仍在复制这个局面，因此复制一份再修改
+                self.game_state = spec.simulated.fork()
+            else:
+                self.game_state.simulate_next_round()
+            self.apply_enemy_ops(enemy_ops)
+        return self.ai_func(self.my_seat, self.game_state)
+
+
+def run_antwar_ai_pipelined(
+        ai_func: Callable[[int, GameState], list[Operation]],
+        predict: EnemyPredictor = predict_no_operation,
+) -> None:
+    """
+    以流水线方式执行AI，参见 :class:`PipelinedController` 。通讯与行动顺序和 :func:`run_antwar_ai` 完全相同，
+    区别只在于等待评测机时会提前计算，从而缩短收到输入后的响应时间。
+
+    :param ai_func: 你的决策函数，与 :func:`run_antwar_ai` 的相同
+    :param predict: 敌方操作预测函数，默认预测敌方什么都不做
+    """
+    game = PipelinedController(ai_func, predict)
+    game.init()
+    if game.my_seat == 1:
+        game.read_and_apply_enemy_ops()
+    ops = ai_func(game.my_seat, game.game_state)
+    while True:
+        game.try_apply_our_ops(ops)
+        game.finish_and_send_our_ops()
+        ops = game.advance()
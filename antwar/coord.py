@@ -2,6 +2,16 @@
 
 from dataclasses import dataclass
 
+from .geometry import (
+    _neighbor_delta,
+    axial_distance,
+    distance_table,
+    in_map_mask,
+    ant_can_go_mask,
+    highland_mask,
+    terrain,
+)
+
 
 @dataclass(unsafe_hash=True)
 class Coord:
@@ -18,69 +28,47 @@ def headquarter_coord(player: int) -> Coord:
     return [Coord(2, 9), Coord(16, 9)][player]
 
 
-_highland_map = [
-    [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-    [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0],
-    [0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0],
-    [0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0],
-    [0, 0, 2, 2, 0, 1, 0, 0, 0, 2, 0, 0, 0, 1, 0, 2, 2, 0, 0],
-    [0, 0, 0, 2, 0, 0, 2, 2, 0, 2, 0, 2, 2, 0, 0, 2, 0, 0, 0],
-    [0, 2, 2, 0, 2, 0, 0, 2, 0, 2, 0, 2, 0, 0, 2, 0, 2, 2, 0],
-    [0, 2, 0, 0, 0, 2, 0, 0, 2, 0, 2, 0, 0, 2, 0, 0, 0, 2, 0],
-    [0, 0, 2, 0, 2, 0, 0, 2, 0, 0, 0, 2, 0, 0, 2, 0, 2, 0, 0],
-    [0, 1, 3, 0, 3, 1, 0, 1, 0, 1, 0, 1, 0, 1, 3, 0, 3, 1, 0],
-    [0, 0, 0, 0, 0, 0, 0, 3, 3, 0, 3, 3, 0, 0, 0, 0, 0, 0, 0],
-    [0, 3, 3, 0, 3, 3, 0, 0, 0, 0, 0, 0, 0, 3, 3, 0, 3, 3, 0],
-    [0, 3, 0, 0, 0, 0, 3, 3, 0, 3, 0, 3, 3, 0, 0, 0, 0, 3, 0],
-    [0, 0, 3, 3, 0, 0, 0, 3, 0, 3, 0, 3, 0, 0, 0, 3, 3, 0, 0],
-    [0, 0, 0, 3, 0, 1, 1, 0, 0, 3, 0, 0, 1, 1, 0, 3, 0, 0, 0],
-    [0, 0, 0, 0, 0, 1, 0, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0],
-    [0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0],
-    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-    [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-]
-
-
 def is_in_map(coord: Coord) -> bool:
     """判断是否在整个地图范围之内"""
-    return distance(coord, Coord(9, 9)) <= 9
+    x, y = coord.x, coord.y
+    return 0 <= x < 19 and 0 <= y < 19 and in_map_mask[x * 19 + y]
 
 
 def is_ant_can_go(coord: Coord) -> bool:
     """判断是否为蚂蚁可以移动的区域"""
-    return is_in_map(coord) and _highland_map[coord.x][coord.y] == 0
+    x, y = coord.x, coord.y
+    return 0 <= x < 19 and 0 <= y < 19 and ant_can_go_mask[x * 19 + y]
 
 
 def is_highland(coord: Coord) -> bool:
     """判断是否为高台，也即地图内蚂蚁不能移动到的区域"""
-    return is_in_map(coord) and _highland_map[coord.x][coord.y] != 0
+    x, y = coord.x, coord.y
+    return 0 <= x < 19 and 0 <= y < 19 and highland_mask[x * 19 + y]
 
 
 def is_player_highland(coord: Coord, player: int) -> bool:
     """判断是否为某位玩家的高台。玩家只能在自己的高台上建造防御塔。"""
-    return is_in_map(coord) and _highland_map[coord.x][coord.y] == player + 2
+    x, y = coord.x, coord.y
+    return 0 <= x < 19 and 0 <= y < 19 and in_map_mask[x * 19 + y] and terrain[x * 19 + y] == player + 2
 
 
 def distance(c0: Coord, c1: Coord) -> int:
     """计算两个坐标之间的距离"""
-    def to_axial(c: Coord) -> Coord:
-        return Coord(c.y, c.x - (c.y + (c.y & 1)) // 2)
-
-    def axial_distance(c0: Coord, c1: Coord) -> int:
-        return (
-                abs(c0.x - c1.x) + abs(c0.x + c0.y - c1.x - c1.y) + abs(c0.y - c1.y)
-        ) // 2
-
-    return axial_distance(to_axial(c0), to_axial(c1))
+    x0, y0, x1, y1 = c0.x, c0.y, c1.x, c1.y
+    if 0 <= x0 < 19 and 0 <= y0 < 19 and 0 <= x1 < 19 and 0 <= y1 < 19:
+        return distance_table[(x0 * 19 + y0) * 361 + x1 * 19 + y1]
+    return axial_distance(x0, y0, x1, y1)
 
 
-_neighbor_delta = [
-    [[0, 1], [-1, 0], [0, -1], [1, -1], [1, 0], [1, 1]],
-    [[-1, 1], [-1, 0], [-1, -1], [0, -1], [1, 0], [0, 1]],
-]
+def cell_of(coord: Coord) -> int:
+    """坐标对应的格点下标，参见 :mod:`antwar.geometry` 。超出19x19数组范围时返回-1。"""
+    x, y = coord.x, coord.y
+    if 0 <= x < 19 and 0 <= y < 19:
+        return x * 19 + y
+    return -1
 
 
 def neighbor(coord: Coord, direction: int) -> Coord:
     """计算对应方向的相邻坐标。从0到5分别是：右上、上、左上、左下、下、右下。"""
     delta = _neighbor_delta[coord.y % 2][direction]
-    return coord + Coord(delta[0], delta[1])
+    return Coord(coord.x + delta[0], coord.y + delta[1])
@@ -39,6 +39,9 @@ class Ant:
     state: AntState  #: 蚂蚁状态，参见 :class:`.AntState`
     path: list[Coord] = field(default_factory=list)  #: 蚂蚁走过的路径点，注意包含初始坐标和当前坐标
 
+    _path_shared = False  # path是否与其他局面中的蚂蚁共享，参见 GameState.fork
+    _path_hash = None  # (已计入的路径长度, 滚动哈希)，参见 GameState.state_key
+
     @staticmethod
     def upgrade_cost(level: int) -> int:
         """大本营升级所需要的金币。两条升级线路需要的金币相同。因为都是与蚂蚁直接相关因此放在这里。"""
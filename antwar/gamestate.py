@@ -1,7 +1,9 @@
 # pylint: disable=invalid-name, missing-module-docstring, missing-class-docstring, too-few-public-methods, no-member
+import operator
+import threading
 from dataclasses import dataclass, field
-from typing import Optional, TypeVar
-from .coord import Coord, is_player_highland, distance, neighbor, headquarter_coord
+from typing import Iterable, Iterator, Optional, TypeVar
+from .coord import Coord, is_player_highland, distance, neighbor, headquarter_coord, cell_of
 from .gamedata import (
     AntState,
     Ant,
@@ -13,8 +15,11 @@ from .gamedata import (
     init_coin,
     init_hp,
 )
+from .geometry import distance_of, in_map_cells, player_highland_cells, rings
+from . import pheromone as _pheromone_module
 from .pheromone import Pheromone, generate_init_pheromone
-from .protocol import Operation, OperationType
+from .profiling import Profile
+from .protocol import Operation, OperationType, RoundInfo, round_digest
 
 T = TypeVar("T")
 
@@ -37,6 +42,110 @@ def _find_by_coord(lst: list[T], coord: Coord) -> list[T]:
     return list(filter(lambda ele: ele.coord == coord, lst))
 
 
+def _truncate(lst: list, length: int, _) -> None:
+    del lst[length:]
+
+
+def _restore_items(lst: list, items: list, _) -> None:
+    lst[:] = items
+
+
+def _restore_dict(obj, saved: dict, _) -> None:
+    obj.__dict__.update(saved)
+
+
+# 状态哈希中各类特征的标签。注意不能使用字符串，字符串的哈希值在不同进程间是随机的。
+_ANT, _TOWER, _SUPER_WEAPON, _COIN, _HP, _GEN_SPEED, _ANT_MAXHP, _OPERATED, _COUNTERS, _PHERO = range(10)
+_SW_CD = (10, 11)
+_HASH_MASK = (1 << 64) - 1
+
+
+def _path_key(ant: Ant, cached: bool = True) -> int:
+    # 路径的滚动哈希 h' = hash((h, 格点))。路径在结算中只会追加，因此缓存已计入的长度，每次只计入新增的格点
+    path = ant.path
+    cache = ant._path_hash
+    if cached and cache is not None and cache[0] <= len(path):
+        n, h = cache
+    else:
+        n, h = 0, 0
+    for i in range(n, len(path)):
+        c = path[i]
+        h = hash((h, c.x * 19 + c.y))
+    ant._path_hash = (len(path), h)
+    return h
+
+
+def _ant_key(ant: Ant, cached: bool = True) -> int:
+    return hash((
+        _ANT, ant.id, ant.player, ant.hp, ant.maxhp, ant.coord.x, ant.coord.y, ant.level, ant.age,
+        ant.evasion_count, int(ant.state), _path_key(ant, cached),
+    ))
+
+
+def _tower_key(tower: Tower) -> int:
+    return hash((_TOWER, tower.id, tower.player, tower.coord.x, tower.coord.y, int(tower.type), tower.cd))
+
+
+def _super_weapon_key(sw: SuperWeapon) -> int:
+    return hash((_SUPER_WEAPON, sw.player, int(sw.type), sw.coord.x, sw.coord.y, sw.duration))
+
+
+_TOWER_TYPE_VALUES = {t.value for t in TowerType}
+_UPGRADE_TARGETS = {t0: [t1 for t1 in TowerType if can_tower_upgrade_to(t0, t1)] for t0 in TowerType}
+_DEPLOY_OPS = [
+    (SuperWeaponType.LIGHTNING_STORM, OperationType.DEPLOY_LIGHTNING_STORM),
+    (SuperWeaponType.EMP_BLASTER, OperationType.DEPLOY_EMP_BLASTER),
+    (SuperWeaponType.DEFLECTORS, OperationType.DEPLOY_DEFLECTORS),
+    (SuperWeaponType.EMERGENCY_EVASION, OperationType.DEPLOY_EMERGENCY_EVASION),
+]
+_IN_MAP_XY = [divmod(c, 19) for c in in_map_cells]
+
+
+_plain_distance = distance
+_distance_calls = threading.local()  # calls: 当前线程中开启了剖析的结算的距离计算次数，未在剖析时为None
+_profiled_rounds = 0  # 正在进行的开启了剖析的结算数量，大于0时本模块与信息素模块使用计数的distance
+_profiled_lock = threading.Lock()
+
+
+def _counting_distance(c0: Coord, c1: Coord) -> int:
+    # 只统计当前线程中开启了剖析的结算，其他线程中的调用直接转发
+    calls = getattr(_distance_calls, "calls", None)
+    if calls is not None:
+        _distance_calls.calls = calls + 1
+    return _plain_distance(c0, c1)
+
+
+def _count_distance_calls(enable: bool) -> None:
+    # 没有任何开启了剖析的结算时恢复原始的distance，未开启剖析时没有额外开销
+    global distance, _profiled_rounds  # pylint: disable=global-statement
+    with _profiled_lock:
+        _profiled_rounds += 1 if enable else -1
+        distance = _pheromone_module.distance = _counting_distance if _profiled_rounds > 0 else _plain_distance
+
+
+def _shallow_clone(obj: T) -> T:
+    clone = object.__new__(type(obj))
+    clone.__dict__.update(obj.__dict__)
+    return clone
+
+
+@dataclass
+class BatchResult:
+    """:meth:`GameState.apply_operations` 的结果。可以直接作为布尔值使用，表示是否全部有效。"""
+
+    applied: int  #: 执行之后保留在局面中的操作数
+    failed_index: int = -1  #: 第一个无效操作在列表中的下标，全部有效时为-1
+    reason: Optional[str] = None  #: 第一个无效操作无效的原因，参见 :meth:`GameState.operation_error`
+
+    @property
+    def ok(self) -> bool:
+        """是否全部有效"""
+        return self.failed_index < 0
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
 @dataclass
 class GameState:
     """
@@ -63,11 +172,201 @@ class GameState:
     next_ant_id: int = 0  #: 下一个蚂蚁的ID标号。双方共用一个编号序列。
     next_tower_id: int = 0  #: 下一个防御塔的ID标号。双方共用一个编号序列。
 
-    def init_with_seed(self, seed: int) -> None:
-        """初始化双方信息素"""
-        p0, p1 = generate_init_pheromone(seed)
+    _journal = None  # 撤销日志，参见 checkpoint/rollback
+    _hash = None  # 不含信息素的增量状态哈希，参见 state_key
+    _ant_index = None  # 格点下标 -> 该格点上的蚂蚁列表，仅在回合结算的攻击阶段有效
+    _profile = None  # 性能剖析数据，参见 enable_profiling
+
+    def enable_profiling(self, profile: Optional[Profile] = None) -> Profile:
+        """
+        开启性能剖析，参见 :mod:`antwar.profiling` 。 :meth:`fork` 得到的局面不会继承剖析。
+
+        :param profile: 记录数据的对象，默认新建一个。可以让多个局面共享同一个对象。
+        :return: 记录数据的对象
+        """
+        self._profile = profile if profile is not None else Profile()
+        return self._profile
+
+    def disable_profiling(self) -> Optional[Profile]:
+        """关闭性能剖析，返回之前记录数据的对象"""
+        profile, self._profile = self._profile, None
+        return profile
+
+    @property
+    def profile(self) -> Optional[Profile]:
+        """当前的剖析数据，未开启时为 ``None`` """
+        return self._profile
+
+    def state_key(self) -> int:
+        """
+        计算局面的64位哈希值，可以作为置换表的键，参见 :class:`.transposition.TranspositionTable` 。
+
+        第一次调用时会完整计算一次，之后 :meth:`apply_operation` 、各个“未检查”的局面操作API和 :meth:`simulate_next_round`
+        都会增量维护它。信息素按照 :meth:`.pheromone.Pheromone.hash_resolution` 量化后参与计算，因此相同的局面总有相同的哈希值。
+        同一Python版本下结果是确定的，不受进程的哈希随机化影响。如果直接修改了各个字段（包括蚂蚁的路径），请调用 :meth:`invalidate_state_key` 。
+
+        :return: 局面哈希值
+        """
+        if self._hash is None:
+            self._hash = self._compute_hash()
+        return (self._hash ^ hash((_PHERO, self.phero[0].quantized_hash(), self.phero[1].quantized_hash()))) & _HASH_MASK
+
+    def invalidate_state_key(self) -> None:
+        """丢弃增量维护的局面哈希，下一次调用 :meth:`state_key` 时重新完整计算。"""
+        self._log_attr(self, "_hash")
+        self._hash = None
+
+    def _compute_hash(self) -> int:
+        h = 0
+        for ant in self.ants:
+            h ^= _ant_key(ant, cached=False)
+        for tower in self.towers:
+            h ^= _tower_key(tower)
+        for sw in self.active_super_weapon:
+            h ^= _super_weapon_key(sw)
+        for tag, lst in [
+            (_COIN, self.coin),
+            (_HP, self.hp),
+            (_GEN_SPEED, self.gen_speed_lv),
+            (_ANT_MAXHP, self.ant_maxhp_lv),
+            (_SW_CD[0], self.super_weapon_cd[0]),
+            (_SW_CD[1], self.super_weapon_cd[1]),
+        ]:
+            for idx, value in enumerate(lst):
+                h ^= hash((tag, idx, value))
+        for id in self.operated_tower_id:
+            h ^= hash((_OPERATED, id))
+        return h ^ self._counters_key()
+
+    def _counters_key(self) -> int:
+        return hash((_COUNTERS, self.round, self.next_ant_id, self.next_tower_id))
+
+    def _xor_hash(self, key: int) -> None:
+        self._log_attr(self, "_hash")
+        self._hash ^= key
+
+    def _set_item(self, tag: int, lst: list[int], idx: int, value: int) -> None:
+        self._log_item(lst, idx)
+        if self._hash is not None:
+            self._xor_hash(hash((tag, idx, lst[idx])) ^ hash((tag, idx, value)))
+        lst[idx] = value
+
+    def _mark_operated(self, id: int) -> None:
+        self._log_append(self.operated_tower_id)
+        self.operated_tower_id.append(id)
+        if self._hash is not None:
+            self._xor_hash(hash((_OPERATED, id)))
+
+    def checkpoint(self) -> int:
+        """
+        开始（或继续）记录撤销日志，并返回当前的检查点。
+
+        记录期间，:meth:`apply_operation` 、:meth:`simulate_next_round` 以及各个“未检查”的局面操作API都会记录可逆的改动，
+        之后可以用 :meth:`rollback` 回到任意一个检查点，耗时只与其间的改动量有关。适用于深度优先搜索中的make/unmake模式。
+        注意直接修改各个字段的改动不会被记录。
+
+        :return: 检查点，可以传给 :meth:`rollback`
+        """
+        if self._journal is None:
+            self._journal = []
+        return len(self._journal)
+
+    def rollback(self, checkpoint: int) -> None:
+        """
+        撤销检查点之后的所有改动。检查点本身仍然有效，可以多次回滚到同一个检查点。
+
+        :param checkpoint: 由 :meth:`checkpoint` 返回的检查点
+        """
+        journal = self._journal
+        while len(journal) > checkpoint:
+            fn, obj, key, old = journal.pop()
+            fn(obj, key, old)
+
+    def end_journal(self) -> None:
+        """停止记录撤销日志并丢弃已有的日志，之前的检查点全部失效。"""
+        self._journal = None
+
+    def _log_attr(self, obj, name: str) -> None:
+        if self._journal is not None:
+            self._journal.append((setattr, obj, name, getattr(obj, name)))
+
+    def _log_item(self, lst: list, idx: int) -> None:
+        if self._journal is not None:
+            self._journal.append((operator.setitem, lst, idx, lst[idx]))
+
+    def _log_append(self, lst: list) -> None:
+        if self._journal is not None:
+            self._journal.append((_truncate, lst, len(lst), None))
+
+    def _log_object(self, obj) -> None:
+        if self._journal is not None:
+            self._journal.append((_restore_dict, obj, obj.__dict__.copy(), None))
+
+    def _log_pheromone(self, p: Pheromone) -> None:
+        if self._journal is not None:
+            self._journal.append((_restore_dict, p, p.__dict__.copy(), None))
+            # 强制下一次修改先复制，保证日志中引用的旧数组不被原地改写
+            p._shared = True
+
+    def init_with_seed(self, seed: int, pheromone_type: type[Pheromone] = Pheromone) -> None:
+        """初始化双方信息素。可以通过 ``pheromone_type`` 选择信息素的实现，如 :class:`.pheromone.NumpyPheromone` 。"""
+        p0, p1 = generate_init_pheromone(seed, pheromone_type)
         self.phero = [p0, p1]
 
+    def fork(self, isolated: bool = False) -> "GameState":
+        """
+        快速复制出一个完全独立的游戏状态，用于搜索或模拟，远快于 ``copy.deepcopy`` 。
+
+        蚂蚁、防御塔和超级武器对象都会被浅复制。双方信息素采用写时复制，在某一方第一次修改或通过
+        :attr:`.pheromone.Pheromone.value` 取得数组之前与原状态共享数组。蚂蚁路径列表同样先共享，
+        两边的蚂蚁在 :meth:`simulate_next_round` 中第一次移动时各自复制一份，之后原地追加。
+        在 :meth:`checkpoint` 之后复制时，路径列表会立即复制一份，以免回滚影响副本。
+
+        因此通过各个API以及 ``phero[p].value`` 所做的修改都是完全独立的。唯一的例外是原地修改 ``ant.path`` ：
+        路径列表可能仍与其他局面共享，如果要手动修改路径，请替换整个列表而不是原地修改。同理，坐标对象也是共享的。
+
+        ``isolated`` 为真时会另外复制全部坐标、蚂蚁路径和信息素数组，副本上的任何原地修改都不会影响原局面，
+        适合把局面交给不受信任的代码（例如 :func:`.arena.play_match` 中的决策函数）。耗时与蚂蚁路径的总长度成正比。
+
+        :param isolated: 是否复制全部可变的共享部分
+        :return: 新的游戏状态
+        """
+        state = _shallow_clone(self)
+        ants = []
+        journaling = self._journal is not None
+        for ant in self.ants:
+            if journaling:
+                # 回滚会原地截断检查点之后追加过的路径列表，不能与副本共享
+                clone = _shallow_clone(ant)
+                clone.path = ant.path[:]
+                clone.__dict__.pop("_path_shared", None)
+            else:
+                if not isolated:
+                    ant._path_shared = True
+                clone = _shallow_clone(ant)
+            ants.append(clone)
+        state.ants = ants
+        state.towers = [_shallow_clone(tower) for tower in self.towers]
+        state.coin = self.coin[:]
+        state.hp = self.hp[:]
+        state.active_super_weapon = [_shallow_clone(sw) for sw in self.active_super_weapon]
+        state.super_weapon_cd = [cd[:] for cd in self.super_weapon_cd]
+        state.phero = [p.copy() for p in self.phero]
+        state.gen_speed_lv = self.gen_speed_lv[:]
+        state.ant_maxhp_lv = self.ant_maxhp_lv[:]
+        state.operated_tower_id = self.operated_tower_id[:]
+        state._journal = None
+        state._profile = None
+        if isolated:
+            for obj in state.ants + state.towers + state.active_super_weapon:
+                obj.coord = Coord(obj.coord.x, obj.coord.y)
+            for ant in state.ants:
+                ant.path = [Coord(c.x, c.y) for c in ant.path]
+                ant.__dict__.pop("_path_shared", None)
+            for p in state.phero:
+                p._own()
+        return state
+
     def ant_idx_of_id(self, id: int) -> int:
         """根据蚂蚁ID编号获取在``ants``数组中的位置。若没有找到，返回-1"""
         return _find_idx_by_id(self.ants, id)
@@ -101,8 +400,14 @@ class GameState:
             return None
         t = Tower(self.next_tower_id, player, coord, TowerType.BASIC, 0)
         t.reset_cd()
+        self._log_append(self.towers)
         self.towers.append(t)
+        if self._hash is not None:
+            self._xor_hash(_tower_key(t) ^ self._counters_key())
+        self._log_attr(self, "next_tower_id")
         self.next_tower_id += 1
+        if self._hash is not None:
+            self._xor_hash(self._counters_key())
         return t
 
     def upgrade_tower(self, id: int, ttype: TowerType) -> Optional[Tower]:
@@ -112,8 +417,13 @@ class GameState:
             return None
         if not can_tower_upgrade_to(t.type, ttype):
             return None
+        self._log_object(t)
+        if self._hash is not None:
+            self._xor_hash(_tower_key(t))
         t.type = ttype
         t.reset_cd()
+        if self._hash is not None:
+            self._xor_hash(_tower_key(t))
         return t
 
     def downgrade_tower(self, id: int) -> Optional[Tower]:
@@ -121,11 +431,19 @@ class GameState:
         t = self.tower_of_id(id)
         if t is None:
             return None
+        if self._hash is not None:
+            self._xor_hash(_tower_key(t))
         if t.type == TowerType.BASIC:
-            self.towers.pop(self.tower_idx_of_id(id))
+            idx = self.tower_idx_of_id(id)
+            if self._journal is not None:
+                self._journal.append((list.insert, self.towers, idx, t))
+            self.towers.pop(idx)
         else:
+            self._log_object(t)
             t.type = TowerType(t.type // 10)
             t.reset_cd()
+            if self._hash is not None:
+                self._xor_hash(_tower_key(t))
         return t
 
     def build_tower_cost(self, player: int) -> int:
@@ -157,14 +475,14 @@ class GameState:
         """升级对应玩家的蚂蚁生成速度。不检查/处理金币约束，仅有最高等级限制。"""
         if self.gen_speed_lv[player] >= 2:
             return False
-        self.gen_speed_lv[player] += 1
+        self._set_item(_GEN_SPEED, self.gen_speed_lv, player, self.gen_speed_lv[player] + 1)
         return True
 
     def upgrade_ant_maxhp(self, player: int) -> bool:
         """升级对应玩家的蚂蚁最大血量。不检查/处理金币约束，仅有最高等级限制。"""
         if self.ant_maxhp_lv[player] >= 2:
             return False
-        self.ant_maxhp_lv[player] += 1
+        self._set_item(_ANT_MAXHP, self.ant_maxhp_lv, player, self.ant_maxhp_lv[player] + 1)
         return True
 
     def deploy_super_weapon(
@@ -179,9 +497,17 @@ class GameState:
                                 and distance(ant.coord, coord) <= sw.range(),
                     self.ants,
             ):
+                self._log_attr(ant, "evasion_count")
+                if self._hash is not None:
+                    self._xor_hash(_ant_key(ant))
                 ant.evasion_count += sw.duration
+                if self._hash is not None:
+                    self._xor_hash(_ant_key(ant))
         else:
+            self._log_append(self.active_super_weapon)
             self.active_super_weapon.append(sw)
+            if self._hash is not None:
+                self._xor_hash(_super_weapon_key(sw))
         return True
 
     def check_in_emp_range(self, player: int, coord: Coord) -> bool:
@@ -197,23 +523,24 @@ class GameState:
 
     def set_coin(self, player: int, new_coin: int) -> None:
         """直接设置指定玩家的金币数量"""
-        self.coin[player] = new_coin
+        self._set_item(_COIN, self.coin, player, new_coin)
 
     def update_coin(self, player: int, delta: int) -> None:
         """更新指定玩家的金币数量"""
-        self.coin[player] += delta
+        self._set_item(_COIN, self.coin, player, self.coin[player] + delta)
 
     def set_hp(self, player: int, new_hp: int) -> None:
         """直接设置指定玩家的主基地血量"""
-        self.hp[player] = new_hp
+        self._set_item(_HP, self.hp, player, new_hp)
 
     def update_hp(self, player: int, delta: int) -> None:
         """更新指定玩家的主基地血量"""
-        self.hp[player] += delta
+        self._set_item(_HP, self.hp, player, self.hp[player] + delta)
 
     def pheromone_decay(self) -> None:
         """对双方信息素做全局衰减"""
         for p in self.phero:
+            self._log_pheromone(p)
             p.decay()
 
     def is_operation_valid(self, player: int, op: Operation) -> bool:
@@ -231,6 +558,8 @@ class GameState:
         :param dry_run: 如果为``True``，那么只检查有效性而并不会实际影响内部状态。
         :return: 操作是否有效
         """
+        if self._profile is not None:
+            self._profile.count_operation(op.type)
         c = Coord(op.arg0, op.arg1)
         if op.type == OperationType.BUILD_TOWER:
             cost = self.build_tower_cost(player)
@@ -242,8 +571,8 @@ class GameState:
             )
             if valid and not dry_run:
                 tower = self.build_tower(player, c)
-                self.operated_tower_id.append(tower.id)
-                self.coin[player] -= cost
+                self._mark_operated(tower.id)
+                self.update_coin(player, -cost)
             return valid
         if op.type == OperationType.UPGRADE_TOWER:
             t = self.tower_of_id(op.arg0)
@@ -258,9 +587,9 @@ class GameState:
                     and can_tower_upgrade_to(t.type, newtype)
             )
             if valid and not dry_run:
-                self.operated_tower_id.append(t.id)
+                self._mark_operated(t.id)
                 self.upgrade_tower(op.arg0, TowerType(op.arg1))
-                self.coin[player] -= cost
+                self.update_coin(player, -cost)
             return valid
         if op.type == OperationType.DOWNGRADE_TOWER:
             t = self.tower_of_id(op.arg0)
@@ -271,9 +600,9 @@ class GameState:
                     and not self.check_in_emp_range(player, c)
             )
             if valid and not dry_run:
-                self.operated_tower_id.append(t.id)
+                self._mark_operated(t.id)
                 self.downgrade_tower(op.arg0)
-                self.coin[player] += self.downgrade_tower_income(op.arg0)
+                self.update_coin(player, self.downgrade_tower_income(op.arg0))
             return valid
 
         def check_and_deploy(player: int, swtype: SuperWeaponType) -> bool:
@@ -284,10 +613,13 @@ class GameState:
             ):
                 if not dry_run:
                     self.deploy_super_weapon(player, c, swtype)
-                    self.coin[player] -= cost
-                    self.super_weapon_cd[player][
-                        swtype.value - 1
-                        ] = SuperWeapon.config_of_type(swtype).cd
+                    self.update_coin(player, -cost)
+                    self._set_item(
+                        _SW_CD[player],
+                        self.super_weapon_cd[player],
+                        swtype.value - 1,
+                        SuperWeapon.config_of_type(swtype).cd,
+                    )
                 return True
             return False
 
@@ -300,22 +632,185 @@ class GameState:
         if op.type == OperationType.DEPLOY_EMERGENCY_EVASION:
             return check_and_deploy(player, SuperWeaponType.EMERGENCY_EVASION)
 
-        def check_and_upgrade_hq(player: int, level_array: list[int]) -> bool:
+        def check_and_upgrade_hq(player: int, level_array: list[int], tag: int) -> bool:
             cost = Ant.upgrade_cost(level_array[player])
             if self.coin[player] >= cost:
                 if not dry_run:
-                    level_array[player] += 1
-                    self.coin[player] -= cost
+                    self._set_item(tag, level_array, player, level_array[player] + 1)
+                    self.update_coin(player, -cost)
                 return True
             return False
 
         if op.type == OperationType.UPGRADE_GENERATE_SPEED:
-            return check_and_upgrade_hq(player, self.gen_speed_lv)
+            return check_and_upgrade_hq(player, self.gen_speed_lv, _GEN_SPEED)
         if op.type == OperationType.UPGRADE_ANT_MAXHP:
-            return check_and_upgrade_hq(player, self.ant_maxhp_lv)
+            return check_and_upgrade_hq(player, self.ant_maxhp_lv, _ANT_MAXHP)
 
         return False
 
+    def operation_error(self, player: int, op: Operation) -> Optional[str]:
+        """
+        说明给定操作为什么无效。检查的条件和顺序与 :meth:`apply_operation` 相同，返回第一个不满足的条件。
+
+        :param player: 执行操作的玩家
+        :param op: 需要检查的操作
+        :return: 无效的原因，操作有效时返回 ``None``
+        """
+        c = Coord(op.arg0, op.arg1)
+        coin = self.coin[player]
+        if op.type == OperationType.BUILD_TOWER:
+            if coin < self.build_tower_cost(player):
+                return "not enough coin"
+            if not is_player_highland(c, player):
+                return "not a highland of the player"
+            if self.tower_at(c) is not None:
+                return "cell already has a tower"
+            if self.check_in_emp_range(player, c):
+                return "blocked by enemy EMP"
+            return None
+        if op.type in (OperationType.UPGRADE_TOWER, OperationType.DOWNGRADE_TOWER):
+            upgrade = op.type == OperationType.UPGRADE_TOWER
+            if upgrade and op.arg1 not in _TOWER_TYPE_VALUES:
+                return "unknown tower type"
+            t = self.tower_of_id(op.arg0)
+            if t is None:
+                return "no such tower"
+            if t.id in self.operated_tower_id:
+                return "tower already operated this round"
+            if t.player != player:
+                return "tower belongs to the enemy"
+            if upgrade and coin < self.upgrade_tower_cost(TowerType(op.arg1)):
+                return "not enough coin"
+            if self.check_in_emp_range(player, c):
+                return "blocked by enemy EMP"
+            if upgrade and not can_tower_upgrade_to(t.type, TowerType(op.arg1)):
+                return "cannot upgrade to this type"
+            return None
+        for swtype, op_type in _DEPLOY_OPS:
+            if op.type == op_type:
+                if coin < SuperWeapon.config_of_type(swtype).cost:
+                    return "not enough coin"
+                if self.super_weapon_cd[player][swtype.value - 1] != 0:
+                    return "super weapon on cooldown"
+                return None
+        if op.type in (OperationType.UPGRADE_GENERATE_SPEED, OperationType.UPGRADE_ANT_MAXHP):
+            levels = self.gen_speed_lv if op.type == OperationType.UPGRADE_GENERATE_SPEED else self.ant_maxhp_lv
+            if levels[player] >= 2:
+                return "already at max level"
+            if coin < Ant.upgrade_cost(levels[player]):
+                return "not enough coin"
+            return None
+        return "unknown operation type"
+
+    def apply_operations(self, player: int, ops: list[Operation], atomic: bool = True) -> BatchResult:
+        """
+        用指定玩家的身份依次执行一组操作。每个操作都在前面的操作执行之后的局面上检查，因此金币、随防御塔数量增长的建造花费、
+        每回合每座防御塔只能操作一次等约束都是累积计算的。
+
+        ``atomic`` 为真时，只要有一个操作无效，就用撤销日志回滚整组操作，局面保持不变，耗时只与已执行的改动量有关；
+        否则与 :meth:`.controller.GameController.try_apply_our_ops` 一样，保留第一个无效操作之前的部分。
+        外部已经通过 :meth:`checkpoint` 开启撤销日志时，执行的改动同样会被记录，之前的检查点仍然有效。
+
+        :param player: 执行操作的玩家
+        :param ops: 需要执行的操作
+        :param atomic: 是否全部执行或全部不执行
+        :return: 执行结果
+        """
+        journaling = self._journal is not None
+        mark = self.checkpoint() if atomic else 0
+        result = BatchResult(len(ops))
+        for i, op in enumerate(ops):
+            try:
+                valid = self.apply_operation(player, op)
+            except (ValueError, IndexError):
+                # 未知的防御塔类型或满级后的主基地升级，此时局面尚未被修改
+                valid = False
+            if not valid:
+                result = BatchResult(i, i, self.operation_error(player, op) or "invalid operation")
+                if atomic:
+                    self.rollback(mark)
+                    result.applied = 0
+                break
+        if atomic and not journaling:
+            self.end_journal()
+        return result
+
+    def legal_operations(self, player: int, types: Optional[Iterable[OperationType]] = None) -> list[Operation]:
+        """
+        某一方当前所有有效的单个操作，与逐个调用 :meth:`is_operation_valid` 的结果相同，但只需遍历一次局面。
+        参见 :meth:`iter_legal_operations` 。
+
+        :param player: 执行操作的玩家
+        :param types: 只生成这些类型的操作，默认为全部类型
+        :return: 有效操作的列表
+        """
+        return list(self.iter_legal_operations(player, types))
+
+    def iter_legal_operations(
+            self, player: int, types: Optional[Iterable[OperationType]] = None
+    ) -> Iterator[Operation]:
+        """
+        逐个生成某一方当前所有有效的单个操作。依次为建造、升级、降级防御塔，部署超级武器和升级主基地；
+        超级武器的部署位置为地图范围内的全部格点。
+
+        操作是逐个生成的，搜索中只需要前若干个操作时可以提前停止。遍历期间请不要修改局面。
+        每个操作都是相对于当前局面有效的，同时执行多个操作时请使用 :meth:`apply_operation` 逐个检查。
+
+        :param player: 执行操作的玩家
+        :param types: 只生成这些类型的操作，默认为全部类型
+        """
+        wanted = set(OperationType) if types is None else set(types)
+        coin = self.coin[player]
+        emps = [
+            sw.coord for sw in self.active_super_weapon
+            if sw.player != player and sw.type == SuperWeaponType.EMP_BLASTER
+        ]
+        emp_range = SuperWeapon.config_of_type(SuperWeaponType.EMP_BLASTER).range
+
+        def in_emp_range(c: Coord) -> bool:
+            return any(distance(c, e) <= emp_range for e in emps)
+
+        own = [t for t in self.towers if t.player == player]
+        operated = set(self.operated_tower_id)
+
+        if OperationType.BUILD_TOWER in wanted and coin >= 15 * 2 ** len(own):
+            occupied = {t.coord.x * 19 + t.coord.y for t in self.towers}
+            emp_cells = [e.x * 19 + e.y for e in emps]
+            for cell in player_highland_cells[player]:
+                if cell not in occupied and all(distance_of(cell, e) > emp_range for e in emp_cells):
+                    yield Operation(OperationType.BUILD_TOWER, cell // 19, cell % 19)
+
+        # 与 apply_operation 一致，升级和降级操作以 (arg0, arg1) 作为坐标检查EMP
+        if OperationType.UPGRADE_TOWER in wanted:
+            for t in own:
+                if t.id in operated:
+                    continue
+                for newtype in _UPGRADE_TARGETS[t.type]:
+                    if coin >= self.upgrade_tower_cost(newtype) and not in_emp_range(Coord(t.id, newtype.value)):
+                        yield Operation(OperationType.UPGRADE_TOWER, t.id, newtype.value)
+        if OperationType.DOWNGRADE_TOWER in wanted:
+            for t in own:
+                op = Operation(OperationType.DOWNGRADE_TOWER, t.id)
+                if t.id not in operated and not in_emp_range(Coord(op.arg0, op.arg1)):
+                    yield op
+
+        for swtype, op_type in _DEPLOY_OPS:
+            if (
+                    op_type in wanted
+                    and coin >= SuperWeapon.config_of_type(swtype).cost
+                    and self.super_weapon_cd[player][swtype.value - 1] == 0
+            ):
+                for x, y in _IN_MAP_XY:
+                    yield Operation(op_type, x, y)
+
+        # 满级之后 Ant.upgrade_cost 没有定义，apply_operation 会抛出异常，因此不生成
+        for op_type, level in (
+                (OperationType.UPGRADE_GENERATE_SPEED, self.gen_speed_lv[player]),
+                (OperationType.UPGRADE_ANT_MAXHP, self.ant_maxhp_lv[player]),
+        ):
+            if op_type in wanted and level < 2 and coin >= Ant.upgrade_cost(level):
+                yield Operation(op_type)
+
     def search_attack_target(
             self, player: int, coord: Coord, trange: int, skip: int = -1
     ) -> Optional[Ant]:
@@ -329,6 +824,27 @@ class GameState:
         :param skip: 是否跳过特定编号的蚂蚁。用于``Double``防御塔必须一次锁定两个不同的目标。默认为-1即并不跳过任何蚂蚁。
         :return: 返回锁定的目标蚂蚁。若攻击范围内没有可用目标，则返回``None``。
         """
+        if self._profile is not None:
+            self._profile.count("target_searches")
+        index = self._ant_index
+        if index is not None:
+            if not index:
+                return None
+            for ring in rings(cell_of(coord), trange):
+                target = None
+                for cell in ring:
+                    for ant in index.get(cell, ()):
+                        if (
+                                ant.player != player
+                                and ant.id != skip
+                                and ant.hp > 0
+                                and (target is None or ant.id < target.id)
+                        ):
+                            target = ant
+                if target is not None:
+                    return target
+            return None
+
         target: Optional[Ant] = None
         min_dist = 0
         for ant in self.ants:
@@ -349,6 +865,8 @@ class GameState:
         return target
 
     def _try_attack_ant(self, ant: Ant, damage: int):
+        if self._profile is not None:
+            self._profile.count("ant_attacks")
         if ant.evasion_count > 0:
             ant.evasion_count -= 1
         else:
@@ -366,14 +884,22 @@ class GameState:
                 ant.state = AntState.FAIL
                 self.coin[1 - ant.player] += Ant.coin_of_level(ant.level)
 
+    def _ants_in_range(self, center: Coord, radius: int) -> list[Ant]:
+        # 按ID顺序返回范围内的蚂蚁，攻击阶段使用格点索引，否则遍历全部蚂蚁
+        index = self._ant_index
+        if index is None:
+            return [ant for ant in self.ants if distance(ant.coord, center) <= radius]
+        result = []
+        for ring in rings(cell_of(center), radius):
+            for cell in ring:
+                result.extend(index.get(cell, ()))
+        result.sort(key=lambda ant: ant.id)
+        return result
+
     def _aoe_attack_ant(self, player: int, center: Coord, radius: int, damage: int):
-        for ant in filter(
-                lambda ant: ant.player != player
-                            and ant.hp > 0
-                            and distance(ant.coord, center) <= radius,
-                self.ants,
-        ):
-            self._try_attack_ant(ant, damage)
+        for ant in self._ants_in_range(center, radius):
+            if ant.player != player and ant.hp > 0:
+                self._try_attack_ant(ant, damage)
 
     def simulate_next_round(self) -> None:
         """
@@ -390,36 +916,97 @@ class GameState:
             2. 解除蚂蚁冰冻状态
             3. 更新回合数和金币数
             4. 检查各个超级武器是否还在生效
+
+        开启性能剖析后会记录以上各阶段的耗时，参见 :meth:`enable_profiling` 。
         """
+        prof = self._profile
+        if prof is None:
+            self._simulate_next_round(None)
+            return
+        _count_distance_calls(True)
+        _distance_calls.calls = 0
+        try:
+            self._simulate_next_round(prof)
+        finally:
+            prof.count("distance_calls", _distance_calls.calls)
+            _distance_calls.calls = None
+            _count_distance_calls(False)
+
+    def _simulate_next_round(self, prof: Optional[Profile]) -> None:
+        # 记录撤销日志时只记录实际被修改的对象：每只蚂蚁每回合都会变老，因此在这里记录一次；
+        # 防御塔、超级武器和冷却时间在各自被修改时才记录。金币和血量只有两项，整体记录。
+        log = self._journal is not None
+        if log:
+            journal = self._journal
+            for lst in [self.coin, self.hp]:
+                journal.append((_restore_items, lst, lst[:], None))
+            for p in self.phero:
+                self._log_pheromone(p)
+        # 增量维护哈希：先移除会变化的部分，结算结束后再加入新值。防御塔和冷却时间在变化时就地更新
+        h = self._hash
+        hashing = h is not None
+        if hashing:
+            h ^= self._counters_key()
+            for tag, lst in [(_COIN, self.coin), (_HP, self.hp)]:
+                for idx, value in enumerate(lst):
+                    h ^= hash((tag, idx, value))
+        if prof is not None:
+            prof.begin_round()
+
+        # 蚂蚁在攻击阶段不会移动，因此在这里建立一次格点索引，供闪电风暴和防御塔索敌使用
+        self._ant_index = index = {}
         for ant in self.ants:
+            if log:
+                self._log_object(ant)
+            if hashing:
+                h ^= _ant_key(ant)
             ant.age += 1
+            cell = ant.coord.x * 19 + ant.coord.y
+            if cell in index:
+                index[cell].append(ant)
+            else:
+                index[cell] = [ant]
+        if prof is not None:
+            prof.lap("aging")
 
         # 1. lightning storm
         for lightning in filter(
                 lambda sw: sw.type == SuperWeaponType.LIGHTNING_STORM,
                 self.active_super_weapon,
         ):
-            for ant in filter(
-                    lambda ant: ant.hp > 0 and ant.player != lightning.player
-                                and distance(ant.coord, lightning.coord) <= lightning.range(),
-                    self.ants,
-            ):
+            for ant in self._ants_in_range(lightning.coord, lightning.range()):
+                if ant.hp <= 0 or ant.player == lightning.player:
+                    continue
                 ant.hp -= 100
                 ant.state = AntState.FAIL
                 self.coin[1 - ant.player] += Ant.coin_of_level(ant.level)
+        if prof is not None:
+            prof.lap("lightning")
 
         # 2. tower attack
         for tower in self.towers:
             if self.check_in_emp_range(tower.player, tower.coord):
                 continue
             if tower.cd > 0:
+                if log:
+                    self._log_attr(tower, "cd")
+                if hashing:
+                    h ^= _tower_key(tower)
                 tower.cd -= 1
+                if hashing:
+                    h ^= _tower_key(tower)
             if tower.cd > 0:
                 continue
             target = self.search_attack_target(tower.player, tower.coord, tower.range())
             if target is None:
                 continue
+            if log:
+                self._log_attr(tower, "cd")
+            if hashing:
+                h ^= _tower_key(tower)
             tower.reset_cd()
+            if hashing:
+                h ^= _tower_key(tower)
             # QUICK_PLUS
             if tower.type == TowerType.QUICK_PLUS:
                 self._try_attack_ant(target, tower.damage())
@@ -453,22 +1040,37 @@ class GameState:
                     tower.player, target.coord, tower.aoe(), tower.damage()
                 )
 
+        self._ant_index = None
+        if prof is not None:
+            prof.lap("tower_attack")
+
         # 3. filter too-old
         for too_old_ant in filter(
                 lambda ant: ant.hp > 0 and ant.age > Ant.max_age(), self.ants
         ):
             too_old_ant.state = AntState.TOO_OLD
+        if prof is not None:
+            prof.lap("too_old")
+            prof.count("ants_moved", sum(1 for ant in self.ants if ant.state == AntState.ALIVE))
 
         # 4. ant move
         for ant in filter(lambda ant: ant.state == AntState.ALIVE, self.ants):
             direction = self.phero[ant.player].next_move_direction(ant)
             new_coord = neighbor(ant.coord, direction)
             ant.coord = new_coord
-            ant.path.append(new_coord)
+            if ant._path_shared:
+                # fork之后第一次移动：复制一次路径，之后原地追加
+                ant.path = ant.path + [new_coord]
+                del ant._path_shared
+            else:
+                self._log_append(ant.path)
+                ant.path.append(new_coord)
             if new_coord == headquarter_coord(1 - ant.player):
                 ant.state = AntState.SUCCESS
                 self.coin[ant.player] += 5
                 self.hp[1 - ant.player] -= 1
+        if prof is not None:
+            prof.lap("movement")
 
         # 5. pheromone update
         for p in self.phero:
@@ -480,10 +1082,13 @@ class GameState:
                 self.phero[ant.player].modify_by_too_old_ant(ant)
             if ant.state == AntState.SUCCESS:
                 self.phero[ant.player].modify_by_success_ant(ant)
+        if prof is not None:
+            prof.lap("pheromone")
 
         # 6. generate new ant
         for player in range(2):
             if self.round % Ant.gen_speed_of_level(self.gen_speed_lv[player]) == 0:
+                self._log_append(self.ants)
                 self.ants.append(
                     Ant(
                         self.next_ant_id,
@@ -498,9 +1103,15 @@ class GameState:
                         [headquarter_coord(player)],
                     )
                 )
+                self._log_attr(self, "next_ant_id")
                 self.next_ant_id += 1
+        if prof is not None:
+            prof.lap("spawn")
 
         # 7. final update
+        if log:
+            for name in ["ants", "active_super_weapon", "operated_tower_id", "round", "_hash"]:
+                self._log_attr(self, name)
         self.round += 1
         self.coin[0] += 1
         self.coin[1] += 1
@@ -510,16 +1121,119 @@ class GameState:
         self.ants = list(filter(lambda ant: ant.state == AntState.ALIVE, self.ants))
 
         for sw in self.active_super_weapon:
+            if log:
+                self._log_attr(sw, "duration")
+            if hashing:
+                h ^= _super_weapon_key(sw)
             sw.duration -= 1
         self.active_super_weapon = list(
             filter(lambda sw: sw.duration > 0, self.active_super_weapon)
         )
 
-        for p in range(2):
+        for p, cds in enumerate(self.super_weapon_cd):
             for sw in range(4):
-                self.super_weapon_cd[p][sw] = max(0, self.super_weapon_cd[p][sw] - 1)
-
+                if cds[sw] > 0:
+                    self._log_item(cds, sw)
+                    if hashing:
+                        h ^= hash((_SW_CD[p], sw, cds[sw])) ^ hash((_SW_CD[p], sw, cds[sw] - 1))
+                    cds[sw] -= 1
+
+        if hashing:
+            for id in self.operated_tower_id:
+                h ^= hash((_OPERATED, id))
+            for ant in self.ants:
+                h ^= _ant_key(ant)
+            for sw in self.active_super_weapon:
+                h ^= _super_weapon_key(sw)
+            for tag, lst in [(_COIN, self.coin), (_HP, self.hp)]:
+                for idx, value in enumerate(lst):
+                    h ^= hash((tag, idx, value))
+            self._hash = h ^ self._counters_key()
         self.operated_tower_id = []
+        if prof is not None:
+            prof.lap("cleanup")
+            prof.end_round()
+
+    def round_digest(self) -> int:
+        """
+        与 :meth:`.protocol.RoundInfo.digest` 对应的局面摘要，只包含回合信息中出现的字段。
+        每回合结算后与评测机发来的回合信息比较，就可以低成本地发现本地局面与评测机不一致。
+
+        :return: 摘要，参见 :func:`.protocol.round_digest`
+        """
+        tower_values = [v for t in self.towers for v in (t.id, t.player, t.coord.x, t.coord.y, t.type, t.cd)]
+        ant_values = [
+            v for a in self.ants
+            for v in (a.id, a.player, a.coord.x, a.coord.y, a.hp, a.level, a.age, a.state)
+        ]
+        return round_digest(tower_values, ant_values, self.coin, self.hp)
+
+    def diff_round_info(self, info: RoundInfo) -> list[str]:
+        """
+        逐项比较局面与回合信息，列出所有不一致之处。比 :meth:`round_digest` 慢得多，适合在摘要不一致时调用。
+
+        :param info: 评测机发来的回合信息
+        :return: 描述差异的文字，每项一行。一致时为空列表。
+        """
+        diff = []
+        for name, ours, theirs in [("coin", self.coin, info.coin), ("hp", self.hp, info.hp)]:
+            if tuple(ours) != tuple(theirs):
+                diff.append(f"{name}: local {tuple(ours)} judger {tuple(theirs)}")
+
+        def compare(kind: str, local: list, remote: list, fields: list[str]) -> None:
+            local_by_id = {e.id: e for e in local}
+            remote_by_id = {e.id: e for e in remote}
+            for id in sorted(local_by_id.keys() | remote_by_id.keys()):
+                a, b = local_by_id.get(id), remote_by_id.get(id)
+                if b is None:
+                    diff.append(f"{kind} {id}: only in local state")
+                elif a is None:
+                    diff.append(f"{kind} {id}: only in round info")
+                else:
+                    for f in fields:
+                        va, vb = getattr(a, f), getattr(b, f)
+                        if va != vb:
+                            diff.append(f"{kind} {id}: {f} local {va!r} judger {vb!r}")
+
+        compare("tower", self.towers, info.towers, ["player", "coord", "type", "cd"])
+        compare("ant", self.ants, info.ants, ["player", "coord", "hp", "level", "age", "state"])
+        return diff
+
+    def sync_from_round_info(self, info: RoundInfo) -> None:
+        """
+        以回合信息为准修正局面中的防御塔、蚂蚁、金币和血量。
+
+        回合信息中没有的内容保持不变：已有蚂蚁的路径会在位置变化时补上新位置，新出现的蚂蚁以当前位置作为路径起点；
+        信息素、超级武器和基地等级无法从回合信息中恢复。
+
+        :param info: 评测机发来的回合信息
+        """
+        self._log_attr(self, "towers")
+        self._log_attr(self, "ants")
+        self._log_attr(self, "next_tower_id")
+        self._log_attr(self, "next_ant_id")
+        for lst in (self.coin, self.hp):
+            if self._journal is not None:
+                self._journal.append((_restore_items, lst, lst[:], None))
+        self.towers = [Tower(t.id, t.player, t.coord, TowerType(t.type), t.cd) for t in info.towers]
+        old_ants = {a.id: a for a in self.ants}
+        ants = []
+        for a in info.ants:
+            old = old_ants.get(a.id)
+            if old is None:
+                path = [a.coord]
+                evasion = 0
+            else:
+                path = old.path[:] if old.coord == a.coord else old.path + [a.coord]
+                evasion = old.evasion_count
+            ants.append(Ant(a.id, a.player, a.hp, Ant.maxhp_of_level(a.level), a.coord, a.level, a.age, evasion,
+                            AntState(a.state), path))
+        self.ants = ants
+        self.coin[:] = info.coin
+        self.hp[:] = info.hp
+        self.next_tower_id = max([self.next_tower_id] + [t.id + 1 for t in self.towers])
+        self.next_ant_id = max([self.next_ant_id] + [a.id + 1 for a in self.ants])
+        self.invalidate_state_key()
 
     def dump_mini_replay(self) -> str:
         """
@@ -545,8 +1259,53 @@ class GameState:
         output += f"{self.coin[0]} {self.coin[1]}\n"
         output += f"{self.hp[0]} {self.hp[1]}\n"
         for p in self.phero:
-            for row in p.value:
+            for row in p.value_view():
                 output += " ".join(map(lambda value: f"{value:.4f}", row))
                 output += "\n"
 
         return output
+
+    @classmethod
+    def from_mini_replay(cls, text: str, pheromone_type: type[Pheromone] = Pheromone) -> "GameState":
+        """
+        从 :meth:`dump_mini_replay` 输出的一个回合的迷你回放中恢复局面。
+
+        迷你回放并不包含完整的局面：信息素只保留了四位小数，蚂蚁路径只恢复为当前位置，紧急回避次数、超级武器、冷却时间和基地等级
+        都恢复为初始值，下一个ID取已有ID的最大值加一。因此恢复的局面适合分析，而不能保证继续模拟的结果与原对局一致。
+        解析多个回合拼接而成的文本或文件时，请使用 :func:`.replay.iter_mini_replays` 。
+
+        :param text: 一个回合的迷你回放
+        :param pheromone_type: 信息素的实现
+        :return: 恢复的局面
+        """
+        lines = text.split("\n")
+        pos = 0
+
+        def ints() -> list[int]:
+            nonlocal pos
+            pos += 1
+            return [int(v) for v in lines[pos - 1].split()]
+
+        state = cls()
+        state.round = ints()[0]
+        for _ in range(ints()[0]):
+            id, player, x, y, ttype, cd = ints()
+            state.towers.append(Tower(id, player, Coord(x, y), TowerType(ttype), cd))
+        for _ in range(ints()[0]):
+            id, player, x, y, hp, level, age, ant_state = ints()
+            coord = Coord(x, y)
+            state.ants.append(
+                Ant(id, player, hp, Ant.maxhp_of_level(level), coord, level, age, 0, AntState(ant_state), [coord])
+            )
+        state.coin = ints()
+        state.hp = ints()
+        values = list(map(float, " ".join(lines[pos:pos + 38]).split()))
+        phero = []
+        for k in range(2):
+            p = pheromone_type()
+            p.value = [values[k * 361 + i * 19:k * 361 + i * 19 + 19] for i in range(19)]
+            phero.append(p)
+        state.phero = phero
+        state.next_tower_id = max([t.id + 1 for t in state.towers], default=0)
+        state.next_ant_id = max([a.id + 1 for a in state.ants], default=0)
+        return state
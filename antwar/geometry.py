@@ -0,0 +1,164 @@
+"""
+地图几何预计算表。
+
+地图上的每个格点 ``(x, y)`` 用整数下标 ``x * 19 + y`` 表示，共361个。本模块在导入时一次性计算好格点之间的距离、
+各方向相邻格点以及地形等信息，:mod:`antwar.coord` 中基于 :class:`.coord.Coord` 的函数都以这些表为基础。
+需要批量计算时，直接使用下标与本模块的函数可以省去创建 :class:`.coord.Coord` 对象的开销。
+"""
+from typing import Iterable, Optional
+
+GRID_SIZE = 19  #: 地图数组的边长
+CELL_COUNT = GRID_SIZE * GRID_SIZE  #: 格点总数，包括地图范围之外的格点
+NO_CELL = -1  #: 表示超出19x19数组范围的下标
+
+_highland_map = [
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0],
+    [0, 0, 2, 2, 0, 1, 0, 0, 0, 2, 0, 0, 0, 1, 0, 2, 2, 0, 0],
+    [0, 0, 0, 2, 0, 0, 2, 2, 0, 2, 0, 2, 2, 0, 0, 2, 0, 0, 0],
+    [0, 2, 2, 0, 2, 0, 0, 2, 0, 2, 0, 2, 0, 0, 2, 0, 2, 2, 0],
+    [0, 2, 0, 0, 0, 2, 0, 0, 2, 0, 2, 0, 0, 2, 0, 0, 0, 2, 0],
+    [0, 0, 2, 0, 2, 0, 0, 2, 0, 0, 0, 2, 0, 0, 2, 0, 2, 0, 0],
+    [0, 1, 3, 0, 3, 1, 0, 1, 0, 1, 0, 1, 0, 1, 3, 0, 3, 1, 0],
+    [0, 0, 0, 0, 0, 0, 0, 3, 3, 0, 3, 3, 0, 0, 0, 0, 0, 0, 0],
+    [0, 3, 3, 0, 3, 3, 0, 0, 0, 0, 0, 0, 0, 3, 3, 0, 3, 3, 0],
+    [0, 3, 0, 0, 0, 0, 3, 3, 0, 3, 0, 3, 3, 0, 0, 0, 0, 3, 0],
+    [0, 0, 3, 3, 0, 0, 0, 3, 0, 3, 0, 3, 0, 0, 0, 3, 3, 0, 0],
+    [0, 0, 0, 3, 0, 1, 1, 0, 0, 3, 0, 0, 1, 1, 0, 3, 0, 0, 0],
+    [0, 0, 0, 0, 0, 1, 0, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+]
+
+_neighbor_delta = [
+    [[0, 1], [-1, 0], [0, -1], [1, -1], [1, 0], [1, 1]],
+    [[-1, 1], [-1, 0], [-1, -1], [0, -1], [1, 0], [0, 1]],
+]
+
+
+def cell_index(x: int, y: int) -> int:
+    """坐标对应的格点下标。超出19x19数组范围时返回 :data:`NO_CELL` 。"""
+    if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
+        return x * GRID_SIZE + y
+    return NO_CELL
+
+
+def cell_xy(cell: int) -> tuple[int, int]:
+    """格点下标对应的坐标"""
+    return divmod(cell, GRID_SIZE)
+
+
+def axial_distance(x0: int, y0: int, x1: int, y1: int) -> int:
+    """不查表、直接计算两个坐标之间的距离，对任意整数坐标都有效。"""
+    q0, r0 = y0, x0 - (y0 + (y0 & 1)) // 2
+    q1, r1 = y1, x1 - (y1 + (y1 & 1)) // 2
+    return (abs(q0 - q1) + abs(q0 + r0 - q1 - r1) + abs(r0 - r1)) // 2
+
+
+def _build_distance_table() -> list[int]:
+    xy = [cell_xy(c) for c in range(CELL_COUNT)]
+    return [axial_distance(x0, y0, x1, y1) for x0, y0 in xy for x1, y1 in xy]
+
+
+def _build_neighbor_table() -> list[int]:
+    table = []
+    for cell in range(CELL_COUNT):
+        x, y = cell_xy(cell)
+        for dx, dy in _neighbor_delta[y % 2]:
+            table.append(cell_index(x + dx, y + dy))
+    return table
+
+
+distance_table: list[int] = _build_distance_table()
+"""展平的距离矩阵，``distance_table[a * CELL_COUNT + b]`` 为格点 ``a`` 与 ``b`` 之间的距离"""
+
+neighbor_table: list[int] = _build_neighbor_table()
+"""展平的相邻格点表，``neighbor_table[cell * 6 + direction]`` 为对应方向的相邻格点下标，可能为 :data:`NO_CELL` """
+
+MAP_CENTER = cell_index(9, 9)  #: 地图中心的格点下标
+
+terrain: list[int] = [v for row in _highland_map for v in row]
+"""各格点的地形标记：0为平地，1为双方都不能建造防御塔的高台，2、3分别为玩家0、1的高台。地图范围之外的格点为0。"""
+
+in_map_mask: list[bool] = [
+    distance_table[MAP_CENTER * CELL_COUNT + c] <= 9 for c in range(CELL_COUNT)
+]
+"""各格点是否位于地图范围之内"""
+
+ant_can_go_mask: list[bool] = [in_map_mask[c] and terrain[c] == 0 for c in range(CELL_COUNT)]
+"""各格点是否为蚂蚁可以移动的区域"""
+
+highland_mask: list[bool] = [in_map_mask[c] and terrain[c] != 0 for c in range(CELL_COUNT)]
+"""各格点是否为高台"""
+
+in_map_cells: list[int] = [c for c in range(CELL_COUNT) if in_map_mask[c]]
+"""地图范围之内的全部格点下标，按下标升序"""
+
+player_highland_cells: list[list[int]] = [
+    [c for c in range(CELL_COUNT) if highland_mask[c] and terrain[c] == player + 2] for player in range(2)
+]
+"""双方各自可以建造防御塔的高台格点下标，按下标升序。 ``player_highland_cells[player]`` """
+
+
+def distance_of(c0: int, c1: int) -> int:
+    """两个格点之间的距离"""
+    return distance_table[c0 * CELL_COUNT + c1]
+
+
+def distance_many(cell: int, cells: Iterable[int]) -> list[int]:
+    """
+    批量计算一个格点到若干格点的距离。
+
+    :param cell: 起点格点下标
+    :param cells: 终点格点下标
+    :return: 与 ``cells`` 一一对应的距离列表
+    """
+    base = cell * CELL_COUNT
+    return [distance_table[base + c] for c in cells]
+
+
+def neighbors_of(cell: int) -> list[int]:
+    """格点六个方向的相邻格点下标，方向顺序与 :func:`.coord.neighbor` 相同。"""
+    return neighbor_table[cell * 6:cell * 6 + 6]
+
+
+def neighbors_of_many(cells: Iterable[int], direction: Optional[int] = None) -> list:
+    """
+    批量查询相邻格点。
+
+    :param cells: 格点下标
+    :param direction: 方向。若给定，返回每个格点在该方向上的相邻格点；否则返回每个格点六个方向的相邻格点列表。
+    :return: 与 ``cells`` 一一对应的结果列表
+    """
+    if direction is None:
+        return [neighbor_table[c * 6:c * 6 + 6] for c in cells]
+    return [neighbor_table[c * 6 + direction] for c in cells]
+
+
+_rings_cache: dict[tuple[int, int, bool], list[list[int]]] = {}
+
+
+def rings(cell: int, radius: int, walkable_only: bool = False) -> list[list[int]]:
+    """
+    按距离分层列出某格点周围的地图内格点，结果会被缓存，请勿修改。
+
+    :param cell: 中心格点下标
+    :param radius: 最大距离
+    :param walkable_only: 是否只保留蚂蚁可以移动的格点
+    :return: 长度为 ``radius + 1`` 的列表，第 ``d`` 项为距离恰好为 ``d`` 的格点下标（按下标升序）
+    """
+    key = (cell, radius, walkable_only)
+    result = _rings_cache.get(key)
+    if result is None:
+        mask = ant_can_go_mask if walkable_only else in_map_mask
+        result = [[] for _ in range(radius + 1)]
+        base = cell * CELL_COUNT
+        for c in range(CELL_COUNT):
+            d = distance_table[base + c]
+            if d <= radius and mask[c]:
+                result[d].append(c)
+        _rings_cache[key] = result
+    return result
@@ -1,6 +1,13 @@
+from typing import Iterable
+
 from .coord import Coord, headquarter_coord, neighbor, is_in_map, is_ant_can_go, distance
 from .gamedata import Ant
 
+try:
+    import numpy as np
+except ImportError:  # NumPy是可选依赖，仅 :class:`NumpyPheromone` 需要
+    np = None
+
 
 class Pheromone:
     """
@@ -10,7 +17,76 @@ class Pheromone:
     """
 
 
-    value: list[list[float]] = []  #: 19x19的信息素数组
+    _value: list[list[float]] = []  # 19x19的信息素数组
+    _shared: bool = False  # _value是否与其他副本共享，为True时需要先复制才能原地修改
+    _hash_cache = None  # (版本, 哈希值)，信息素被修改后失效
+    _flow = None  # (版本, {(玩家, 当前格点, 上一格点): 方向})，信息素被修改后失效
+
+    @property
+    def value(self) -> list[list[float]]:
+        """
+        19x19的信息素数组。
+
+        通过 :meth:`copy` 得到的副本与原对象共享数组，因此每次读取 ``value`` 时，如果数组仍是共享的，会先复制一份归自己所有，
+        之后对返回的数组的原地修改不会影响其他副本。读取 ``value`` 被视为准备原地修改，会清除流场和哈希等派生的缓存。
+
+        因此请在每次修改前重新读取 ``value`` ，不要跨越 :meth:`copy` 、 :meth:`next_move_direction` 或 :meth:`quantized_hash`
+        持有返回的数组，否则之后的修改可能不会反映到缓存的结果中。只读取时请使用 :meth:`value_view` 。
+        """
+        self._own()
+        return self._value
+
+    @value.setter
+    def value(self, value: list[list[float]]) -> None:
+        self._value = value
+        self._shared = False
+        self._hash_cache = None
+        self._flow = None
+
+    def value_view(self) -> list[list[float]]:
+        """返回当前的信息素数组而不复制，可能与其他副本共享，因此调用者不能修改它。"""
+        return self._value
+
+    def copy(self) -> "Pheromone":
+        """
+        复制信息素。副本与原对象共享底层数组，任何一方第一次修改（包括通过 ``value`` 取得数组）时才会真正复制（写时复制）。
+
+        :return: 独立的信息素副本
+        """
+        p = object.__new__(type(self))
+        p.__dict__.update(self.__dict__)
+        p._shared = self._shared = True
+        return p
+
+    def _own(self) -> None:
+        # 原地修改_value之前调用：必要时复制共享的数组，并清除派生的缓存
+        if self._shared:
+            self._value = [row[:] for row in self._value]
+            self._shared = False
+        self._hash_cache = None
+        self._flow = None
+
+    def _version(self) -> object:
+        # 标识信息素当前内容的对象，用于判断缓存是否失效。原地修改时需要另外清除缓存。
+        return self._value
+
+    @staticmethod
+    def hash_resolution() -> int:
+        """计算哈希时信息素的量化精度，设定为保留小数点后四位，与迷你回放文件一致。"""
+        return 10000
+
+    def quantized_hash(self) -> int:
+        """
+        将信息素量化后计算的哈希值，用于 :meth:`.gamestate.GameState.state_key` 。
+        相同的信息素总会得到相同的哈希值，结果会缓存到信息素下一次被修改为止。
+        """
+        cache = self._hash_cache
+        if cache is not None and cache[0] is self._version():
+            return cache[1]
+        res = Pheromone.hash_resolution()
+        h = hash(tuple(round(v * res) for row in self.value_view() for v in row))
+        self._hash_cache = (self._version(), h)
+        return h
 
     @staticmethod
     def tau_base() -> float:
@@ -25,15 +101,17 @@ class Pheromone:
     def decay(self) -> None:
         """进行全局信息素衰减: :math:`\\tau' = \\lambda\\tau + (1-\\lambda)\\tau_{0}` """
         _lambda = Pheromone.decay_rate()
-        for i in range(19):
-            for j in range(19):
-                self.value[i][j] = _lambda * self.value[i][j] + (1 - _lambda) * Pheromone.tau_base()
+        offset = (1 - _lambda) * Pheromone.tau_base()
+        self._value = [[_lambda * v + offset for v in row] for row in self._value]
+        self._shared = False
+        self._hash_cache = None
+        self._flow = None
 
     def pheromone_of_neighbors(self, coord: Coord) -> list[float]:
         """输出给定点相邻六个方向的信息素分布 :math:`\\tau_p` 。若超出地图范围则置为-10。"""
         return list(
             map(
-                lambda c: self.value[c.x][c.y] if is_in_map(c) else -10.0,
+                lambda c: self._value[c.x][c.y] if is_in_map(c) else -10.0,
                 map(lambda dir: neighbor(coord, dir), range(6)),
             )
         )
@@ -60,18 +138,32 @@ class Pheromone:
 
         其中 :math:`\\tau_i` 是上面描述的信息素，:math:`\\eta_i` 是上面描述的目标偏好修正。而 :math:`v_i`描述这个方向是否可以行动，如果可以则为1，否则为0。
 
+        结果只取决于蚂蚁的归属玩家、当前位置和上一步的位置，因此会按照这三者缓存下来（即“流场”），
+        直到信息素下一次被修改。同一回合中走到同一格点的蚂蚁可以直接复用之前的决策。
+
         :param ant: 要求下一步动作的蚂蚁
         :return: 应当行动的方向
         """
         last_pos = ant.path[-2] if len(ant.path) > 1 else ant.coord
+        version = self._version()
+        flow = self._flow
+        if flow is None or flow[0] is not version:
+            flow = self._flow = (version, {})
+        key = (ant.player, ant.coord.x * 19 + ant.coord.y, last_pos.x * 19 + last_pos.y)
+        direction = flow[1].get(key)
+        if direction is None:
+            direction = flow[1][key] = self._best_direction(ant.coord, last_pos, ant.player)
+        return direction
+
+    def _best_direction(self, coord: Coord, last_pos: Coord, player: int) -> int:
         valid = list(
             map(
                 lambda c: is_ant_can_go(c) and c != last_pos,
-                map(lambda dir: neighbor(ant.coord, dir), range(6)),
+                map(lambda dir: neighbor(coord, dir), range(6)),
             )
         )
-        tau = self.pheromone_of_neighbors(ant.coord)
-        eta = self.multiplier_of_neighbors(ant.coord, headquarter_coord(1 - ant.player))
+        tau = self.pheromone_of_neighbors(coord)
+        eta = self.multiplier_of_neighbors(coord, headquarter_coord(1 - player))
 
         max_dir, max_p = 0, -1000
         for i in range(6):
@@ -86,8 +178,9 @@ class Pheromone:
 
     def modify_path(self, path: list[Coord], delta: float) -> None:
         """核心信息素修改函数。实际上是对路径上所有点的信息素加上给定的差值。如果路径多次经过同一个点，只会更改一次。"""
+        self._own()
         for coord in set(path):
-            self.value[coord.x][coord.y] = max(0.0, self.value[coord.x][coord.y] + delta)
+            self._value[coord.x][coord.y] = max(0.0, self._value[coord.x][coord.y] + delta)
 
     @staticmethod
     def success_ant_gain() -> float:
@@ -117,8 +210,183 @@ class Pheromone:
         self.modify_path(ant.path, Pheromone.too_old_ant_gain())
 
 
-def generate_init_pheromone(seed: int) -> tuple[Pheromone, Pheromone]:
-    """规定的双方信息素初始化函数。这实际上是一个线性同余伪随机数发生器。"""
+class NumpyPheromone(Pheromone):
+    """
+    以NumPy数组为后端的信息素，接口与 :class:`Pheromone` 完全一致，计算结果逐位相同。
+
+    ``value`` 是一个形状为 ``(19, 19)`` 的 ``float64`` 数组，对其赋值时会自动转换。衰减是整个数组上的原地运算，
+    路径更新则是对去重后的格点下标进行批量加法与截断。需要安装NumPy。
+    """
+
+    def __init__(self, value=None):
+        if np is None:
+            raise ImportError("NumpyPheromone requires numpy")
+        self._value = np.zeros((19, 19), dtype=np.float64)
+        if value is not None:
+            self.value = value
+
+    @property
+    def value(self):
+        """19x19的信息素数组。与 :attr:`Pheromone.value` 一样，数组仍与其他副本共享时会先复制，并清除派生的缓存。"""
+        self._own()
+        return self._value
+
+    @value.setter
+    def value(self, value) -> None:
+        self._value = np.array(value, dtype=np.float64).reshape(19, 19)
+        self._shared = False
+        self._hash_cache = None
+        self._flow = None
+
+    def _own(self) -> None:
+        if self._shared:
+            self._value = self._value.copy()
+            self._shared = False
+        self._hash_cache = None
+        self._flow = None
+
+    def decay(self) -> None:
+        _lambda = Pheromone.decay_rate()
+        self._own()
+        np.multiply(self._value, _lambda, out=self._value)
+        np.add(self._value, (1 - _lambda) * Pheromone.tau_base(), out=self._value)
+
+    def quantized_hash(self) -> int:
+        cache = self._hash_cache
+        if cache is not None and cache[0] is self._value:
+            return cache[1]
+        quantized = np.rint(self._value * Pheromone.hash_resolution()).astype(np.int64)
+        h = hash(tuple(quantized.ravel().tolist()))
+        self._hash_cache = (self._value, h)
+        return h
+
+    def pheromone_of_neighbors(self, coord: Coord) -> list[float]:
+        value = self._value
+        result = []
+        for direction in range(6):
+            c = neighbor(coord, direction)
+            result.append(float(value[c.x, c.y]) if is_in_map(c) else -10.0)
+        return result
+
+    def modify_cells(self, cells: Iterable[int], delta: float) -> None:
+        """
+        对给定格点加上差值并截断到非负。
+
+        :param cells: 格点下标 ``x * 19 + y`` ，必须已经去重
+        :param delta: 信息素差值
+        """
+        self._own()
+        flat = self._value.reshape(-1)
+        idx = np.fromiter(cells, dtype=np.intp)
+        flat[idx] = np.maximum(flat[idx] + delta, 0.0)
+
+    def modify_path(self, path: list[Coord], delta: float) -> None:
+        self.modify_cells({c.x * 19 + c.y for c in path}, delta)
+
+
+class LazyPheromone(Pheromone):
+    """
+    惰性衰减的信息素，接口与 :class:`Pheromone` 完全一致，计算结果逐位相同。
+
+    :meth:`decay` 只记录全局衰减次数，耗时为 :math:`O(1)` 。每个格点记录自己已经折算到第几次衰减，
+    直到被读取（:meth:`pheromone_of_neighbors`）或修改（:meth:`modify_path`）时才补上欠下的衰减。
+    衰减的闭式解 :math:`\\tau_0 + \\lambda^k(\\tau - \\tau_0)` 与逐回合计算的浮点结果并不逐位相同，
+    因此补算时仍然逐次执行与 :meth:`Pheromone.decay` 相同的浮点运算，并在数值不再变化时提前结束。
+
+    适合连续模拟多个回合而很少读取完整信息素的场景。读取 ``value`` 会得到一份完整计算后的只读视图（元组的元组），
+    原地修改会抛出 ``TypeError`` ；需要修改时请对 ``value`` 整体赋值。
+    """
+
+    def __init__(self, value=None):
+        self._raw: list[float] = [0.0] * 361
+        self._stamp: list[int] = [0] * 361
+        self._epoch: int = 0
+        self._token = object()
+        self._view = None
+        if value is not None:
+            self.value = value
+
+    @property
+    def value(self) -> tuple[tuple[float, ...], ...]:
+        """19x19的信息素数组，为 :meth:`materialize` 结果的只读版本"""
+        view = self._view
+        if view is None or view[0] is not self._token:
+            view = self._view = (self._token, tuple(tuple(row) for row in self.materialize()))
+        return view[1]
+
+    @value.setter
+    def value(self, value) -> None:
+        self._raw = [float(v) for row in value for v in row]
+        self._stamp = [self._epoch] * 361
+        self._shared = False
+        self._changed()
+
+    def value_view(self) -> tuple[tuple[float, ...], ...]:
+        return self.value
+
+    def _changed(self) -> None:
+        self._token = object()
+        self._hash_cache = None
+        self._flow = None
+
+    def _version(self) -> object:
+        return self._token
+
+    def _own(self) -> None:
+        if self._shared:
+            self._raw = self._raw[:]
+            self._stamp = self._stamp[:]
+            self._shared = False
+        self._changed()
+
+    def _read(self, cell: int) -> float:
+        v = self._raw[cell]
+        pending = self._epoch - self._stamp[cell]
+        if pending:
+            _lambda = Pheromone.decay_rate()
+            offset = (1 - _lambda) * Pheromone.tau_base()
+            for _ in range(pending):
+                nv = _lambda * v + offset
+                if nv == v:
+                    break
+                v = nv
+            if not self._shared:
+                self._raw[cell] = v
+                self._stamp[cell] = self._epoch
+        return v
+
+    def materialize(self) -> list[list[float]]:
+        """计算并返回完整的19x19信息素数组，与每回合直接衰减的结果逐位相同。"""
+        read = self._read
+        return [[read(i * 19 + j) for j in range(19)] for i in range(19)]
+
+    def decay(self) -> None:
+        self._epoch += 1
+        self._changed()
+
+    def pheromone_of_neighbors(self, coord: Coord) -> list[float]:
+        result = []
+        for direction in range(6):
+            c = neighbor(coord, direction)
+            result.append(self._read(c.x * 19 + c.y) if is_in_map(c) else -10.0)
+        return result
+
+    def modify_path(self, path: list[Coord], delta: float) -> None:
+        self._own()
+        for cell in {c.x * 19 + c.y for c in path}:
+            self._raw[cell] = max(0.0, self._read(cell) + delta)
+            self._stamp[cell] = self._epoch
+
+
+def generate_init_pheromone(
+        seed: int, pheromone_type: type[Pheromone] = Pheromone
+) -> tuple[Pheromone, Pheromone]:
+    """
+    规定的双方信息素初始化函数。这实际上是一个线性同余伪随机数发生器。
+
+    :param seed: 随机数种子
+    :param pheromone_type: 信息素的实现类，如 :class:`Pheromone` 或 :class:`NumpyPheromone`
+    """
 
     lcg_seed = seed
 
@@ -128,7 +396,7 @@ def generate_init_pheromone(seed: int) -> tuple[Pheromone, Pheromone]:
         return lcg_seed
 
     def generate() -> Pheromone:
-        p = Pheromone()
+        p = pheromone_type()
         p.value = [
             [(lcg() * pow(2, -46) + 8) for j in range(19)] for i in range(19)
         ]
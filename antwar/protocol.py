@@ -1,8 +1,8 @@
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Callable, Tuple, TypeVar
+from typing import Optional, Tuple
 
-from .rawio import write_to_judger, debug
+from .rawio import write_to_judger, debug, stdin_reader, parse_ints, stdout_writer, FrameWriter
 
 from .gamedata import Ant, Tower, TowerType, SuperWeaponType
 
@@ -10,15 +10,7 @@ from .coord import Coord
 
 
 def _read_line_of_int() -> list[int]:
-    return [int(s) for s in input().split(' ')]
-
-
-T = TypeVar("T")
-
-
-def _read_list(read_func: Callable[[], T]) -> list[T]:
-    n = int(input())
-    return [read_func() for i in range(n)]
+    return stdin_reader().read_ints()
 
 
 @dataclass
@@ -76,6 +68,33 @@ class Operation:
             res += " " + str(self.arg1)
         return res
 
+    def encode(self) -> bytes:
+        """
+        生成操作的字节形式，等价于 ``(self.dump() + "\\n").encode()`` 。
+
+        :return:
+        """
+        return b"".join(_operation_parts(self))
+
+
+_type_bytes = {t: str(t.value).encode() for t in OperationType}
+_small_int_bytes = [str(i).encode() for i in range(256)]
+
+
+def _int_bytes(v: int) -> bytes:
+    return _small_int_bytes[v] if 0 <= v < 256 else str(v).encode()
+
+
+def _operation_parts(op: Operation) -> list[bytes]:
+    # 预先编码好的操作类型与小整数参数，避免每次格式化字符串
+    parts = [_type_bytes.get(op.type) or _int_bytes(int(op.type))]
+    if op.arg0 >= 0:
+        parts += (b" ", _int_bytes(op.arg0))
+    if op.arg1 >= 0:
+        parts += (b" ", _int_bytes(op.arg1))
+    parts.append(b"\n")
+    return parts
+
 
 def build_tower_op(coord: Coord) -> Operation:
     """
@@ -143,26 +162,37 @@ def upgrade_ant_maxhp_op() -> Operation:
     return Operation(OperationType.UPGRADE_ANT_MAXHP)
 
 
-def read_enemy_operations() -> list[Operation]:
+def decode_operations(block: bytes) -> list[Operation]:
     """
-    读取对手的操作列表
+    从原始字节中解析操作列表，每行一个操作，格式与 :meth:`Operation.dump` 相同。
 
-    :return: 对手的操作列表
+    :param block: 操作列表的各行，不包括开头的操作数量
+    :return: 解析得到的操作列表
     """
-
-    def read_operation() -> Operation:
-        parts = _read_line_of_int()
+    ops = []
+    for line in block.splitlines():
+        parts = parse_ints(line)
         op_type = OperationType(parts[0])
         if (
                 op_type == OperationType.UPGRADE_GENERATE_SPEED
                 or op_type == OperationType.UPGRADE_ANT_MAXHP
         ):
-            return Operation(op_type)
-        if op_type == OperationType.DOWNGRADE_TOWER:
-            return Operation(op_type, parts[1])
-        return Operation(op_type, parts[1], parts[2])
+            ops.append(Operation(op_type))
+        elif op_type == OperationType.DOWNGRADE_TOWER:
+            ops.append(Operation(op_type, parts[1]))
+        else:
+            ops.append(Operation(op_type, parts[1], parts[2]))
+    return ops
 
-    return _read_list(read_operation)
+
+def read_enemy_operations() -> list[Operation]:
+    """
+    读取对手的操作列表
+
+    :return: 对手的操作列表
+    """
+    reader = stdin_reader()
+    return decode_operations(reader.read_lines(reader.read_int()))
 
 
 def write_our_operation(ops: list[Operation]) -> None:
@@ -171,53 +201,230 @@ def write_our_operation(ops: list[Operation]) -> None:
 
     :param ops: 我方的操作列表
     """
-    msg = str(len(ops)) + "\n"
+    writer = stdout_writer()
+    encode_operations(ops, writer)
+    writer.send()
+
+
+def encode_operations(ops: list[Operation], writer: FrameWriter) -> None:
+    """
+    将操作列表编码为一帧消息的消息体，格式与 :func:`write_our_operation` 发送的相同。
+
+    :param ops: 操作列表
+    :param writer: 帧写入器，原有的未发送内容会被丢弃
+    """
+    parts = [_int_bytes(len(ops)), b"\n"]
     for op in ops:
-        msg += op.dump() + "\n"
-    write_to_judger(msg)
+        parts += _operation_parts(op)
+    writer.begin()
+    writer.append(b"".join(parts))
+
+
+def parse_operation_message(payload: bytes) -> list[Operation]:
+    """
+    解析 :func:`write_our_operation` 发送的一帧消息的消息体，可配合 :func:`.rawio.read_frame` 读取AI的输出。
+
+    :param payload: 消息体
+    :return: 操作列表
+    """
+    count, _, rest = payload.partition(b"\n")
+    ops = decode_operations(rest)
+    if len(ops) != int(count):
+        raise ValueError("operation count does not match the message body")
+    return ops
+
+
+_DIGEST_MASK = (1 << 64) - 1
+TOWER_FIELDS = 6  #: 回合信息中每座防御塔的整数个数：ID，归属玩家，坐标，类型，CD
+ANT_FIELDS = 8  #: 回合信息中每只蚂蚁的整数个数：ID，归属玩家，坐标，HP，等级，年龄，状态
+
+
+def _rows_digest(values: list[int], width: int) -> int:
+    # 逐行哈希后求和，结果与行的顺序无关
+    h = 0
+    for i in range(0, len(values), width):
+        h += hash(tuple(values[i:i + width]))
+    return h & _DIGEST_MASK
+
+
+def round_digest(tower_values: list[int], ant_values: list[int], coin: Tuple[int, int], hp: Tuple[int, int]) -> int:
+    """
+    回合局面的64位摘要，由防御塔、蚂蚁、双方金币和血量计算，与各行的顺序无关，不包括回合数。
+    :meth:`RoundInfo.digest` 与 :meth:`.gamestate.GameState.round_digest` 都使用它，二者相等说明本地维护的局面与评测机一致。
+
+    :param tower_values: 全部防御塔的整数，每座 :data:`TOWER_FIELDS` 个
+    :param ant_values: 全部蚂蚁的整数，每只 :data:`ANT_FIELDS` 个
+    :param coin: 双方金币
+    :param hp: 双方大本营血量
+    :return: 摘要
+    """
+    return hash((
+        _rows_digest(tower_values, TOWER_FIELDS), _rows_digest(ant_values, ANT_FIELDS), tuple(coin), tuple(hp)
+    )) & _DIGEST_MASK
 
 
-@dataclass
 class RoundInfo:
-    """每回合结算后，游戏逻辑向双方发送的回合局面信息。"""
-
-    round: int  #: 当前游戏回合，从0开始计数。
-    towers: list[Tower]  #: 当前所有玩家的防御塔列表。
-    ants: list[Ant]  #: 当前所有存活蚂蚁的列表。注意，这个列表中的蚂蚁并不包含路径信息。
-    coin: Tuple[int, int]  #: 当前双方玩家的金币数量。按下标顺序分别为先手/后手玩家的金币。
-    hp: Tuple[int, int]  #: 当前双方玩家的大本营剩余血量。按下标顺序分别为先手/后手玩家的血量。
-
-
-def read_round_info() -> RoundInfo:
-    def read_one_int() -> int:
-        return int(input())
-
-    def read_two_ints() -> Tuple[int, int]:
-        parts = _read_line_of_int()
-        return parts[0], parts[1]
-
-    def read_tower() -> Tower:
-        parts = _read_line_of_int()
-        return Tower(parts[0], parts[1], Coord(parts[2], parts[3]), parts[4], parts[5])
-
-    def read_ant() -> Ant:
-        parts = _read_line_of_int()
-        return Ant(
-            parts[0],
-            parts[1],
-            parts[4],
-            Ant.maxhp_of_level(parts[5]),
-            Coord(parts[2], parts[3]),
-            parts[5],
-            parts[6],
-            0,
-            parts[7],
+    """
+    每回合结算后，游戏逻辑向双方发送的回合局面信息。
+
+    防御塔与蚂蚁列表是惰性解析的： :func:`read_round_info` 只保存这两部分的原始字节，在第一次访问 :attr:`towers` 或
+    :attr:`ants` 时才解析。
+    """
+
+    def __init__(
+            self,
+            round: int,
+            towers: Optional[list[Tower]] = None,
+            ants: Optional[list[Ant]] = None,
+            coin: Tuple[int, int] = (0, 0),
+            hp: Tuple[int, int] = (0, 0),
+    ):
+        self.round: int = round  #: 当前游戏回合，从0开始计数。
+        self.coin: Tuple[int, int] = coin  #: 当前双方玩家的金币数量。按下标顺序分别为先手/后手玩家的金币。
+        self.hp: Tuple[int, int] = hp  #: 当前双方玩家的大本营剩余血量。按下标顺序分别为先手/后手玩家的血量。
+        self._towers = towers if towers is not None else []
+        self._ants = ants if ants is not None else []
+        self._raw_towers: Optional[bytes] = None
+        self._raw_ants: Optional[bytes] = None
+        self._skipped = False
+
+    @classmethod
+    def from_raw(
+            cls,
+            round: int,
+            raw_towers: Optional[bytes],
+            raw_ants: Optional[bytes],
+            coin: Tuple[int, int],
+            hp: Tuple[int, int],
+    ) -> "RoundInfo":
+        """
+        由防御塔行与蚂蚁行的原始字节创建回合信息，这两部分会在第一次访问时才解析。
+
+        :param raw_towers: 防御塔各行的原始字节，不包括开头的数量。为 ``None`` 表示读取时已跳过，此时访问 :attr:`towers` 会出错。
+        :param raw_ants: 蚂蚁各行的原始字节，不包括开头的数量。为 ``None`` 的含义同上。
+        """
+        info = cls(round, None, None, coin, hp)
+        info._towers = info._ants = None
+        info._raw_towers, info._raw_ants = raw_towers, raw_ants
+        info._skipped = raw_towers is None or raw_ants is None
+        return info
+
+    @property
+    def towers(self) -> list[Tower]:
+        """当前所有玩家的防御塔列表。"""
+        if self._towers is None:
+            if self._raw_towers is None:
+                raise ValueError("towers were skipped when reading this round info")
+            self._towers = decode_towers(parse_ints(self._raw_towers))
+            self._raw_towers = None
+        return self._towers
+
+    @towers.setter
+    def towers(self, value: list[Tower]) -> None:
+        self._towers, self._raw_towers = value, None
+
+    @property
+    def ants(self) -> list[Ant]:
+        """当前所有存活蚂蚁的列表。注意，这个列表中的蚂蚁并不包含路径信息。"""
+        if self._ants is None:
+            if self._raw_ants is None:
+                raise ValueError("ants were skipped when reading this round info")
+            self._ants = decode_ants(parse_ints(self._raw_ants))
+            self._raw_ants = None
+        return self._ants
+
+    @ants.setter
+    def ants(self, value: list[Ant]) -> None:
+        self._ants, self._raw_ants = value, None
+
+    def digest(self) -> int:
+        """
+        局面摘要，参见 :func:`round_digest` 。尚未解析的防御塔和蚂蚁直接从原始字节计算，不会创建对象。
+
+        :raise ValueError: 读取时跳过了防御塔与蚂蚁信息
+        """
+        if self._towers is None:
+            if self._raw_towers is None:
+                raise ValueError("towers were skipped when reading this round info")
+            tower_values = parse_ints(self._raw_towers)
+        else:
+            tower_values = [v for t in self._towers for v in (t.id, t.player, t.coord.x, t.coord.y, t.type, t.cd)]
+        if self._ants is None:
+            if self._raw_ants is None:
+                raise ValueError("ants were skipped when reading this round info")
+            ant_values = parse_ints(self._raw_ants)
+        else:
+            ant_values = [
+                v for a in self._ants
+                for v in (a.id, a.player, a.coord.x, a.coord.y, a.hp, a.level, a.age, a.state)
+            ]
+        return round_digest(tower_values, ant_values, self.coin, self.hp)
+
+    @property
+    def skipped(self) -> bool:
+        """读取时是否跳过了防御塔与蚂蚁信息"""
+        return self._skipped
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RoundInfo):
+            return NotImplemented
+        if self._skipped or other._skipped:
+            # 跳过了防御塔与蚂蚁信息的回合信息无法完整比较，只与自身相等
+            return self is other
+        return (self.round, self.towers, self.ants, self.coin, self.hp) == (
+            other.round, other.towers, other.ants, other.coin, other.hp
+        )
+
+    def __repr__(self) -> str:
+        if self._skipped:
+            return f"RoundInfo(round={self.round!r}, coin={self.coin!r}, hp={self.hp!r}, skipped)"
+        return (
+            f"RoundInfo(round={self.round!r}, towers={self.towers!r}, ants={self.ants!r}, "
+            f"coin={self.coin!r}, hp={self.hp!r})"
         )
 
-    return RoundInfo(
-        read_one_int(),
-        _read_list(read_tower),
-        _read_list(read_ant),
-        read_two_ints(),
-        read_two_ints(),
-    )
+
+def decode_towers(values: list[int]) -> list[Tower]:
+    """
+    从整数序列中解析防御塔列表，每座防御塔占6个整数，顺序与回合信息中的相同。
+
+    :param values: 全部防御塔行中的整数
+    :return: 防御塔列表
+    """
+    v = values
+    return [Tower(v[i], v[i + 1], Coord(v[i + 2], v[i + 3]), v[i + 4], v[i + 5]) for i in range(0, len(v), 6)]
+
+
+def decode_ants(values: list[int]) -> list[Ant]:
+    """
+    从整数序列中解析蚂蚁列表，每只蚂蚁占8个整数，顺序与回合信息中的相同。
+
+    :param values: 全部蚂蚁行中的整数
+    :return: 蚂蚁列表，不包含路径信息
+    """
+    v = values
+    return [
+        Ant(v[i], v[i + 1], v[i + 4], Ant.maxhp_of_level(v[i + 5]), Coord(v[i + 2], v[i + 3]), v[i + 5], v[i + 6], 0, v[i + 7])
+        for i in range(0, len(v), 8)
+    ]
+
+
+def read_round_info(skip_entities: bool = False) -> RoundInfo:
+    """
+    读取回合信息。防御塔和蚂蚁的各行会被整块读取，但只在第一次访问时才解析，参见 :class:`RoundInfo` 。
+
+    :param skip_entities: 是否跳过防御塔和蚂蚁信息。跳过时这两部分既不复制也不解析，得到的回合信息中只有回合数、金币和血量。
+        已经在维护 :class:`.gamestate.GameState` 的AI通常不需要它们。
+    :return: 回合信息
+    """
+    reader = stdin_reader()
+    round = reader.read_int()
+    if skip_entities:
+        reader.skip_lines(reader.read_int())
+        reader.skip_lines(reader.read_int())
+        raw_towers = raw_ants = None
+    else:
+        raw_towers = reader.read_lines(reader.read_int())
+        raw_ants = reader.read_lines(reader.read_int())
+    coin_hp = reader.read_ints(2)
+    return RoundInfo.from_raw(round, raw_towers, raw_ants, (coin_hp[0], coin_hp[1]), (coin_hp[2], coin_hp[3]))
@@ -1,16 +1,20 @@
+import io
+import struct
 import sys
+from typing import BinaryIO, Iterator, Optional, TextIO, Union
 
 
 def write_to_judger(msg: str) -> None:
     """
-    按照4+N协议将消息输出给评测机
+    按照4+N协议将消息输出给评测机。消息头中的长度为编码后的字节数，消息头与消息体通过一次写入发送。
 
     :param msg: 需要输出的消息
     :type msg: str
     """
-    sys.stdout.buffer.write(int.to_bytes(len(msg), length=4, byteorder="big", signed=False))
-    sys.stdout.buffer.write(msg.encode())
-    sys.stdout.buffer.flush()
+    writer = stdout_writer()
+    writer.begin()
+    writer.append(msg.encode())
+    writer.send()
 
 
 def debug(msg: str) -> None:
@@ -21,3 +25,208 @@ def debug(msg: str) -> None:
     :type msg: str
     """
     print(msg, file=sys.stderr, flush=True)
+
+
+class LineReader:
+    """
+    带缓冲的按行读取器。每次从底层流中整块读取当前可用的全部字节，之后按行切分，并可以一次性解析多行中的全部整数。
+
+    读取器会预读，因此同一个流上不要再混用 ``input()`` 等其他读取方式，否则预读的数据会丢失。
+    """
+
+    def __init__(self, stream: Union[BinaryIO, TextIO], chunk_size: int = 1 << 16):
+        """
+        :param stream: 底层输入流。二进制流（如 ``sys.stdin.buffer`` ）会整块读取；文本流（如 ``io.StringIO`` ）则按行读取后编码。
+        :param chunk_size: 每次从底层流读取的最大字节数
+        """
+        self.stream = stream
+        self.source: object = stream  #: 创建读取器时给定的流对象，用于判断 ``sys.stdin`` 是否被替换
+        self.chunk_size = chunk_size
+        self._buf = b""
+        self._pos = 0
+        if isinstance(stream, io.TextIOBase):
+            self._read = lambda n: stream.readline().encode()
+        else:
+            self._read = getattr(stream, "read1", stream.read)
+
+    def _fill(self) -> bool:
+        chunk = self._read(self.chunk_size)
+        if not chunk:
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _find_lines(self, n: int) -> int:
+        # 返回第n行末尾在缓冲区中的位置，必要时从底层流补充数据
+        end = self._pos
+        while n > 0:
+            i = self._buf.find(b"\n", end)
+            if i >= 0:
+                end = i + 1
+                n -= 1
+                continue
+            offset = end - self._pos
+            if not self._fill():
+                # 与 input() 一致：最后一行可以没有换行符
+                if n == 1 and end < len(self._buf):
+                    return len(self._buf)
+                raise EOFError
+            end = offset
+        return end
+
+    def read_lines(self, n: int) -> bytes:
+        """
+        读取 ``n`` 行，返回包含换行符的原始字节。
+
+        :raise EOFError: 输入在读满 ``n`` 行之前结束
+        """
+        end = self._find_lines(n)
+        block = self._buf[self._pos:end]
+        self._pos = end
+        return block
+
+    def skip_lines(self, n: int) -> None:
+        """
+        跳过 ``n`` 行，不复制也不解析其中的内容。
+
+        :raise EOFError: 输入在读满 ``n`` 行之前结束
+        """
+        self._pos = self._find_lines(n)
+
+    def read_line(self) -> bytes:
+        """读取一行，返回包含换行符的原始字节"""
+        return self.read_lines(1)
+
+    def read_ints(self, n_lines: int = 1) -> list[int]:
+        """读取 ``n_lines`` 行，并按出现顺序返回其中的全部整数"""
+        return parse_ints(self.read_lines(n_lines))
+
+    def read_int(self) -> int:
+        """读取只包含一个整数的一行"""
+        return int(self.read_line())
+
+
+def parse_ints(block: bytes) -> list[int]:
+    """一次性解析一段字节中以空白分隔的全部整数"""
+    return list(map(int, block.split()))
+
+
+_stdin_reader: Optional[LineReader] = None
+
+
+def stdin_reader() -> LineReader:
+    """
+    标准输入上的 :class:`LineReader` 。 :mod:`antwar.protocol` 中的读取函数都通过它读取，若 ``sys.stdin`` 被替换，会自动重新创建。
+    """
+    global _stdin_reader  # pylint: disable=global-statement
+    if _stdin_reader is None or _stdin_reader.source is not sys.stdin:
+        _stdin_reader = LineReader(getattr(sys.stdin, "buffer", sys.stdin))
+        _stdin_reader.source = sys.stdin
+    return _stdin_reader
+
+
+class FrameWriter:
+    """
+    4+N协议的帧写入器。帧在一块预分配、可复用的缓冲区中拼接，写完后在原地填入4字节的大端序长度头，
+    再通过一次 ``write`` 和一次 ``flush`` 发送。
+
+    .. code-block:: python
+
+        writer = FrameWriter(sys.stdout.buffer)
+        writer.begin()
+        writer.append(b"1\n")
+        writer.append(b"31\n")
+        writer.send()
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None, capacity: int = 4096):
+        """
+        :param stream: 输出流，默认为发送时的 ``sys.stdout.buffer``
+        :param capacity: 缓冲区的初始大小（字节），不够时会自动扩大
+        """
+        self.stream = stream
+        self.source: object = None  #: 创建写入器时对应的 ``sys.stdout`` ，用于判断其是否被替换
+        self._buf = bytearray(max(capacity, 8))
+        self._len = 4
+
+    def begin(self) -> None:
+        """开始一帧新的消息，丢弃尚未发送的内容"""
+        self._len = 4
+
+    def append(self, data: bytes) -> None:
+        """向当前帧追加消息体"""
+        end = self._len + len(data)
+        if end > len(self._buf):
+            self._buf.extend(bytes(max(end, 2 * len(self._buf)) - len(self._buf)))
+        self._buf[self._len:end] = data
+        self._len = end
+
+    def frame(self) -> memoryview:
+        """填入长度头，返回当前帧（长度头加消息体）的只读视图。下一次修改帧之前有效。"""
+        struct.pack_into(">I", self._buf, 0, self._len - 4)
+        return memoryview(self._buf)[:self._len].toreadonly()
+
+    def send(self) -> None:
+        """发送当前帧并开始新的一帧"""
+        stream = self.stream if self.stream is not None else sys.stdout.buffer
+        with self.frame() as view:
+            stream.write(view)
+        stream.flush()
+        self._len = 4
+
+
+_stdout_writer: Optional[FrameWriter] = None
+
+
+def stdout_writer() -> FrameWriter:
+    """
+    标准输出上的 :class:`FrameWriter` 。 :func:`write_to_judger` 和 :func:`.protocol.write_our_operation` 都通过它发送，
+    若 ``sys.stdout`` 被替换，会自动重新创建。
+    """
+    global _stdout_writer  # pylint: disable=global-statement
+    if _stdout_writer is None or _stdout_writer.source is not sys.stdout:
+        _stdout_writer = FrameWriter(getattr(sys.stdout, "buffer", None))
+        _stdout_writer.source = sys.stdout
+    return _stdout_writer
+
+
+def _read_exactly(stream: BinaryIO, n: int) -> bytes:
+    data = stream.read(n)
+    if data is None:
+        data = b""
+    while len(data) < n:
+        more = stream.read(n - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Optional[bytes]:
+    """
+    从二进制流中读取一帧4+N协议的消息，与 :class:`FrameWriter` 相对应，可用于本地工具读取AI的输出。
+
+    :param stream: 二进制输入流
+    :return: 消息体。若流在帧的开头结束，返回 ``None``
+    :raise EOFError: 流在一帧的中间结束
+    """
+    header = _read_exactly(stream, 4)
+    if not header:
+        return None
+    if len(header) < 4:
+        raise EOFError
+    length = struct.unpack(">I", header)[0]
+    payload = _read_exactly(stream, length)
+    if len(payload) < length:
+        raise EOFError
+    return payload
+
+
+def iter_frames(stream: BinaryIO) -> Iterator[bytes]:
+    """依次读取流中的每一帧消息，直到流结束，参见 :func:`read_frame` """
+    while True:
+        payload = read_frame(stream)
+        if payload is None:
+            return
+        yield payload
@@ -0,0 +1,600 @@
+"""
+紧凑的二进制回放格式。
+
+回放文件由文件头、按回合顺序排列的记录和（正常关闭时写入的）索引组成。每个回合一条记录，记录该回合双方实际执行的操作；
+每隔若干回合的记录是关键帧，额外保存该回合开始时（执行操作之前）的完整局面，包括 ``float64`` 精度的信息素、
+蚂蚁路径、超级武器与冷却时间等，因此可以从关键帧精确地继续模拟。其余记录是增量帧，只保存操作，
+读取时从最近的关键帧开始执行操作并模拟，得到的局面与原对局逐位相同。开启校验时，每条记录还保存
+:meth:`.gamestate.GameState.round_digest` ，读取时可以用来验证。
+
+:class:`ReplayReader` 通过内存映射读取文件，借助索引直接跳到任意回合，最多只需模拟 ``keyframe_interval - 1`` 个回合。
+写入中断、没有索引的文件也可以读取，此时会在打开时顺序扫描一遍记录头。
+
+.. code-block:: python
+
+    with ReplayWriter("game.awr", seed=seed) as writer:
+        while ...:
+            writer.begin_round(state)
+            ...  # 双方执行操作
+            writer.end_round(ops0, ops1)
+            state.simulate_next_round()
+        writer.close(state)
+
+    with ReplayReader("game.awr") as reader:
+        state = reader.state_at(300)
+"""
+import io
+import mmap
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from .coord import Coord
+from .gamedata import Ant, AntState, SuperWeapon, SuperWeaponType, Tower, TowerType
+from .gamestate import GameState
+from .geometry import cell_xy
+from .pheromone import Pheromone
+from .protocol import Operation, OperationType
+
+MAGIC = b"AWRP"  #: 文件头的魔数
+VERSION = 1  #: 格式版本
+
+KEYFRAME = 1  #: 关键帧记录
+DELTA = 2  #: 增量帧记录
+
+FLAG_CHECKSUMS = 1  #: 文件头标志：记录中保存了局面摘要
+
+_HEADER = struct.Struct("<4sHHHq")  # 魔数，版本，标志，关键帧间隔，随机种子
+_RECORD = struct.Struct("<BIiQ")  # 类型，数据长度，回合数，局面摘要
+_INDEX_ENTRY = struct.Struct("<iQB")  # 回合数，记录偏移，类型
+_FOOTER = struct.Struct("<QI4s")  # 索引偏移，索引项数，魔数
+_INDEX_MAGIC = b"AWIX"
+_U32 = struct.Struct("<I")
+
+
+def _encode_operations(ops0: list[Operation], ops1: list[Operation]) -> bytes:
+    values = array("i")
+    for ops in (ops0, ops1):
+        values.append(len(ops))
+        for op in ops:
+            values.extend((int(op.type), op.arg0, op.arg1))
+    return values.tobytes()
+
+
+def _decode_operations(data) -> tuple[list[Operation], list[Operation]]:
+    values = array("i")
+    values.frombytes(data)
+    result = []
+    pos = 0
+    for _ in range(2):
+        n = values[pos]
+        pos += 1
+        result.append([
+            Operation(OperationType(values[i]), values[i + 1], values[i + 2]) for i in range(pos, pos + 3 * n, 3)
+        ])
+        pos += 3 * n
+    return result[0], result[1]
+
+
+def encode_state(state: GameState) -> bytes:
+    """
+    把局面编码为关键帧所用的字节串。
+
+    :param state: 局面
+    :return: 编码结果
+    """
+    ints = array("i", [
+        state.round, state.next_ant_id, state.next_tower_id,
+        *state.coin, *state.hp, *state.gen_speed_lv, *state.ant_maxhp_lv,
+        *state.super_weapon_cd[0], *state.super_weapon_cd[1],
+        len(state.towers), len(state.active_super_weapon), len(state.operated_tower_id), len(state.ants),
+    ])
+    for t in state.towers:
+        ints.extend((t.id, t.player, t.coord.x, t.coord.y, t.type, t.cd))
+    for sw in state.active_super_weapon:
+        ints.extend((sw.player, sw.type, sw.coord.x, sw.coord.y, sw.duration))
+    ints.extend(state.operated_tower_id)
+    for a in state.ants:
+        ints.extend((a.id, a.player, a.hp, a.maxhp, a.coord.x, a.coord.y, a.level, a.age, a.evasion_count, a.state,
+                     len(a.path)))
+        ints.extend(c.x * 19 + c.y for c in a.path)
+    floats = array("d", [v for p in state.phero for row in p.value_view() for v in row])
+    return _U32.pack(len(ints)) + ints.tobytes() + floats.tobytes()
+
+
+def decode_state(data, pheromone_type: type[Pheromone] = Pheromone) -> GameState:
+    """
+    从 :func:`encode_state` 的结果中恢复局面。
+
+    :param data: 编码结果，可以是 ``bytes`` 或 ``memoryview``
+    :param pheromone_type: 信息素的实现
+    :return: 恢复的局面
+    """
+    n = _U32.unpack_from(data, 0)[0]
+    ints = array("i")
+    ints.frombytes(data[4:4 + 4 * n])
+    floats = array("d")
+    floats.frombytes(data[4 + 4 * n:4 + 4 * n + 8 * 722])
+
+    state = GameState()
+    state.round, state.next_ant_id, state.next_tower_id = ints[0:3]
+    state.coin = list(ints[3:5])
+    state.hp = list(ints[5:7])
+    state.gen_speed_lv = list(ints[7:9])
+    state.ant_maxhp_lv = list(ints[9:11])
+    state.super_weapon_cd = [list(ints[11:15]), list(ints[15:19])]
+    n_towers, n_sw, n_operated, n_ants = ints[19:23]
+    pos = 23
+    for _ in range(n_towers):
+        id, player, x, y, ttype, cd = ints[pos:pos + 6]
+        state.towers.append(Tower(id, player, Coord(x, y), TowerType(ttype), cd))
+        pos += 6
+    for _ in range(n_sw):
+        player, swtype, x, y, duration = ints[pos:pos + 5]
+        state.active_super_weapon.append(SuperWeapon(player, SuperWeaponType(swtype), Coord(x, y), duration))
+        pos += 5
+    state.operated_tower_id = list(ints[pos:pos + n_operated])
+    pos += n_operated
+    for _ in range(n_ants):
+        id, player, hp, maxhp, x, y, level, age, evasion, ant_state, path_len = ints[pos:pos + 11]
+        pos += 11
+        path = [Coord(*cell_xy(c)) for c in ints[pos:pos + path_len]]
+        pos += path_len
+        state.ants.append(Ant(id, player, hp, maxhp, Coord(x, y), level, age, evasion, AntState(ant_state), path))
+    phero = []
+    for k in range(2):
+        p = pheromone_type()
+        p.value = [list(floats[k * 361 + i * 19:k * 361 + i * 19 + 19]) for i in range(19)]
+        phero.append(p)
+    state.phero = phero
+    return state
+
+
+class ReplayWriter:
+    """
+    流式写入回放文件。每个回合先调用 :meth:`begin_round` ，双方操作结束后调用 :meth:`end_round` ，
+    对局结束时调用 :meth:`close` 写入最终局面和索引。也可以作为上下文管理器使用。
+    """
+
+    def __init__(
+            self,
+            file: Union[str, BinaryIO],
+            seed: int = 0,
+            keyframe_interval: int = 32,
+            checksums: bool = True,
+    ):
+        """
+        :param file: 文件路径或以二进制写模式打开的文件对象
+        :param seed: 对局的随机种子，仅作记录
+        :param keyframe_interval: 关键帧间隔（回合）
+        :param checksums: 是否为每条记录保存局面摘要
+        """
+        if keyframe_interval <= 0:
+            raise ValueError("keyframe_interval must be positive")
+        self._own_file = isinstance(file, str)
+        self._file: BinaryIO = open(file, "wb") if isinstance(file, str) else file
+        self.keyframe_interval = keyframe_interval
+        self.checksums = checksums
+        self._index: list[tuple[int, int, int]] = []
+        self._pending: Optional[tuple[int, int, bytes, int]] = None
+        self._offset = 0
+        self._last_round: Optional[int] = None
+        self._closed = False
+        self._write(_HEADER.pack(MAGIC, VERSION, FLAG_CHECKSUMS if checksums else 0, keyframe_interval, seed))
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._offset += len(data)
+
+    def _write_record(self, kind: int, round: int, payload: bytes, digest: int) -> None:
+        self._index.append((round, self._offset, kind))
+        self._write(_RECORD.pack(kind, len(payload), round, digest) + payload)
+        self._last_round = round
+
+    def begin_round(self, state: GameState) -> None:
+        """
+        记录回合开始时（执行操作之前）的局面。需要时会在此刻编码关键帧，之后修改 ``state`` 不受影响。
+
+        :param state: 回合开始时的局面
+        """
+        first = self._last_round is None
+        kind = KEYFRAME if first or state.round % self.keyframe_interval == 0 else DELTA
+        if not first and state.round != self._last_round + 1:
+            kind = KEYFRAME
+        blob = encode_state(state) if kind == KEYFRAME else b""
+        digest = state.round_digest() if self.checksums else 0
+        self._pending = (kind, state.round, blob, digest)
+
+    def end_round(self, ops0: list[Operation], ops1: list[Operation]) -> None:
+        """
+        写入本回合的记录。
+
+        :param ops0: 先手本回合实际执行的操作
+        :param ops1: 后手本回合实际执行的操作
+        """
+        if self._pending is None:
+            raise RuntimeError("end_round called without begin_round")
+        kind, round, blob, digest = self._pending
+        self._pending = None
+        self._write_record(kind, round, blob + _encode_operations(ops0, ops1), digest)
+
+    def write_round(self, state: GameState, ops0: list[Operation], ops1: list[Operation]) -> None:
+        """已知回合开始时的局面和双方操作时，一次写入一个回合，等价于 :meth:`begin_round` 加 :meth:`end_round` 。"""
+        self.begin_round(state)
+        self.end_round(ops0, ops1)
+
+    def write_keyframe(self, state: GameState) -> None:
+        """只写入一个关键帧，不带操作，用于最终局面或没有操作信息的局面。"""
+        digest = state.round_digest() if self.checksums else 0
+        self._write_record(KEYFRAME, state.round, encode_state(state) + _encode_operations([], []), digest)
+
+    def close(self, final_state: Optional[GameState] = None) -> None:
+        """
+        结束写入：可选地写入最终局面的关键帧，然后写入索引。
+
+        :param final_state: 对局结束时的局面
+        """
+        if self._closed:
+            return
+        if final_state is not None:
+            self.write_keyframe(final_state)
+        index_offset = self._offset
+        for entry in self._index:
+            self._write(_INDEX_ENTRY.pack(*entry))
+        self._write(_FOOTER.pack(index_offset, len(self._index), _INDEX_MAGIC))
+        self._file.flush()
+        if self._own_file:
+            self._file.close()
+        self._closed = True
+
+    def __enter__(self) -> "ReplayWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReplayReader:
+    """
+    通过内存映射读取回放文件，支持随机访问任意回合。也可以作为上下文管理器使用。
+
+    文件格式不正确或内容损坏时，各个方法都会抛出 :class:`ValueError` 。
+    """
+
+    def __init__(self, path: str, pheromone_type: type[Pheromone] = Pheromone, verify: bool = True):
+        """
+        :param path: 回放文件路径
+        :param pheromone_type: 恢复局面时所用的信息素实现
+        :param verify: 文件中保存了局面摘要时，是否默认用它验证恢复的局面，参见 :meth:`state_at` 与 :meth:`__iter__`
+        :raise ValueError: 不是支持的回放文件
+        """
+        self.pheromone_type = pheromone_type
+        self.verify = verify  #: 是否默认验证局面摘要
+        self._map = None
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"replay file is too short ({size} bytes)")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, flags, interval, seed = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("not a replay file of a supported version")
+            self.seed: int = seed  #: 对局的随机种子
+            self.keyframe_interval: int = interval  #: 写入时的关键帧间隔
+            self.has_checksums: bool = bool(flags & FLAG_CHECKSUMS)  #: 记录中是否保存了局面摘要
+            self._index = self._read_index()
+            self._by_round = {round: i for i, (round, _, _) in enumerate(self._index)}
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_index(self) -> list[tuple[int, int, int]]:
+        size = len(self._map)
+        if size >= _HEADER.size + _FOOTER.size:
+            index_offset, count, magic = _FOOTER.unpack_from(self._map, size - _FOOTER.size)
+            if magic == _INDEX_MAGIC and _HEADER.size <= index_offset <= size - _FOOTER.size \
+                    and index_offset + count * _INDEX_ENTRY.size == size - _FOOTER.size:
+                index = [
+                    _INDEX_ENTRY.unpack_from(self._map, index_offset + i * _INDEX_ENTRY.size) for i in range(count)
+                ]
+                # 索引项必须指向索引之前的完整记录，否则视为损坏，改为顺序扫描
+                if all(
+                        kind in (KEYFRAME, DELTA) and offset + _RECORD.size <= index_offset
+                        and offset + _RECORD.size + _RECORD.unpack_from(self._map, offset)[1] <= index_offset
+                        for _, offset, kind in index
+                ):
+                    return index
+        # 没有索引（例如写入被中断）：顺序扫描完整的记录
+        index = []
+        offset = _HEADER.size
+        while offset + _RECORD.size <= size:
+            kind, length, round, _ = _RECORD.unpack_from(self._map, offset)
+            if kind not in (KEYFRAME, DELTA) or offset + _RECORD.size + length > size:
+                break
+            index.append((round, offset, kind))
+            offset += _RECORD.size + length
+        return index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def rounds(self) -> list[int]:
+        """文件中记录的全部回合"""
+        return [round for round, _, _ in self._index]
+
+    @property
+    def keyframe_rounds(self) -> list[int]:
+        """保存了关键帧的回合"""
+        return [round for round, _, kind in self._index if kind == KEYFRAME]
+
+    def _record(self, i: int) -> tuple[int, int, memoryview]:
+        _, offset, _ = self._index[i]
+        kind, length, _, digest = _RECORD.unpack_from(self._map, offset)
+        start = offset + _RECORD.size
+        # 复制出记录的数据，不直接引用内存映射，否则异常的回溯中残留的视图会使 close 失败
+        return kind, digest, memoryview(self._map[start:start + length])
+
+    def _split(self, kind: int, payload: memoryview) -> tuple[Optional[memoryview], memoryview]:
+        if kind != KEYFRAME:
+            return None, payload
+        n = _U32.unpack_from(payload, 0)[0]
+        end = 4 + 4 * n + 8 * 722
+        if end > len(payload):
+            raise ValueError("corrupt keyframe record")
+        return payload[:end], payload[end:]
+
+    def _keyframe_state(self, i: int) -> GameState:
+        kind, _, payload = self._record(i)
+        if kind != KEYFRAME:
+            raise ValueError("replay does not start with a keyframe")
+        try:
+            return decode_state(self._split(kind, payload)[0], self.pheromone_type)
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"corrupt keyframe record: {e}") from e
+
+    def _check(self, state: GameState, i: int) -> None:
+        if state.round_digest() != self._record(i)[1]:
+            raise ValueError(f"replay checksum mismatch at round {self._index[i][0]}")
+
+    def digest(self, round: int) -> Optional[int]:
+        """某回合开始时的局面摘要，文件中没有保存摘要时返回 ``None`` """
+        if not self.has_checksums:
+            return None
+        return self._record(self._by_round[round])[1]
+
+    def operations(self, round: int) -> tuple[list[Operation], list[Operation]]:
+        """某回合双方实际执行的操作"""
+        kind, _, payload = self._record(self._by_round[round])
+        return _decode_operations(self._split(kind, payload)[1])
+
+    def state_at(self, round: int, verify: Optional[bool] = None) -> GameState:
+        """
+        某回合开始时（执行操作之前）的局面。从不晚于该回合的最近关键帧开始模拟。
+
+        :param round: 回合数，必须是文件中记录的回合
+        :param verify: 是否用保存的局面摘要验证结果，默认与构造时的 ``verify`` 相同
+        :return: 局面
+        :raise KeyError: 文件中没有记录该回合
+        :raise ValueError: 文件损坏或验证失败
+        """
+        target = self._by_round[round]
+        start = target
+        while start > 0 and self._index[start][2] != KEYFRAME:
+            start -= 1
+        state = self._keyframe_state(start)
+        for i in range(start, target):
+            self._advance(state, i)
+        if (self.verify if verify is None else verify) and self.has_checksums:
+            self._check(state, target)
+        return state
+
+    def _advance(self, state: GameState, i: int) -> None:
+        kind, _, payload = self._record(i)
+        try:
+            ops0, ops1 = _decode_operations(self._split(kind, payload)[1])
+            for op in ops0:
+                state.apply_operation(0, op)
+            for op in ops1:
+                state.apply_operation(1, op)
+            # 损坏的关键帧可能包含地图外的坐标等，模拟时才会出错
+            state.simulate_next_round()
+        except (struct.error, IndexError, KeyError) as e:
+            raise ValueError(f"corrupt record at round {self._index[i][0]}: {e!r}") from e
+
+    def __iter__(self) -> Iterator[GameState]:
+        """
+        按顺序产出每个记录回合开始时的局面。关键帧直接解码，其余回合由上一回合模拟得到。
+        构造时 ``verify`` 为真且文件中保存了局面摘要时，每个局面都会被验证，不一致时抛出 :class:`ValueError` 。
+        """
+        verify = self.verify and self.has_checksums
+        state: Optional[GameState] = None
+        for i in range(len(self._index)):
+            if state is None or self._index[i][2] == KEYFRAME:
+                state = self._keyframe_state(i)
+            else:
+                self._advance(state, i - 1)
+            if verify:
+                self._check(state, i)
+            yield state.fork()
+
+    def close(self) -> None:
+        """关闭文件"""
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "ReplayReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+MiniReplaySource = Union[str, Iterable[str]]
+"""迷你回放的来源：完整的文本，或者逐行（或逐段）产出文本的可迭代对象，例如以文本模式打开的文件"""
+
+
+@dataclass(frozen=True)
+class MiniReplayFrame:
+    """
+    迷你回放中一个回合的只读视图。只做了最少的解析，比构造 :class:`.gamestate.GameState` 快得多，适合大规模统计。
+    """
+
+    round: int  #: 回合数
+    towers: list[tuple[int, int, int, int, int, int]]  #: 防御塔，每项为 ``(id, player, x, y, type, cd)``
+    ants: list[tuple[int, int, int, int, int, int, int, int]]
+    """蚂蚁，每项为 ``(id, player, x, y, hp, level, age, state)`` """
+    coin: tuple[int, int]  #: 双方金币数量
+    hp: tuple[int, int]  #: 双方主基地血量
+    pheromone: array
+    """双方信息素，共 2*19*19 个浮点数，按玩家、x、y 的顺序排列，参见 :meth:`pheromone_at` """
+
+    def pheromone_at(self, player: int, x: int, y: int) -> float:
+        """某一方在某个位置的信息素"""
+        return self.pheromone[player * 361 + x * 19 + y]
+
+    @classmethod
+    def from_state(cls, state: GameState) -> "MiniReplayFrame":
+        """
+        从局面构造视图，内容与解析 ``state.dump_mini_replay()`` 的结果相同，只是信息素保留完整精度。
+
+        :param state: 局面
+        :return: 视图
+        """
+        return cls(
+            state.round,
+            [(t.id, t.player, t.coord.x, t.coord.y, int(t.type), t.cd) for t in state.towers],
+            [(a.id, a.player, a.coord.x, a.coord.y, a.hp, a.level, a.age, int(a.state)) for a in state.ants],
+            (state.coin[0], state.coin[1]),
+            (state.hp[0], state.hp[1]),
+            array("d", [v for p in state.phero for row in p.value_view() for v in row]),
+        )
+
+    def to_state(self, pheromone_type: type[Pheromone] = Pheromone) -> GameState:
+        """
+        构造对应的局面，与 :meth:`.gamestate.GameState.from_mini_replay` 的结果相同。
+
+        :param pheromone_type: 信息素的实现
+        :return: 局面
+        """
+        state = GameState()
+        state.round = self.round
+        state.towers = [
+            Tower(id, player, Coord(x, y), TowerType(ttype), cd) for id, player, x, y, ttype, cd in self.towers
+        ]
+        for id, player, x, y, hp, level, age, ant_state in self.ants:
+            coord = Coord(x, y)
+            state.ants.append(
+                Ant(id, player, hp, Ant.maxhp_of_level(level), coord, level, age, 0, AntState(ant_state), [coord])
+            )
+        state.coin = list(self.coin)
+        state.hp = list(self.hp)
+        phero = []
+        for k in range(2):
+            p = pheromone_type()
+            p.value = [self.pheromone[k * 361 + i * 19:k * 361 + i * 19 + 19].tolist() for i in range(19)]
+            phero.append(p)
+        state.phero = phero
+        state.next_tower_id = max([t.id + 1 for t in state.towers], default=0)
+        state.next_ant_id = max([a.id + 1 for a in state.ants], default=0)
+        return state
+
+
+def _source_lines(source: MiniReplaySource) -> Iterator[str]:
+    if isinstance(source, str):
+        yield from io.StringIO(source)
+        return
+    for chunk in source:
+        # 文件逐行产出；也允许每项是一整段多行文本，例如 dump_mini_replay 的输出列表
+        if "\n" in chunk.rstrip("\n"):
+            yield from chunk.splitlines()
+        else:
+            yield chunk
+
+
+def _next_line(lines: Iterator[str]) -> str:
+    line = next(lines, None)
+    if line is None:
+        raise ValueError("truncated mini replay")
+    return line
+
+
+def _int_rows(lines: Iterator[str], n: int, width: int) -> list[tuple]:
+    values = list(map(int, " ".join(islice(lines, n)).split()))
+    if len(values) != n * width:
+        raise ValueError("truncated mini replay")
+    it = iter(values)
+    return list(zip(*[it] * width))
+
+
+def iter_mini_replay_frames(source: MiniReplaySource) -> Iterator[MiniReplayFrame]:
+    """
+    流式解析迷你回放，每个回合产出一个 :class:`MiniReplayFrame` 。来源可以是单个回合，也可以是多个回合直接拼接而成的文本，
+    回合之间允许有空行。从文件读取时只保留当前回合的内容，内存占用与文件大小无关。
+
+    .. code-block:: python
+
+        with open("replay.txt") as f:
+            for frame in iter_mini_replay_frames(f):
+                ...
+
+    :param source: 迷你回放的来源
+    :raise ValueError: 文本不完整或格式错误
+    """
+    lines = _source_lines(source)
+    for line in lines:
+        if not line.strip():
+            continue
+        round = int(line)
+        towers = _int_rows(lines, int(_next_line(lines)), 6)
+        ants = _int_rows(lines, int(_next_line(lines)), 8)
+        coin0, coin1 = map(int, _next_line(lines).split())
+        hp0, hp1 = map(int, _next_line(lines).split())
+        # 两个 19x19 的信息素矩阵一次性拆分和转换
+        pheromone = array("d", map(float, " ".join(islice(lines, 38)).split()))
+        if len(pheromone) != 722:
+            raise ValueError("truncated mini replay")
+        yield MiniReplayFrame(round, towers, ants, (coin0, coin1), (hp0, hp1), pheromone)
+
+
+def iter_mini_replays(source: MiniReplaySource, pheromone_type: type[Pheromone] = Pheromone) -> Iterator[GameState]:
+    """
+    流式解析迷你回放，每个回合产出一个局面。参见 :func:`iter_mini_replay_frames` 和
+    :meth:`.gamestate.GameState.from_mini_replay` 。
+
+    :param source: 迷你回放的来源
+    :param pheromone_type: 信息素的实现
+    """
+    for frame in iter_mini_replay_frames(source):
+        yield frame.to_state(pheromone_type)
+
+
+def replay_to_mini_replay(path: str) -> Iterator[str]:
+    """
+    把回放文件转换为迷你回放文本，每个记录回合产出一段 :meth:`.gamestate.GameState.dump_mini_replay` 的输出。
+
+    :param path: 回放文件路径
+    """
+    with ReplayReader(path) as reader:
+        for state in reader:
+            yield state.dump_mini_replay()
+
+
+def mini_replay_to_replay(source: MiniReplaySource, file: Union[str, BinaryIO], seed: int = 0) -> None:
+    """
+    把迷你回放文本转换为回放文件。迷你回放不包含操作，也不是完整的局面（参见
+    :meth:`.gamestate.GameState.from_mini_replay` ），因此每个回合都保存为关键帧。
+
+    :param source: 迷你回放的来源，参见 :func:`iter_mini_replay_frames`
+    :param file: 输出的文件路径或文件对象
+    :param seed: 记录在文件头中的随机种子
+    """
+    writer = ReplayWriter(file, seed=seed)
+    for state in iter_mini_replays(source):
+        writer.write_keyframe(state)
+    writer.close()
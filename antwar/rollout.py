@@ -0,0 +1,256 @@
+"""
+多进程的候选操作评估器。
+
+给定当前局面和若干候选操作列表，:class:`RolloutEvaluator` 在常驻的工作进程中为每个候选操作列表进行若干次推演（rollout）：
+先执行候选操作，再由双方的推演策略继续对局若干回合，最后用评分函数给出分数并汇总。工作进程在多个回合之间复用，
+推演策略与评分函数只在进程启动时传递一次，因此它们必须是可以被 ``pickle`` 的模块级函数。
+"""
+import pickle
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .gamestate import GameState
+from .protocol import Operation
+
+RolloutPolicy = Callable[[int, GameState], list[Operation]]
+"""推演策略，与 :func:`.controller.run_antwar_ai` 的决策函数签名相同"""
+
+ScoreFunction = Callable[[GameState, int], float]
+"""评分函数，参数为推演结束时的局面和需要评分的玩家，分数越高越好"""
+
+
+def no_operation_policy(my_seat: int, state: GameState) -> list[Operation]:
+    """什么都不做的推演策略"""
+    return []
+
+
+def hp_difference(state: GameState, player: int) -> float:
+    """默认的评分函数：双方大本营血量之差"""
+    return float(state.hp[player] - state.hp[1 - player])
+
+
+@dataclass
+class CandidateResult:
+    """一个候选操作列表的汇总评估结果"""
+    index: int  #: 候选操作列表在输入中的位置
+    ops: list[Operation]  #: 候选操作列表
+    valid: bool  #: 候选操作列表能否在当前局面中全部执行
+    rollouts: int = 0  #: 完成的推演次数
+    total: float = 0.0  #: 分数总和
+
+    @property
+    def mean(self) -> Optional[float]:
+        """平均分数。若没有完成任何推演，返回 ``None`` """
+        return self.total / self.rollouts if self.rollouts > 0 else None
+
+
+_policy: RolloutPolicy = no_operation_policy
+_score: ScoreFunction = hp_difference
+
+
+def _init_worker(policy: RolloutPolicy, score: ScoreFunction) -> None:
+    global _policy, _score  # pylint: disable=global-statement
+    _policy, _score = policy, score
+
+
+def _apply_all(state: GameState, player: int, ops: list[Operation]) -> bool:
+    for op in ops:
+        if not state.apply_operation(player, op):
+            return False
+    return True
+
+
+def rollout(
+        state: GameState,
+        player: int,
+        ops: list[Operation],
+        policy: RolloutPolicy,
+        score: ScoreFunction,
+        horizon: int,
+        deadline: float = float("inf"),
+) -> Optional[float]:
+    """
+    进行一次推演。原局面不会被修改。
+
+    回合内的行动顺序与 :func:`.controller.run_antwar_ai` 相同：先手行动、后手行动，然后结算。
+    ``state`` 应当处于 ``player`` 需要行动的时刻，也就是说，若 ``player`` 为后手，先手本回合的操作应当已经执行。
+
+    :param state: 当前局面
+    :param player: 执行候选操作的玩家
+    :param ops: 候选操作列表
+    :param policy: 双方在后续回合使用的推演策略
+    :param score: 评分函数
+    :param horizon: 推演的回合数（包括当前回合）
+    :param deadline: 截止时刻（ ``time.time()`` ），每回合开始前检查，超过时抛出 ``TimeoutError`` 放弃本次推演
+    :return: 推演结束时 ``player`` 的分数。若候选操作无效，返回 ``None``
+    """
+    s = state.fork()
+    if not _apply_all(s, player, ops):
+        return None
+    if player == 0:
+        _apply_all(s, 1, policy(1, s))
+    for r in range(horizon):
+        if time.time() >= deadline:
+            raise TimeoutError("rollout deadline exceeded")
+        if r > 0:
+            for seat in range(2):
+                _apply_all(s, seat, policy(seat, s))
+        s.simulate_next_round()
+    return score(s, player)
+
+
+def _run_task(
+        state_bytes: bytes,
+        player: int,
+        ops: list[Operation],
+        horizon: int,
+        count: int,
+        seed: int,
+        deadline: float,
+        abandon_late: bool,
+) -> tuple[bool, int, float]:
+    # abandon_late为真时，到达截止时间立即放弃进行中的推演，否则至少完成一次推演
+    state = pickle.loads(state_bytes)
+    done, total = 0, 0.0
+    for i in range(count):
+        if (done > 0 or abandon_late) and time.time() >= deadline:
+            break
+        random.seed(seed + i)
+        try:
+            result = rollout(
+                state, player, ops, _policy, _score, horizon, deadline if abandon_late else float("inf")
+            )
+        except TimeoutError:
+            break
+        if result is None:
+            return False, 0, 0.0
+        done += 1
+        total += result
+    return True, done, total
+
+
+class RolloutEvaluator:
+    """
+    常驻进程池上的候选操作评估器。可以作为上下文管理器使用，退出时关闭进程池。
+
+    .. code-block:: python
+
+        evaluator = RolloutEvaluator(my_policy, my_score)
+
+        def ai(my_seat, state):
+            results = evaluator.evaluate(state, my_seat, candidates(state), horizon=20, time_budget=0.5)
+            best = max((r for r in results if r.mean is not None), key=lambda r: r.mean, default=None)
+            return best.ops if best is not None else []
+    """
+
+    def __init__(
+            self,
+            policy: RolloutPolicy = no_operation_policy,
+            score: ScoreFunction = hp_difference,
+            max_workers: Optional[int] = None,
+    ):
+        """
+        :param policy: 双方的推演策略，必须是可以被 ``pickle`` 的模块级函数
+        :param score: 评分函数，必须是可以被 ``pickle`` 的模块级函数
+        :param max_workers: 工作进程数量，默认为CPU核数。为0时在当前进程中串行推演，便于调试；
+            此时 ``random`` 模块的全局状态会在每次评估结束后恢复，不影响调用者。
+        """
+        self.policy = policy
+        self.score = score
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if max_workers != 0:
+            self._pool = ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(policy, score))
+
+    def evaluate(
+            self,
+            state: GameState,
+            player: int,
+            candidates: list[list[Operation]],
+            horizon: int = 10,
+            time_budget: Optional[float] = None,
+            rollouts_per_candidate: int = 1,
+            chunk_size: int = 4,
+            seed: int = 0,
+    ) -> list[CandidateResult]:
+        """
+        评估候选操作列表。
+
+        :param state: 当前局面，不会被修改。
+        :param player: 执行候选操作的玩家，参见 :func:`rollout`
+        :param candidates: 候选操作列表的列表
+        :param horizon: 每次推演的回合数
+        :param time_budget: 墙上时钟预算（秒）。超时后不再开始新的推演，并丢弃尚未完成的任务。为 ``None`` 时不限时。
+            使用进程池时，工作进程中进行到一半的推演也会在截止后的下一个回合开始前放弃，不会占用下一次评估的工作进程；
+            串行推演时进行中的推演总会完成。
+        :param rollouts_per_candidate: 每个候选操作列表的推演次数。推演策略可以使用 ``random`` 模块，每次推演前都会以确定的种子重置。
+        :param chunk_size: 每个任务包含的推演次数
+        :param seed: 随机种子
+        :return: 与 ``candidates`` 一一对应的评估结果
+        """
+        start = time.time()
+        deadline = start + time_budget if time_budget is not None else float("inf")
+        results = [CandidateResult(i, ops, True) for i, ops in enumerate(candidates)]
+        snapshot = state.fork()
+        tasks = []
+        for i, ops in enumerate(candidates):
+            for first in range(0, rollouts_per_candidate, chunk_size):
+                count = min(chunk_size, rollouts_per_candidate - first)
+                tasks.append((i, ops, count, seed + i * rollouts_per_candidate + first))
+
+        def merge(i: int, outcome: tuple[bool, int, float]) -> None:
+            valid, done, total = outcome
+            if not valid:
+                results[i].valid = False
+                return
+            results[i].rollouts += done
+            results[i].total += total
+
+        if self._pool is None:
+            _init_worker(self.policy, self.score)
+            state_bytes = pickle.dumps(snapshot)
+            # 推演会重置random模块的种子，串行推演时需要恢复调用者的随机状态
+            random_state = random.getstate()
+            try:
+                for i, ops, count, task_seed in tasks:
+                    if time.time() >= deadline:
+                        break
+                    if results[i].valid:
+                        merge(i, _run_task(state_bytes, player, ops, horizon, count, task_seed, deadline, False))
+            finally:
+                random.setstate(random_state)
+            return results
+
+        state_bytes = pickle.dumps(snapshot)
+        pending: dict[Future, int] = {
+            self._pool.submit(_run_task, state_bytes, player, ops, horizon, count, task_seed, deadline, True): i
+            for i, ops, count, task_seed in tasks
+        }
+        try:
+            while pending:
+                timeout = None if time_budget is None else max(0.0, deadline - time.time())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    merge(pending.pop(future), future.result())
+        finally:
+            # 超时或出错时取消尚未开始的任务，已经开始的任务会在截止时间后放弃进行中的推演
+            for future in pending:
+                future.cancel()
+        return results
+
+    def shutdown(self) -> None:
+        """关闭工作进程"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "RolloutEvaluator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
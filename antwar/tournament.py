@@ -0,0 +1,269 @@
+"""
+基于 :mod:`antwar.arena` 的多进程锦标赛。
+
+赛程由若干局 :class:`GameSpec` 组成。 :func:`round_robin` 与 :func:`gauntlet` 生成成对的赛程：同一对选手在同一个随机种子下
+交换先后手各打一局，从而抵消地图与先后手带来的差异。 :func:`run_tournament` 把对局分发到多个工作进程中，
+每完成一局就向结果文件追加一行JSON；中断后用同样的参数再次运行，已经记录在文件中的对局会被跳过。
+某一局出错（例如选手名字不存在或工作进程崩溃）时只记录这一局为 ``"crash"`` ，锦标赛继续进行。
+:func:`standings` 根据结果计算各选手的得分率、Elo分数及其置信区间。
+
+参赛的决策函数会被传递给工作进程，因此必须是可以被 ``pickle`` 的模块级函数。
+"""
+import json
+import math
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .arena import MAX_ROUND, AiFunc, play_match
+
+
+@dataclass(frozen=True)
+class GameSpec:
+    """一局对战的安排"""
+    bot0: str  #: 先手选手的名字
+    bot1: str  #: 后手选手的名字
+    seed: int  #: 随机种子
+
+    @property
+    def key(self) -> str:
+        """在结果文件中标识这局对战的字符串"""
+        return f"{self.bot0}|{self.bot1}|{self.seed}"
+
+
+def round_robin(names: list[str], seeds: Iterable[int]) -> list[GameSpec]:
+    """
+    单循环赛程：每一对选手在每个种子下交换先后手各打一局。
+
+    :param names: 选手名字
+    :param seeds: 随机种子
+    :return: 赛程
+    """
+    seeds = list(seeds)
+    games = []
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            for seed in seeds:
+                games += [GameSpec(a, b, seed), GameSpec(b, a, seed)]
+    return games
+
+
+def gauntlet(challengers: list[str], opponents: list[str], seeds: Iterable[int]) -> list[GameSpec]:
+    """
+    挑战赛程：每个挑战者与每个对手在每个种子下交换先后手各打一局，挑战者之间、对手之间不对战。
+
+    :param challengers: 挑战者名字
+    :param opponents: 对手名字
+    :param seeds: 随机种子
+    :return: 赛程
+    """
+    seeds = list(seeds)
+    return [
+        spec
+        for a in challengers
+        for b in opponents
+        if a != b
+        for seed in seeds
+        for spec in (GameSpec(a, b, seed), GameSpec(b, a, seed))
+    ]
+
+
+_bots: dict[str, AiFunc] = {}
+
+
+def _init_worker(bots: dict[str, AiFunc]) -> None:
+    global _bots  # pylint: disable=global-statement
+    _bots = bots
+
+
+def _crash_record(spec: GameSpec, error: str) -> dict:
+    return {
+        "key": spec.key,
+        "bot0": spec.bot0,
+        "bot1": spec.bot1,
+        "seed": spec.seed,
+        "winner": None,
+        "reason": "crash",
+        "error": error,
+    }
+
+
+def _play(spec: GameSpec, max_round: int) -> dict:
+    try:
+        result = play_match(_bots[spec.bot0], _bots[spec.bot1], spec.seed, max_round)
+    except Exception:  # pylint: disable=broad-except
+        return _crash_record(spec, traceback.format_exc())
+    return {
+        "key": spec.key,
+        "bot0": spec.bot0,
+        "bot1": spec.bot1,
+        "seed": spec.seed,
+        "winner": result.winner,
+        "reason": result.reason,
+        "rounds": result.rounds,
+        "hp": result.hp,
+        "time": [result.total_time(0), result.total_time(1)],
+    }
+
+
+def load_results(path: str) -> list[dict]:
+    """
+    读取结果文件。文件不存在时返回空列表；中断时写了一半的最后一行会被忽略。
+
+    :param path: 结果文件路径
+    :return: 每局一个字典，字段与 :func:`run_tournament` 写入的相同
+    """
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def run_tournament(
+        bots: dict[str, AiFunc],
+        games: list[GameSpec],
+        results_path: str,
+        max_workers: Optional[int] = None,
+        max_round: int = MAX_ROUND,
+        retry_crashed: bool = False,
+) -> list[dict]:
+    """
+    运行锦标赛。结果文件中已有的对局（按 :attr:`GameSpec.key` 判断）不会重复进行。
+
+    出错的对局记录为 ``"reason": "crash"`` ，不分胜负，并在 ``"error"`` 字段中记录异常信息， :func:`standings` 会忽略它们。
+
+    :param bots: 选手名字到决策函数的映射
+    :param games: 赛程
+    :param results_path: 结果文件路径，每局一行JSON，只追加不改写
+    :param max_workers: 工作进程数量，默认为CPU核数。为0时在当前进程中串行进行，便于调试。
+    :param max_round: 每局的回合上限
+    :param retry_crashed: 是否重新进行结果文件中记录为出错的对局
+    :return: 结果文件中的全部对局结果，包括之前已经完成的
+    """
+    records = load_results(results_path)
+    done = {r["key"] for r in records if not (retry_crashed and r["reason"] == "crash")}
+    pending = [spec for spec in games if spec.key not in done]
+    pending = list({spec.key: spec for spec in pending}.values())
+
+    # 补上被截断的最后一行缺少的换行符，避免与新写入的行粘在一起
+    if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+        with open(results_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            need_newline = f.read(1) != b"\n"
+    else:
+        need_newline = False
+
+    with open(results_path, "a", encoding="utf-8") as out:
+        if need_newline:
+            out.write("\n")
+
+        def write(record: dict) -> None:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            records.append(record)
+
+        if max_workers == 0:
+            _init_worker(bots)
+            for spec in pending:
+                write(_play(spec, max_round))
+        else:
+            with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(bots,)) as pool:
+                futures = {pool.submit(_play, spec, max_round): spec for spec in pending}
+                for future in as_completed(futures):
+                    try:
+                        record = future.result()
+                    except Exception:  # pylint: disable=broad-except
+                        # 工作进程崩溃等无法在对局内部捕获的错误
+                        record = _crash_record(futures[future], traceback.format_exc())
+                    write(record)
+    return records
+
+
+@dataclass
+class Standing:
+    """一名选手的成绩。置信区间以同一对选手、同一种子下交换先后手的一组对局为单位计算。"""
+    name: str  #: 选手名字
+    games: int  #: 对局数
+    wins: int  #: 胜局数
+    draws: int  #: 平局数
+    losses: int  #: 负局数
+    score: float  #: 得分率，胜1分、平0.5分
+    score_low: float  #: 得分率置信区间下界
+    score_high: float  #: 得分率置信区间上界
+    elo: float  #: 相对于所有对手平均水平的Elo分差
+    elo_low: float  #: Elo分差置信区间下界
+    elo_high: float  #: Elo分差置信区间上界
+
+
+def _elo_of_score(score: float, n: int) -> float:
+    # 得分率为0或1时Elo为无穷，按半局的差距截断
+    eps = 0.5 / max(n, 1)
+    score = min(max(score, eps), 1 - eps)
+    return -400 * math.log10(1 / score - 1)
+
+
+def standings(records: list[dict], z: float = 1.96) -> list[Standing]:
+    """
+    统计各选手的成绩，按得分率从高到低排列。出错的对局（ ``"reason"`` 为 ``"crash"`` ）不计入。
+
+    :param records: 对局结果，参见 :func:`load_results`
+    :param z: 置信区间对应的正态分位数，默认1.96即95%置信区间
+    :return: 各选手的成绩
+    """
+    tally: dict[str, list[int]] = {}
+    units: dict[str, dict[tuple, list[float]]] = {}
+    for r in records:
+        if r["reason"] == "crash":
+            continue
+        pair = tuple(sorted((r["bot0"], r["bot1"])))
+        for seat, name in enumerate((r["bot0"], r["bot1"])):
+            t = tally.setdefault(name, [0, 0, 0])
+            if r["winner"] is None:
+                t[1] += 1
+                s = 0.5
+            elif r["winner"] == seat:
+                t[0] += 1
+                s = 1.0
+            else:
+                t[2] += 1
+                s = 0.0
+            units.setdefault(name, {}).setdefault((pair, r["seed"]), []).append(s)
+
+    result = []
+    for name, (wins, draws, losses) in tally.items():
+        games = wins + draws + losses
+        score = (wins + 0.5 * draws) / games
+        unit_scores = [sum(v) / len(v) for v in units[name].values()]
+        n = len(unit_scores)
+        if n > 1:
+            var = sum((u - score) ** 2 for u in unit_scores) / (n - 1)
+            half = z * math.sqrt(var / n)
+        else:
+            half = 0.5
+        low, high = max(0.0, score - half), min(1.0, score + half)
+        result.append(Standing(
+            name, games, wins, draws, losses, score, low, high,
+            _elo_of_score(score, games), _elo_of_score(low, games), _elo_of_score(high, games),
+        ))
+    result.sort(key=lambda s: s.score, reverse=True)
+    return result
+
+
+def format_standings(table: list[Standing]) -> str:
+    """将成绩表格式化为便于阅读的文本"""
+    lines = [f"{'name':<16} {'games':>6} {'W':>5} {'D':>5} {'L':>5} {'score':>17} {'elo':>22}"]
+    for s in table:
+        lines.append(
+            f"{s.name:<16} {s.games:>6} {s.wins:>5} {s.draws:>5} {s.losses:>5} "
+            f"{s.score:>5.3f} [{s.score_low:.3f},{s.score_high:.3f}] "
+            f"{s.elo:>+6.0f} [{s.elo_low:+.0f},{s.elo_high:+.0f}]"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class TranspositionTable(Generic[V]):
+    """
+    置换表：以 :meth:`.gamestate.GameState.state_key` 为键缓存局面评估结果的有界缓存。
+
+    容量满时淘汰最久未被访问的条目（LRU）。通过不同操作顺序到达的相同局面会共享同一个条目。
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        """
+        :param capacity: 最多缓存的条目数
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity: int = capacity  #: 最多缓存的条目数
+        self.hits: int = 0  #: 命中次数
+        self.misses: int = 0  #: 未命中次数
+        self._entries: OrderedDict[int, V] = OrderedDict()
+
+    def get(self, key: int, default: Optional[V] = None) -> Optional[V]:
+        """查询条目，命中时会将其标记为最近使用。若没有找到，返回 ``default`` """
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: int, value: V) -> None:
+        """写入或覆盖条目，必要时淘汰最久未被访问的条目。"""
+        entries = self._entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空所有条目和统计数据"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,307 @@
+"""
+模拟热点路径的基准测试。
+
+在仓库根目录下运行::
+
+    python benchmarks/run.py                      # 运行全部基准，并与 benchmarks/baseline.json 比较
+    python benchmarks/run.py --filter simulate    # 只运行名字中包含 simulate 的基准
+    python benchmarks/run.py --json out.json      # 额外把结果写入 out.json
+    python benchmarks/run.py --save-baseline      # 用本次结果覆盖 benchmarks/baseline.json
+
+结果为JSON，每个基准记录单次操作耗时（微秒）的最小值与中位数。与基准线比较时使用中位数，
+比值超过 ``--threshold`` 的基准会被标记为退化；指定 ``--fail-on-regression`` 时出现退化则以状态码1退出。
+基准线与机器相关，更换机器后请重新保存。
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from antwar.pheromone import Pheromone, generate_init_pheromone  # noqa: E402
+from antwar.protocol import read_enemy_operations, read_round_info, write_our_operation  # noqa: E402
+from antwar.replay import iter_mini_replays  # noqa: E402
+
+from scenarios import SCENARIOS, sample_operations  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+Setup = Callable[[], Callable[[], int]]
+"""基准的准备函数：完成不计时的准备工作，返回一个计时的函数，后者返回其中完成的操作次数"""
+
+BENCHMARKS: dict[str, Setup] = {}
+
+
+def benchmark(name: str):
+    """注册基准的装饰器"""
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+_states = {name: build() for name, build in SCENARIOS.items()}
+
+
+def _register_per_scenario() -> None:
+    for name, state in _states.items():
+        def simulate(state=state):
+            forks = [state.fork() for _ in range(10)]
+
+            def run() -> int:
+                for s in forks:
+                    s.simulate_next_round()
+                return len(forks)
+            return run
+
+        def apply(state=state, dry_run=False):
+            forks = [state.fork() for _ in range(5)]
+            ops = [sample_operations(p, state) for p in range(2)]
+
+            def run() -> int:
+                n = 0
+                for s in forks:
+                    for p in range(2):
+                        for op in ops[p]:
+                            s.apply_operation(p, op, dry_run)
+                        n += len(ops[p])
+                return n
+            return run
+
+        def dump(state=state):
+            def run() -> int:
+                for _ in range(5):
+                    state.dump_mini_replay()
+                return 5
+            return run
+
+        def load(state=state):
+            text = state.dump_mini_replay() * 5
+
+            def run() -> int:
+                for _ in iter_mini_replays(text):
+                    pass
+                return 5
+            return run
+
+        benchmark(f"simulate_next_round/{name}")(simulate)
+        benchmark(f"apply_operation/{name}")(apply)
+        benchmark(f"apply_operation_dry_run/{name}")(lambda state=state: apply(state, True))
+        benchmark(f"dump_mini_replay/{name}")(dump)
+        benchmark(f"load_mini_replay/{name}")(load)
+
+
+_register_per_scenario()
+
+
+def _moving_ants(state):
+    return [a for a in state.ants if a.hp > 0]
+
+
+@benchmark("next_move_direction/late/cold")
+def _next_move_cold():
+    state = _states["late"]
+    ants = _moving_ants(state)
+    phero = []
+    for _ in range(5):
+        pair = []
+        for p in state.phero:
+            fresh = Pheromone()
+            fresh.value = [row[:] for row in p.value_view()]
+            pair.append(fresh)
+        phero.append(pair)
+
+    def run() -> int:
+        for pair in phero:
+            for ant in ants:
+                pair[ant.player].next_move_direction(ant)
+        return len(phero) * len(ants)
+    return run
+
+
+@benchmark("next_move_direction/late/warm")
+def _next_move_warm():
+    state = _states["late"]
+    ants = _moving_ants(state)
+    for ant in ants:
+        state.phero[ant.player].next_move_direction(ant)
+
+    def run() -> int:
+        for _ in range(5):
+            for ant in ants:
+                state.phero[ant.player].next_move_direction(ant)
+        return 5 * len(ants)
+    return run
+
+
+@benchmark("search_attack_target/late")
+def _search_attack_target():
+    state = _states["late"]
+    towers = state.towers
+
+    def run() -> int:
+        for tower in towers:
+            state.search_attack_target(tower.player, tower.coord, tower.range())
+        return len(towers)
+    return run
+
+
+@benchmark("legal_operations/late")
+def _legal_operations():
+    state = _states["late"].fork()
+    state.coin = [10 ** 6, 10 ** 6]
+
+    def run() -> int:
+        for player in range(2):
+            state.legal_operations(player)
+        return 2
+    return run
+
+
+@benchmark("generate_init_pheromone")
+def _generate_init_pheromone():
+    def run() -> int:
+        for seed in range(5):
+            generate_init_pheromone(seed)
+        return 5
+    return run
+
+
+def _round_info_text(state) -> str:
+    lines = [str(state.round), str(len(state.towers))]
+    lines += [f"{t.id} {t.player} {t.coord.x} {t.coord.y} {t.type.value} {t.cd}" for t in state.towers]
+    lines.append(str(len(state.ants)))
+    lines += [
+        f"{a.id} {a.player} {a.coord.x} {a.coord.y} {a.hp} {a.level} {a.age} {int(a.state)}" for a in state.ants
+    ]
+    lines += [f"{state.coin[0]} {state.coin[1]}", f"{state.hp[0]} {state.hp[1]}"]
+    return "\n".join(lines) + "\n"
+
+
+def _with_stdin(text: str, read: Callable[[], object], count: int) -> Callable[[], int]:
+    data = (text * count).encode()
+
+    def run() -> int:
+        saved = sys.stdin
+        sys.stdin = io.TextIOWrapper(io.BytesIO(data))
+        try:
+            for _ in range(count):
+                read()
+        finally:
+            sys.stdin = saved
+        return count
+    return run
+
+
+@benchmark("protocol/read_round_info/late")
+def _read_round_info():
+    def read():
+        info = read_round_info()
+        return info.towers, info.ants
+    return _with_stdin(_round_info_text(_states["late"]), read, 20)
+
+
+@benchmark("protocol/read_enemy_operations")
+def _read_enemy_operations():
+    ops = sample_operations(0, _states["mid"])[:30]
+    text = f"{len(ops)}\n" + "".join(op.dump() + "\n" for op in ops)
+    return _with_stdin(text, read_enemy_operations, 50)
+
+
+@benchmark("protocol/write_our_operation")
+def _write_our_operation():
+    ops = sample_operations(0, _states["mid"])[:30]
+
+    class _Stdout:
+        buffer = io.BytesIO()
+
+    def run() -> int:
+        saved = sys.stdout
+        sys.stdout = _Stdout()
+        try:
+            for _ in range(50):
+                write_our_operation(ops)
+        finally:
+            sys.stdout = saved
+        return 50
+    return run
+
+
+def measure(setup: Setup, repeat: int) -> dict:
+    """运行一个基准 ``repeat`` 次，返回单次操作耗时（微秒）的统计"""
+    samples = []
+    for _ in range(repeat):
+        run = setup()
+        start = time.perf_counter()
+        n = run()
+        samples.append((time.perf_counter() - start) / n * 1e6)
+    return {"min_us": min(samples), "median_us": statistics.median(samples), "repeat": repeat}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> tuple[list[str], bool]:
+    """与基准线比较，返回报告的各行和是否出现退化"""
+    lines, regressed = [], False
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name:<44} {r['median_us']:>12.1f}us {'(new)':>10}")
+            continue
+        ratio = r["median_us"] / base["median_us"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag, regressed = "  REGRESSION", True
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        lines.append(f"{name:<44} {r['median_us']:>12.1f}us {ratio:>9.2f}x{flag}")
+    return lines, regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="只运行名字中包含该字符串的基准")
+    parser.add_argument("--repeat", type=int, default=7, help="每个基准的重复次数")
+    parser.add_argument("--json", help="把结果写入该文件")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基准线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="用本次结果覆盖基准线文件")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定为退化或提升的相对变化")
+    parser.add_argument("--fail-on-regression", action="store_true", help="出现退化时以状态码1退出")
+    args = parser.parse_args()
+
+    results = {
+        name: measure(setup, args.repeat)
+        for name, setup in BENCHMARKS.items()
+        if args.filter in name
+    }
+    report = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    regressed = False
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        lines, regressed = compare(results, baseline, args.threshold)
+        print("\n".join(lines))
+    else:
+        for name, r in results.items():
+            print(f"{name:<44} {r['median_us']:>12.1f}us")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
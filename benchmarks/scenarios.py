@@ -0,0 +1,131 @@
+"""
+基准测试所用的可复现局面。
+
+* ``empty`` ：刚初始化、没有任何防御塔和蚂蚁的局面。
+* ``mid`` ：双方由固定的脚本对战到第120回合的局面。
+* ``late`` ：直接构造的饱和局面——双方高台上布满各种类型的防御塔，地图上布满满级蚂蚁，双方的各类超级武器都在生效。
+"""
+from antwar.coord import Coord, is_player_highland
+from antwar.gamedata import Ant, AntState, SuperWeaponType, TowerType, can_tower_upgrade_to
+from antwar.gamestate import GameState
+from antwar.geometry import CELL_COUNT, ant_can_go_mask, cell_xy
+from antwar.protocol import Operation, OperationType
+
+SEED = 20231104  #: 所有局面使用的随机种子
+
+
+def player_highlands(player: int) -> list[Coord]:
+    """某一方的全部高台坐标，按坐标顺序排列"""
+    return [Coord(x, y) for x in range(19) for y in range(19) if is_player_highland(Coord(x, y), player)]
+
+
+def upgrade_path(ttype: TowerType) -> list[TowerType]:
+    """从BASIC升级到 ``ttype`` 所经过的类型（不含BASIC）"""
+    path = []
+    while ttype != TowerType.BASIC:
+        path.insert(0, ttype)
+        ttype = TowerType(ttype.value // 10)
+    return path
+
+
+def scripted_ops(player: int, state: GameState) -> list[Operation]:
+    """中盘局面所用的固定策略：依次占据高台，有余钱时沿固定路线升级防御塔。"""
+    for coord in player_highlands(player):
+        if state.tower_at(coord) is None:
+            build = Operation(OperationType.BUILD_TOWER, coord.x, coord.y)
+            if state.is_operation_valid(player, build):
+                return [build]
+            break
+    targets = [TowerType.HEAVY, TowerType.QUICK, TowerType.MORTAR]
+    for tower in state.towers:
+        if tower.player != player:
+            continue
+        for ttype in list(TowerType):
+            if can_tower_upgrade_to(tower.type, ttype) and (tower.type != TowerType.BASIC or ttype in targets):
+                op = Operation(OperationType.UPGRADE_TOWER, tower.id, ttype.value)
+                if state.is_operation_valid(player, op):
+                    return [op]
+                break
+    return []
+
+
+def empty_state() -> GameState:
+    """空局面"""
+    state = GameState()
+    state.init_with_seed(SEED)
+    return state
+
+
+def mid_state(rounds: int = 120) -> GameState:
+    """中盘局面"""
+    state = empty_state()
+    for _ in range(rounds):
+        for player in range(2):
+            for op in scripted_ops(player, state):
+                state.apply_operation(player, op)
+        state.simulate_next_round()
+    return state
+
+
+def late_state() -> GameState:
+    """饱和的残局局面"""
+    state = mid_state(60)
+    state.gen_speed_lv = [2, 2]
+    state.ant_maxhp_lv = [2, 2]
+    state.coin = [5000, 5000]
+
+    all_types = list(TowerType)
+    for player in range(2):
+        for i, coord in enumerate(player_highlands(player)):
+            tower = state.tower_at(coord) or state.build_tower(player, coord)
+            target = all_types[(i + player) % len(all_types)]
+            for ttype in upgrade_path(target):
+                state.upgrade_tower(tower.id, ttype)
+
+    occupied = {(a.coord.x, a.coord.y) for a in state.ants}
+    for cell in range(CELL_COUNT):
+        x, y = cell_xy(cell)
+        if not ant_can_go_mask[cell] or (x, y) in occupied or cell % 2:
+            continue
+        player = 0 if y < 9 else 1
+        coord = Coord(x, y)
+        ant = Ant(state.next_ant_id, player, Ant.maxhp_of_level(2), Ant.maxhp_of_level(2), coord, 2, cell % 20,
+                  0, AntState.ALIVE, [coord])
+        state.next_ant_id += 1
+        state.ants.append(ant)
+
+    centers = [Coord(9, 4), Coord(9, 14)]
+    for player in range(2):
+        for swtype in SuperWeaponType:
+            state.deploy_super_weapon(player, centers[1 - player] if swtype <= 2 else centers[player], swtype)
+    state.invalidate_state_key()
+    return state
+
+
+SCENARIOS = {"empty": empty_state, "mid": mid_state, "late": late_state}
+"""局面名到构造函数的映射"""
+
+
+def sample_operations(player: int, state: GameState) -> list[Operation]:
+    """覆盖所有操作类型的操作列表，用于测量 ``apply_operation`` """
+    ops = [Operation(OperationType.BUILD_TOWER, c.x, c.y) for c in player_highlands(player)]
+    for tower in state.towers:
+        if tower.player == player:
+            ops.append(Operation(OperationType.UPGRADE_TOWER, tower.id, TowerType.HEAVY.value))
+            ops.append(Operation(OperationType.DOWNGRADE_TOWER, tower.id))
+    center = Coord(9, 9)
+    ops += [
+        Operation(op_type, center.x, center.y)
+        for op_type in (
+            OperationType.DEPLOY_LIGHTNING_STORM,
+            OperationType.DEPLOY_EMP_BLASTER,
+            OperationType.DEPLOY_DEFLECTORS,
+            OperationType.DEPLOY_EMERGENCY_EVASION,
+        )
+    ]
+    # 满级之后 Ant.upgrade_cost 没有定义，只加入还能升级的主基地操作
+    if state.gen_speed_lv[player] < 2:
+        ops.append(Operation(OperationType.UPGRADE_GENERATE_SPEED))
+    if state.ant_maxhp_lv[player] < 2:
+        ops.append(Operation(OperationType.UPGRADE_ANT_MAXHP))
+    return ops
@@ -0,0 +1,72 @@
+"""测试用的辅助函数：随机对局与局面快照。"""
+import dataclasses
+import importlib.util
+import random
+
+from antwar.coord import Coord, distance
+from antwar.gamestate import GameState
+from antwar.pheromone import Pheromone
+from antwar.protocol import OperationType
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None  # NumpyPheromone 等需要NumPy
+
+# 随机操作时各类操作被选中的权重，偏向建造和升级防御塔，使对局中有足够多的防御塔
+_CENTER = Coord(9, 9)
+_WEIGHTS = {OperationType.BUILD_TOWER: 8, OperationType.UPGRADE_TOWER: 6, OperationType.DOWNGRADE_TOWER: 0.2}
+
+
+def new_state(seed: int = 0, pheromone_type: type[Pheromone] = Pheromone) -> GameState:
+    state = GameState()
+    state.init_with_seed(seed, pheromone_type)
+    return state
+
+
+def random_ops(state: GameState, player: int, rng: random.Random, n: int = 3) -> list:
+    """从当前有效操作中随机挑选至多 ``n`` 个，并在 ``state`` 上执行。"""
+    applied = []
+    for _ in range(n):
+        by_type = {}
+        for op in state.legal_operations(player):
+            by_type.setdefault(op.type, []).append(op)
+        types = sorted(by_type) + [None]  # None表示不再操作
+        ttype = rng.choices(types, [_WEIGHTS.get(t, 1) for t in types[:-1]] + [3])[0]
+        if ttype is None:
+            break
+        candidates = by_type[ttype]
+        if ttype == OperationType.BUILD_TOWER:
+            # 靠近地图中线的位置才能攻击到蚂蚁
+            candidates.sort(key=lambda op: distance(Coord(op.arg0, op.arg1), _CENTER))
+            candidates = candidates[:12]
+        op = rng.choice(candidates)
+        assert state.apply_operation(player, op)
+        applied.append(op)
+    return applied
+
+
+def play(state: GameState, rounds: int, seed: int = 0) -> GameState:
+    """双方随机操作并模拟 ``rounds`` 个回合。"""
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        for player in range(2):
+            random_ops(state, player, rng)
+        state.simulate_next_round()
+    return state
+
+
+def snapshot(state: GameState) -> tuple:
+    """局面的深拷贝快照（包含蚂蚁路径和信息素），用于比较。"""
+    return (
+        state.round,
+        [dataclasses.asdict(ant) for ant in state.ants],
+        [dataclasses.asdict(tower) for tower in state.towers],
+        state.coin[:],
+        state.hp[:],
+        [dataclasses.asdict(sw) for sw in state.active_super_weapon],
+        [cd[:] for cd in state.super_weapon_cd],
+        [[list(map(float, row)) for row in p.value_view()] for p in state.phero],
+        state.gen_speed_lv[:],
+        state.ant_maxhp_lv[:],
+        state.operated_tower_id[:],
+        state.next_ant_id,
+        state.next_tower_id,
+    )
@@ -0,0 +1,36 @@
+from antwar.analytics import CoinCurve, TowerUsage, analyze
+
+from .test_replay import write_game
+
+
+class Exploding(CoinCurve):
+    name = "exploding"
+
+    def add_round(self, frame):
+        if frame.round == 5:
+            raise RuntimeError("boom")
+        super().add_round(frame)
+
+
+def test_bad_files_are_reported(tmp_path):
+    good = str(tmp_path / "good.awr")
+    write_game(good, rounds=20)
+    bad = []
+    for name, data in [("short.awr", b"AWRP" + bytes(6)), ("header.awr", b"AWRP\x01\x00"), ("text.txt", b"1\n2\n")]:
+        path = tmp_path / name
+        path.write_bytes(data)
+        bad.append(str(path))
+    result = analyze([good] + bad, [TowerUsage(), CoinCurve()], max_workers=0)
+    assert result.rounds == 21
+    assert sorted(path for path, _ in result.errors) == sorted(bad)
+
+
+def test_worker_failure_is_recorded(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"{i}.awr"))
+        write_game(paths[-1], rounds=10, seed=i)
+    result = analyze(paths, [Exploding()], max_workers=2, chunk_size=1)
+    assert [path for path, _ in result.errors] == paths
+    assert all("boom" in error for _, error in result.errors)
+    assert result.rounds == 0
@@ -0,0 +1,92 @@
+import random
+
+from antwar.protocol import Operation, OperationType
+
+from ._util import new_state, play, snapshot
+
+
+def some_operations(state, player, rng, n=6):
+    # 有效操作与各种无效操作（包括未知的防御塔类型和满级后的主基地升级）混合
+    legal = state.legal_operations(player)
+    ops = rng.sample(legal, min(n, len(legal)))
+    ops.append(rng.choice([
+        Operation(OperationType.UPGRADE_TOWER, 0, 99),
+        Operation(OperationType.BUILD_TOWER, 9, 9),
+        Operation(OperationType.DOWNGRADE_TOWER, 12345),
+        Operation(OperationType.UPGRADE_GENERATE_SPEED),
+    ]))
+    rng.shuffle(ops)
+    return ops
+
+
+def test_atomic_batch_is_all_or_nothing():
+    rng = random.Random(24)
+    state = play(new_state(16), 30, seed=25)
+    for _ in range(40):
+        player = rng.randrange(2)
+        ops = some_operations(state, player, rng)
+        before = snapshot(state)
+        key = state.state_key()
+        result = state.apply_operations(player, ops)
+        if result:
+            assert result.applied == len(ops) and result.failed_index == -1
+        else:
+            assert result.applied == 0 and result.reason
+            assert snapshot(state) == before and state.state_key() == key
+        assert state._journal is None
+        state.simulate_next_round()
+
+
+def test_non_atomic_batch_matches_sequential_application():
+    rng = random.Random(26)
+    state = play(new_state(17), 30, seed=27)
+    for _ in range(40):
+        player = rng.randrange(2)
+        ops = some_operations(state, player, rng)
+        reference = state.fork()
+        expected = 0
+        for op in ops:
+            try:
+                if not reference.apply_operation(player, op):
+                    break
+            except (ValueError, IndexError):
+                break
+            expected += 1
+        probe = state.fork()
+        for op in ops[:expected]:
+            probe.apply_operation(player, op)
+
+        result = state.apply_operations(player, ops, atomic=False)
+        assert result.applied == expected
+        assert snapshot(state) == snapshot(reference)
+        if expected < len(ops):
+            assert result.failed_index == expected
+            assert result.reason == (probe.operation_error(player, ops[expected]) or "invalid operation")
+        state.simulate_next_round()
+
+
+def test_operation_error_agrees_with_is_operation_valid():
+    rng = random.Random(28)
+    state = play(new_state(18), 40, seed=29)
+    for player in range(2):
+        for op in some_operations(state, player, rng, n=50):
+            try:
+                valid = state.is_operation_valid(player, op)
+            except (ValueError, IndexError):
+                valid = False
+            assert (state.operation_error(player, op) is None) == valid
+
+
+def test_atomic_batch_inside_outer_checkpoint():
+    state = play(new_state(19), 30, seed=30)
+    before = snapshot(state)
+    outer = state.checkpoint()
+    ops = state.legal_operations(0)[:2]
+    assert state.apply_operations(0, ops)
+    failed = state.apply_operations(1, [Operation(OperationType.UPGRADE_TOWER, 0, 99)])
+    assert not failed
+    # 失败的批量操作只回滚自己的改动，外部的检查点仍然有效
+    assert state._journal is not None
+    state.simulate_next_round()
+    state.rollback(outer)
+    assert snapshot(state) == before
@@ -0,0 +1,81 @@
+from antwar.arena import play_match
+from antwar.protocol import Operation, OperationType
+
+from ._util import new_state
+
+
+def idle(my_seat, state):
+    return []
+
+
+def bad_operations(my_seat, state):
+    # 未知的防御塔类型，以及满级之后继续升级主基地
+    return [
+        Operation(OperationType.UPGRADE_TOWER, 0, 99),
+        Operation(OperationType.UPGRADE_GENERATE_SPEED),
+    ]
+
+
+def hq_spammer(my_seat, state):
+    return [Operation(OperationType.UPGRADE_ANT_MAXHP)] * 4
+
+
+def generator_bot(my_seat, state):
+    yield Operation(OperationType.UPGRADE_GENERATE_SPEED)
+    yield Operation(OperationType.UPGRADE_TOWER, 0, 99)
+
+
+def crashing_generator(my_seat, state):
+    yield Operation(OperationType.UPGRADE_ANT_MAXHP)
+    if state.round == 5:
+        raise RuntimeError("boom")
+
+
+def cheater(my_seat, state):
+    state.coin[my_seat] = 10 ** 6
+    state.hp[1 - my_seat] = 1
+    for ant in state.ants:
+        ant.coord.x = 0
+        ant.path.append(ant.coord)
+        ant.path[0].y = 0
+    for tower in state.towers:
+        tower.coord.x = 0
+    for p in state.phero:
+        p.value_view()[9][9] = 1e9
+    return []
+
+
+def test_invalid_operations_do_not_end_the_match():
+    result = play_match(bad_operations, hq_spammer, seed=1, max_round=60)
+    assert result.errors == [None, None]
+    assert result.reason == "max_round" and result.rounds == 60
+    assert result.rejected[0] == 2 * 60
+    assert result.rejected[1] > 0
+
+
+def test_modifying_the_given_state_has_no_effect():
+    reference = play_match(idle, idle, seed=2, max_round=40, record_replay=True)
+    result = play_match(cheater, cheater, seed=2, max_round=40, record_replay=True)
+    assert result.replays == reference.replays
+    assert result.hp == reference.hp
+
+
+def test_isolated_fork_matches_fork():
+    state = new_state(3)
+    for _ in range(20):
+        state.simulate_next_round()
+    assert state.fork(isolated=True).dump_mini_replay() == state.fork().dump_mini_replay()
+
+
+def test_generator_ai():
+    result = play_match(generator_bot, idle, seed=4, max_round=200)
+    assert result.errors == [None, None]
+    assert result.reason != "error" and len(result.operations) == result.rounds
+    # 每回合第二个操作无效；金币不足时第一个操作也无效
+    assert [Operation(OperationType.UPGRADE_GENERATE_SPEED)] in [ops[0] for ops in result.operations]
+    assert result.rejected[0] == 2 * result.rounds - sum(len(ops[0]) for ops in result.operations)
+
+    result = play_match(idle, crashing_generator, seed=4, max_round=30)
+    assert result.reason == "error" and result.winner == 0
+    assert "boom" in result.errors[1]
+    assert result.rounds == 5
@@ -0,0 +1,99 @@
+import random
+
+from antwar.coord import Coord, distance, is_ant_can_go
+from antwar.gamedata import Ant, AntState
+from antwar.gamestate import GameState
+
+from ._util import new_state, play
+
+CELLS = [Coord(x, y) for x in range(19) for y in range(19) if is_ant_can_go(Coord(x, y))]
+
+
+def brute_force_target(state, player, coord, trange, skip=-1):
+    # 原始实现：遍历全部蚂蚁
+    target, min_dist = None, 0
+    for ant in state.ants:
+        dist = distance(coord, ant.coord)
+        if ant.player != player and dist <= trange and ant.id != skip and ant.hp > 0:
+            if target is None or dist < min_dist or (dist == min_dist and ant.id < target.id):
+                target, min_dist = ant, dist
+    return target
+
+
+def build_index(state):
+    # 与 simulate_next_round 攻击阶段相同的格点索引
+    index = {}
+    for ant in state.ants:
+        index.setdefault(ant.coord.x * 19 + ant.coord.y, []).append(ant)
+    state._ant_index = index
+
+
+def random_state(rng):
+    state = GameState()
+    ids = sorted(rng.sample(range(500), rng.randrange(0, 60)))
+    hot = rng.sample(CELLS, 4)  # 让大量蚂蚁挤在少数格点上，制造距离相同的情况
+    for ant_id in ids:
+        coord = rng.choice(hot) if rng.random() < 0.5 else rng.choice(CELLS)
+        hp = rng.choice([-3, 0, 1, 10, 25])
+        state.ants.append(Ant(ant_id, rng.randrange(2), hp, 25, coord, 0, 0, 0, AntState.ALIVE, [coord]))
+    return state, hot
+
+
+def check(state, rng, centers):
+    for _ in range(40):
+        player = rng.randrange(2)
+        coord = rng.choice(centers)
+        trange = rng.randrange(0, 6)
+        state._ant_index = None
+        expected = brute_force_target(state, player, coord, trange)
+        assert state.search_attack_target(player, coord, trange) is expected
+        in_range = [ant for ant in state.ants if distance(ant.coord, coord) <= trange]
+        assert state._ants_in_range(coord, trange) == in_range
+        build_index(state)
+        assert state.search_attack_target(player, coord, trange) is expected
+        assert state._ants_in_range(coord, trange) == sorted(in_range, key=lambda ant: ant.id)
+        if expected is not None:
+            # DOUBLE防御塔的第二个目标跳过第一个目标
+            second = brute_force_target(state, player, coord, trange, expected.id)
+            assert state.search_attack_target(player, coord, trange, expected.id) is second
+            state._ant_index = None
+            assert state.search_attack_target(player, coord, trange, expected.id) is second
+    state._ant_index = None
+
+
+def test_search_matches_brute_force_on_random_ants():
+    rng = random.Random(41)
+    for _ in range(60):
+        state, hot = random_state(rng)
+        check(state, rng, hot + CELLS)
+
+
+def test_search_matches_brute_force_in_played_games():
+    rng = random.Random(42)
+    for seed in range(3):
+        state = new_state(seed)
+        for _ in range(6):
+            play(state, 15, seed=rng.randrange(1000))
+            check(state, rng, [tower.coord for tower in state.towers] + CELLS)
+
+
+def test_tie_break_and_skip():
+    state = GameState()
+    center = Coord(9, 9)
+    near = Coord(9, 10)
+    assert distance(center, near) == 1
+    # 同一格点上ID较大的蚂蚁排在前面，目标仍应为ID最小者
+    for ant_id, hp in [(9, 10), (4, 0), (7, 10), (5, 10)]:
+        state.ants.append(Ant(ant_id, 1, hp, 10, near, 0, 0, 0, AntState.ALIVE, [near]))
+    state.ants.append(Ant(12, 1, 10, 10, center, 0, 0, 0, AntState.ALIVE, [center]))
+    state.ants.append(Ant(2, 0, 10, 10, center, 0, 0, 0, AntState.ALIVE, [center]))
+    for indexed in (False, True):
+        if indexed:
+            build_index(state)
+        assert state.search_attack_target(0, center, 2).id == 12
+        assert state.search_attack_target(0, center, 2, skip=12).id == 5
+        assert state.search_attack_target(0, near, 0).id == 5
+        assert state.search_attack_target(0, near, 0, skip=5).id == 7
+        assert state.search_attack_target(1, near, 0) is None
+        assert state.search_attack_target(1, near, 1).id == 2
+        state._ant_index = None
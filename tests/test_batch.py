@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from antwar.batch import BatchGameState, batch_from_seeds  # noqa: E402
+from antwar.protocol import Operation, OperationType  # noqa: E402
+
+from ._util import new_state, play, random_ops, snapshot  # noqa: E402
+
+
+def test_batch_matches_game_states_every_round():
+    seeds = [3, 4, 5, 6]
+    states = [new_state(seed) for seed in seeds]
+    batch = batch_from_seeds(seeds)
+    rng = random.Random(61)
+    for i, state in enumerate(states):
+        assert snapshot(batch.to_state(i)) == snapshot(state)
+    for _ in range(200):
+        for player in range(2):
+            batch_ops = [random_ops(state, player, rng) for state in states]
+            if rng.random() < 0.5:
+                assert batch.apply_operations(player, batch_ops) == [True] * len(states)
+            else:
+                for i, ops in enumerate(batch_ops):
+                    for op in ops:
+                        assert batch.apply_operation(i, player, op)
+            # 无效操作在两边都被拒绝，且不改变局面
+            bogus = Operation(OperationType.UPGRADE_TOWER, 10 ** 6, 1)
+            for i, state in enumerate(states):
+                assert not state.apply_operation(player, bogus)
+                assert not batch.apply_operation(i, player, bogus)
+        for state in states:
+            state.simulate_next_round()
+        batch.simulate_next_round()
+        for i, state in enumerate(states):
+            assert snapshot(batch.to_state(i)) == snapshot(state)
+    assert any(state.towers for state in states)
+
+
+def test_from_states_round_trip():
+    states = [play(new_state(seed), rounds, seed=seed) for seed, rounds in [(1, 0), (2, 40), (3, 120)]]
+    # 部署一个生效中的超级武器，覆盖超级武器数组
+    states[2].coin[0] = 1000
+    assert states[2].apply_operation(0, Operation(OperationType.DEPLOY_EMP_BLASTER, 9, 9))
+    batch = BatchGameState.from_states(states)
+    for i, state in enumerate(states):
+        assert snapshot(batch.to_state(i)) == snapshot(state)
+        assert batch.to_state(i).state_key() == state.state_key()
+    assert snapshot(BatchGameState.from_states([batch.to_state(2)]).to_state(0)) == snapshot(states[2])
+
+
+def test_capacity_overflow():
+    state = new_state(7)
+    state.coin = [1000, 1000]
+    highland = [Operation(OperationType.BUILD_TOWER, x, y) for x, y in [(6, 1), (7, 5)]]
+    assert all(state.fork().apply_operation(0, op) for op in highland)
+
+    batch = BatchGameState(1, tower_capacity=1)
+    batch.coin[0] = [1000, 1000]
+    assert batch.apply_operation(0, 0, highland[0])
+    with pytest.raises(OverflowError, match="tower"):
+        batch.apply_operation(0, 0, highland[1])
+
+    batch = BatchGameState(1, super_weapon_capacity=1)
+    batch.coin[0] = [1000, 1000]
+    assert batch.apply_operation(0, 0, Operation(OperationType.DEPLOY_LIGHTNING_STORM, 9, 9))
+    with pytest.raises(OverflowError, match="super weapon"):
+        batch.apply_operation(0, 1, Operation(OperationType.DEPLOY_DEFLECTORS, 9, 9))
+
+    # 第0回合双方各生成一只蚂蚁
+    batch = BatchGameState(1, ant_capacity=1)
+    with pytest.raises(OverflowError, match="ant"):
+        batch.simulate_next_round()
+
+    batch = BatchGameState(1, path_capacity=3)
+    with pytest.raises(OverflowError, match="path"):
+        for _ in range(5):
+            batch.simulate_next_round()
@@ -0,0 +1,156 @@
+import io
+import sys
+import threading
+import time
+
+import pytest
+
+from antwar import controller
+from antwar.controller import GameController, PipelinedController
+from antwar.protocol import Operation, OperationType
+
+from ._util import new_state, play, snapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def op(n):
+    return Operation(OperationType.UPGRADE_GENERATE_SPEED, n)
+
+
+def test_search_until_deadline_returns_best_so_far(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(controller.time, "perf_counter", clock)
+    game = GameController()
+    game.turn_start = 10.0
+    produced, closed = [], []
+
+    def search(my_seat, state):
+        try:
+            # 截止时刻为 10 + 1 - 0.2 = 10.8
+            for n, now in enumerate([10.1, 10.5, 10.7, 10.9, 11.5]):
+                clock.now = now
+                produced.append(n)
+                yield [op(n)]
+        finally:
+            closed.append(True)
+
+    # 跨过截止时刻的那次结果仍被采用，之后搜索被关闭
+    assert game.search_until_deadline(search, 1.0, 0.2) == [op(3)]
+    assert produced == [0, 1, 2, 3]
+    assert closed == [True]
+
+
+def test_search_until_deadline_keeps_last_result_when_search_ends_early(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(controller.time, "perf_counter", clock)
+    game = GameController()
+    game.turn_start = 0.0
+
+    def search(my_seat, state):
+        yield [op(0)]
+        yield [op(1)]
+
+    assert game.search_until_deadline(search, 1.0, 0.2) == [op(1)]
+    assert game.search_until_deadline(lambda seat, state: iter(()), 1.0, 0.2) == []
+
+
+class GatedInput(io.StringIO):
+    """在 ``gate`` 被设置之前阻塞读取的标准输入，用于控制主线程读到输入的时机"""
+
+    def __init__(self, text, gate):
+        super().__init__(text)
+        self.gate = gate
+
+    def readline(self, *args):
+        assert self.gate.wait(5)
+        return super().readline(*args)
+
+
+def first_legal(my_seat, state):
+    return state.legal_operations(my_seat)[:1]
+
+
+def round_input(state, enemy_ops, enemy_first):
+    # 结算之后的回合信息只需要回合数、金币与血量，防御塔和蚂蚁部分会被跳过
+    ops = f"{len(enemy_ops)}\n" + "".join(op.dump() + "\n" for op in enemy_ops)
+    info = f"{state.round}\n0\n0\n{state.coin[0]} {state.coin[1]}\n{state.hp[0]} {state.hp[1]}\n"
+    return ops + info if enemy_first else info + ops
+
+
+def expected_after(state, seat, enemy_ops):
+    # 与 run_antwar_ai 相同的行动顺序
+    state = state.fork()
+    if seat == 1:
+        state.simulate_next_round()
+    for enemy_op in enemy_ops:
+        assert state.apply_operation(1 - seat, enemy_op)
+    if seat == 0:
+        state.simulate_next_round()
+    return state
+
+
+@pytest.mark.parametrize("seat", [0, 1])
+def test_pipelined_hit(monkeypatch, seat):
+    state = play(new_state(21), 20, seed=22)
+    speculated = threading.Event()
+
+    def ai(my_seat, s):
+        if threading.current_thread() is not threading.main_thread():
+            speculated.set()
+        return first_legal(my_seat, s)
+
+    game = PipelinedController(ai)
+    game.my_seat = seat
+    game.game_state = state.fork()
+    expected = expected_after(state, seat, [])
+    monkeypatch.setattr(sys, "stdin", GatedInput(round_input(expected, [], seat == 0), speculated))
+    ops = game.advance()
+    assert (game.hits, game.misses) == (1, 0)
+    assert ops == first_legal(seat, expected)
+    assert snapshot(game.game_state) == snapshot(expected)
+
+
+@pytest.mark.parametrize("seat", [0, 1])
+def test_pipelined_miss_does_not_wait_for_speculation(monkeypatch, seat):
+    state = play(new_state(23), 20, seed=24)
+    state.coin[1 - seat] = 500
+    enemy_ops = [Operation(OperationType.UPGRADE_GENERATE_SPEED)]
+    started, release = threading.Event(), threading.Event()
+    stale = []
+
+    def ai(my_seat, s):
+        if threading.current_thread() is not threading.main_thread():
+            # 推测中的决策一直阻塞，直到主线程已经给出结果
+            started.set()
+            release.wait(5)
+            stale.append(game.speculation_stopped())
+        return first_legal(my_seat, s)
+
+    game = PipelinedController(ai)
+    game.my_seat = seat
+    game.game_state = state.fork()
+    expected = expected_after(state, seat, enemy_ops)
+    monkeypatch.setattr(sys, "stdin", GatedInput(round_input(expected, enemy_ops, seat == 0), started))
+    begin = time.perf_counter()
+    ops = game.advance()
+    assert time.perf_counter() - begin < 2
+    assert (game.hits, game.misses) == (0, 1)
+    assert ops == first_legal(seat, expected)
+    assert snapshot(game.game_state) == snapshot(expected)
+    assert not game.speculation_stopped()
+
+    release.set()
+    for _ in range(100):
+        if stale:
+            break
+        time.sleep(0.05)
+    assert stale == [True]
+    # 过期的推测不影响主线程的局面
+    assert snapshot(game.game_state) == snapshot(expected)
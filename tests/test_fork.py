@@ -0,0 +1,74 @@
+import pytest
+
+from antwar.pheromone import LazyPheromone, NumpyPheromone, Pheromone
+
+from ._util import HAS_NUMPY, new_state, play, snapshot
+
+PHEROMONE_TYPES = [Pheromone, LazyPheromone] + ([NumpyPheromone] if HAS_NUMPY else [])
+
+
+@pytest.mark.parametrize("pheromone_type", [t for t in PHEROMONE_TYPES if t is not LazyPheromone])
+def test_pheromone_value_write_does_not_leak(pheromone_type):
+    state = play(new_state(1, pheromone_type), 10, seed=1)
+    before = snapshot(state)
+    fork = state.fork()
+    fork.phero[0].value[5][5] = 123.0
+    assert snapshot(state) == before
+    assert fork.phero[0].value[5][5] == 123.0
+
+    # 反过来，原局面的修改也不影响副本
+    state.phero[1].value[3][3] = -1.0
+    assert fork.phero[1].value[3][3] != -1.0
+
+
+def test_lazy_pheromone_value_is_read_only():
+    state = play(new_state(1, LazyPheromone), 10, seed=1)
+    fork = state.fork()
+    with pytest.raises(TypeError):
+        fork.phero[0].value[5][5] = 123.0
+    fork.phero[0].value = [[123.0] * 19 for _ in range(19)]
+    assert fork.phero[0].value[5][5] == 123.0
+    assert state.phero[0].value[5][5] != 123.0
+
+
+@pytest.mark.parametrize("pheromone_type", PHEROMONE_TYPES)
+def test_simulate_fork_leaves_parent_untouched(pheromone_type):
+    state = play(new_state(2, pheromone_type), 30, seed=2)
+    assert state.ants
+    before = snapshot(state)
+    fork = play(state.fork(), 20, seed=3)
+    assert snapshot(state) == before
+
+    # 原局面随后继续模拟，结果与从未复制时相同
+    reference = play(new_state(2, pheromone_type), 30, seed=2)
+    play(state, 5, seed=4)
+    play(reference, 5, seed=4)
+    assert snapshot(state) == snapshot(reference)
+    assert fork.round == 50
+
+
+def test_sibling_forks_have_independent_paths():
+    state = play(new_state(3), 25, seed=5)
+    a, b = state.fork(), state.fork()
+    a.simulate_next_round()
+    b.simulate_next_round()
+    b.simulate_next_round()
+    for ant in state.ants:
+        fa, fb = a.ant_of_id(ant.id), b.ant_of_id(ant.id)
+        assert ant.path is not None
+        if fa is not None:
+            assert fa.path[:len(ant.path)] == ant.path
+        if fb is not None and fa is not None and fa.path is fb.path:
+            pytest.fail("forked ants share a path list after moving")
+
+
+def test_fork_api_mutations_are_independent():
+    state = play(new_state(4), 15, seed=6)
+    before = snapshot(state)
+    fork = state.fork()
+    fork.update_coin(0, 50)
+    fork.set_hp(1, 1)
+    for ant in fork.ants:
+        ant.hp = 0
+    fork.pheromone_decay()
+    assert snapshot(state) == before
@@ -0,0 +1,81 @@
+from antwar import geometry
+from antwar.coord import (
+    Coord,
+    distance,
+    is_ant_can_go,
+    is_highland,
+    is_in_map,
+    is_player_highland,
+    neighbor,
+)
+
+# 与查表实现对照的原始实现：逐点换算为轴向坐标计算距离，并由距离判断是否在地图之内
+_CENTER = Coord(9, 9)
+
+
+def reference_distance(c0: Coord, c1: Coord) -> int:
+    def to_axial(c: Coord) -> Coord:
+        return Coord(c.y, c.x - (c.y + (c.y & 1)) // 2)
+
+    a, b = to_axial(c0), to_axial(c1)
+    return (abs(a.x - b.x) + abs(a.x + a.y - b.x - b.y) + abs(a.y - b.y)) // 2
+
+
+def reference_terrain(coord: Coord) -> int:
+    return geometry._highland_map[coord.x][coord.y]
+
+
+COORDS = [Coord(x, y) for x in range(19) for y in range(19)]
+
+
+def test_distance_table_matches_coord_distance():
+    for a in COORDS:
+        for b in COORDS:
+            expected = reference_distance(a, b)
+            assert geometry.distance_of(geometry.cell_index(a.x, a.y), geometry.cell_index(b.x, b.y)) == expected
+            assert distance(a, b) == expected
+    # 超出数组范围时不查表
+    assert distance(Coord(-3, 20), Coord(25, -1)) == reference_distance(Coord(-3, 20), Coord(25, -1))
+
+
+def test_distance_many_matches_distance_of():
+    cells = list(range(geometry.CELL_COUNT))
+    for cell in (0, geometry.MAP_CENTER, 42, 360):
+        assert geometry.distance_many(cell, cells) == [geometry.distance_of(cell, c) for c in cells]
+    assert geometry.distance_many(7, []) == []
+
+
+def test_neighbor_table_matches_coord_neighbor():
+    for coord in COORDS:
+        cell = geometry.cell_index(coord.x, coord.y)
+        expected = []
+        for direction in range(6):
+            n = neighbor(coord, direction)
+            expected.append(n.x * 19 + n.y if 0 <= n.x < 19 and 0 <= n.y < 19 else geometry.NO_CELL)
+        assert geometry.neighbors_of(cell) == expected
+        assert geometry.neighbor_table[cell * 6:cell * 6 + 6] == expected
+    cells = [0, 18, geometry.MAP_CENTER, 200, 360]
+    assert geometry.neighbors_of_many(cells) == [geometry.neighbors_of(c) for c in cells]
+    for direction in range(6):
+        assert geometry.neighbors_of_many(cells, direction) == [geometry.neighbors_of(c)[direction] for c in cells]
+
+
+def test_masks_match_coord_predicates():
+    for coord in COORDS:
+        cell = geometry.cell_index(coord.x, coord.y)
+        in_map = reference_distance(coord, _CENTER) <= 9
+        t = reference_terrain(coord)
+        assert geometry.terrain[cell] == t
+        assert geometry.in_map_mask[cell] == in_map == is_in_map(coord)
+        assert geometry.ant_can_go_mask[cell] == (in_map and t == 0) == is_ant_can_go(coord)
+        assert geometry.highland_mask[cell] == (in_map and t != 0) == is_highland(coord)
+        for player in range(2):
+            expected = in_map and t == player + 2
+            assert is_player_highland(coord, player) == expected
+            assert (cell in geometry.player_highland_cells[player]) == expected
+        assert (cell in geometry.in_map_cells) == in_map
+    for coord in (Coord(-1, 9), Coord(9, 19), Coord(19, 0)):
+        assert not is_in_map(coord)
+        assert not is_ant_can_go(coord)
+        assert not is_highland(coord)
+        assert not is_player_highland(coord, 0)
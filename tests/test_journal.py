@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from antwar.pheromone import LazyPheromone, Pheromone
+
+from ._util import new_state, play, random_ops, snapshot
+
+
+@pytest.mark.parametrize("pheromone_type", [Pheromone, LazyPheromone])
+def test_rollback_restores_exact_state(pheromone_type):
+    state = play(new_state(5, pheromone_type), 40, seed=7)
+    before = snapshot(state)
+    key = state.state_key()
+
+    cp = state.checkpoint()
+    play(state, 15, seed=8)
+    assert state.round == 55
+    state.rollback(cp)
+    assert snapshot(state) == before
+    assert state.state_key() == key
+
+    # 回滚之后继续模拟，与从未模拟过的局面结果相同
+    reference = play(new_state(5, pheromone_type), 40, seed=7)
+    play(state, 10, seed=9)
+    play(reference, 10, seed=9)
+    assert snapshot(state) == snapshot(reference)
+
+
+def test_nested_checkpoints():
+    state = play(new_state(6), 30, seed=10)
+    rng = random.Random(11)
+    snapshots = []
+    checkpoints = []
+    for _ in range(6):
+        snapshots.append(snapshot(state))
+        checkpoints.append(state.checkpoint())
+        random_ops(state, 0, rng)
+        random_ops(state, 1, rng)
+        state.simulate_next_round()
+    for cp, snap in zip(reversed(checkpoints), reversed(snapshots)):
+        state.rollback(cp)
+        assert snapshot(state) == snap
+
+
+def test_rollback_on_fork_keeps_parent_intact():
+    parent = play(new_state(7), 35, seed=12)
+    before = snapshot(parent)
+    fork = parent.fork()
+    cp = fork.checkpoint()
+    play(fork, 8, seed=13)
+    fork.rollback(cp)
+    assert snapshot(fork) == before
+    play(fork, 8, seed=13)
+    assert snapshot(parent) == before
+
+
+def test_fork_after_checkpoint_survives_rollback():
+    state = play(new_state(8), 30, seed=14)
+    cp = state.checkpoint()
+    play(state, 5, seed=15)
+    fork = state.fork()
+    before = snapshot(fork)
+    play(state, 5, seed=16)
+    state.rollback(cp)
+    assert snapshot(fork) == before
+    # 副本继续模拟的结果与从未回滚过的同一局面一致
+    reference = play(play(new_state(8), 30, seed=14), 5, seed=15)
+    play(fork, 10, seed=17)
+    play(reference, 10, seed=17)
+    assert snapshot(fork) == snapshot(reference)
@@ -0,0 +1,68 @@
+import random
+
+from antwar.coord import Coord, is_in_map
+from antwar.gamedata import SuperWeaponType, TowerType
+from antwar.protocol import Operation, OperationType
+
+from ._util import new_state, random_ops
+
+_DEPLOY = [
+    OperationType.DEPLOY_LIGHTNING_STORM,
+    OperationType.DEPLOY_EMP_BLASTER,
+    OperationType.DEPLOY_DEFLECTORS,
+    OperationType.DEPLOY_EMERGENCY_EVASION,
+]
+
+
+def brute_force(state, player):
+    # 逐个检查全部候选操作；超级武器只在地图范围内部署，满级后的主基地升级会抛出异常，因此跳过
+    candidates = [Operation(OperationType.BUILD_TOWER, x, y) for x in range(19) for y in range(19)]
+    for t in state.towers:
+        candidates += [Operation(OperationType.UPGRADE_TOWER, t.id, ttype.value) for ttype in TowerType]
+        candidates.append(Operation(OperationType.DOWNGRADE_TOWER, t.id))
+    for op_type in _DEPLOY:
+        candidates += [
+            Operation(op_type, x, y) for x in range(19) for y in range(19) if is_in_map(Coord(x, y))
+        ]
+    if state.gen_speed_lv[player] < 2:
+        candidates.append(Operation(OperationType.UPGRADE_GENERATE_SPEED))
+    if state.ant_maxhp_lv[player] < 2:
+        candidates.append(Operation(OperationType.UPGRADE_ANT_MAXHP))
+    return [op for op in candidates if state.is_operation_valid(player, op)]
+
+
+def keys(ops):
+    return sorted((int(op.type), op.arg0, op.arg1) for op in ops)
+
+
+def check(state):
+    for player in range(2):
+        assert keys(state.legal_operations(player)) == keys(brute_force(state, player))
+        for op_type in (OperationType.BUILD_TOWER, OperationType.UPGRADE_TOWER):
+            only = state.legal_operations(player, [op_type])
+            assert keys(only) == [k for k in keys(brute_force(state, player)) if k[0] == op_type]
+
+
+def test_matches_brute_force_over_a_game():
+    state = new_state(14)
+    rng = random.Random(22)
+    for r in range(120):
+        random_ops(state, 0, rng)
+        if r % 8 == 0:
+            check(state)
+        random_ops(state, 1, rng)
+        state.simulate_next_round()
+
+
+def test_matches_brute_force_under_emp():
+    state = new_state(15)
+    rng = random.Random(23)
+    for _ in range(40):
+        random_ops(state, 0, rng)
+        random_ops(state, 1, rng)
+        state.simulate_next_round()
+    state.coin = [1000, 1000]
+    assert state.towers
+    tower = state.towers[0]
+    state.deploy_super_weapon(1 - tower.player, tower.coord, SuperWeaponType.EMP_BLASTER)
+    check(state)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from antwar.coord import Coord, headquarter_coord, is_in_map, neighbor
+from antwar.gamedata import Ant, AntState
+from antwar.pheromone import LazyPheromone, NumpyPheromone, Pheromone, generate_init_pheromone
+
+from ._util import HAS_NUMPY, new_state, random_ops
+
+PHEROMONE_TYPES = [Pheromone] + ([NumpyPheromone] if HAS_NUMPY else [])
+
+
+def new_ant() -> Ant:
+    coord = headquarter_coord(0)
+    return Ant(0, 0, 10, 10, coord, 0, 0, 0, AntState.ALIVE, [coord])
+
+
+@pytest.mark.parametrize("pheromone_type", PHEROMONE_TYPES)
+def test_in_place_write_invalidates_caches(pheromone_type):
+    p, _ = generate_init_pheromone(0, pheromone_type)
+    ant = new_ant()
+    before = p.next_move_direction(ant)
+    key = p.quantized_hash()
+
+    # 把另一个可行方向的信息素调得很高，缓存的流场必须失效
+    for direction in range(6):
+        c = neighbor(ant.coord, direction)
+        if direction != before and 0 <= c.x < 19 and 0 <= c.y < 19:
+            p.value[c.x][c.y] = 1e6
+            if p.next_move_direction(ant) == direction:
+                break
+            p.value[c.x][c.y] = 0.0
+    else:
+        pytest.fail("no alternative direction found")
+    assert p.quantized_hash() != key
+
+
+def rows(p):
+    return [[float(v) for v in row] for row in p.value_view()]
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="requires numpy")
+def test_numpy_pheromone_matches_list_bit_for_bit():
+    for seed in range(3):
+        a, b = generate_init_pheromone(seed), generate_init_pheromone(seed, NumpyPheromone)
+        assert [rows(p) for p in a] == [rows(p) for p in b]
+
+    # 直接调用 decay 与 modify_path，路径中允许出现重复的格点
+    rng = random.Random(31)
+    cells = [Coord(x, y) for x in range(19) for y in range(19) if is_in_map(Coord(x, y))]
+    p, q = generate_init_pheromone(7)[0], generate_init_pheromone(7, NumpyPheromone)[0]
+    for _ in range(200):
+        p.decay()
+        q.decay()
+        path = [rng.choice(cells) for _ in range(rng.randrange(1, 30))]
+        delta = rng.choice([-5.0, -3.0, 10.0, 0.25])
+        p.modify_path(path, delta)
+        q.modify_path(path, delta)
+        assert rows(p) == rows(q)
+        assert p.quantized_hash() == q.quantized_hash()
+
+    # 完整对局：双方执行相同的操作
+    eager, vectorized = new_state(8), new_state(8, NumpyPheromone)
+    rng = random.Random(32)
+    for _ in range(150):
+        for player in range(2):
+            for op in random_ops(eager, player, rng):
+                assert vectorized.apply_operation(player, op)
+        eager.simulate_next_round()
+        vectorized.simulate_next_round()
+        assert [rows(p) for p in eager.phero] == [rows(p) for p in vectorized.phero]
+        assert eager.state_key() == vectorized.state_key()
+
+
+def test_lazy_pheromone_matches_eager_decay():
+    rng = random.Random(51)
+    cells = [Coord(x, y) for x in range(19) for y in range(19) if is_in_map(Coord(x, y))]
+    eager, lazy = generate_init_pheromone(11)[1], generate_init_pheromone(11, LazyPheromone)[1]
+    for step in range(400):
+        eager.decay()
+        lazy.decay()
+        if rng.random() < 0.3:
+            path = [rng.choice(cells) for _ in range(rng.randrange(1, 20))]
+            delta = rng.choice([-5.0, -3.0, 10.0])
+            eager.modify_path(path, delta)
+            lazy.modify_path(path, delta)
+        if rng.random() < 0.2:
+            coord = rng.choice(cells)
+            assert lazy.pheromone_of_neighbors(coord) == eager.pheromone_of_neighbors(coord)
+        # 多数回合不读取完整数组，让各格点积累较多未补算的衰减
+        if step % 37 == 0 or rng.random() < 0.05:
+            assert lazy.materialize() == rows(eager)
+            assert [list(row) for row in lazy.value] == rows(eager)
+            assert lazy.quantized_hash() == eager.quantized_hash()
+    assert lazy.materialize() == rows(eager)
+    # 读取结果之间互不影响：materialize返回新数组，value只读
+    lazy.materialize()[0][0] = 1e9
+    with pytest.raises(TypeError):
+        lazy.value[0][0] = 1e9
+    assert lazy.materialize() == rows(eager)
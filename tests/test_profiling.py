@@ -0,0 +1,70 @@
+import random
+import threading
+import time
+
+from antwar import gamestate, pheromone
+from antwar.coord import distance
+from antwar.profiling import PHASES
+
+from ._util import new_state, play, random_ops, snapshot
+
+
+def test_profiling_does_not_change_simulation():
+    plain, profiled = new_state(31), new_state(31)
+    profile = profiled.enable_profiling()
+    rng = random.Random(32)
+    for _ in range(150):
+        for player in range(2):
+            for op in random_ops(plain, player, rng):
+                assert profiled.apply_operation(player, op)
+        plain.simulate_next_round()
+        profiled.simulate_next_round()
+        assert snapshot(plain) == snapshot(profiled)
+        assert plain.state_key() == profiled.state_key()
+    assert profile.rounds == 150
+    assert profile.counters["distance_calls"] > 0
+    assert profile.counters["ants_moved"] > 0
+    # 剖析结束后恢复原始的distance
+    assert gamestate.distance is distance and pheromone.distance is distance
+
+
+def test_phase_totals_add_up():
+    state = play(new_state(33), 30, seed=34)
+    profile = state.enable_profiling()
+    start = time.perf_counter()
+    for _ in range(50):
+        state.simulate_next_round()
+    wall = time.perf_counter() - start
+    assert profile.rounds == 50
+    assert profile.phase_calls == {phase: 50 for phase in PHASES}
+    assert abs(profile.total_time() - sum(profile.phase_time.values())) < 1e-12
+    assert all(t >= 0 for t in profile.phase_time.values())
+    # 各阶段连续计时，总和只比墙上时间少了阶段之外的少量开销
+    assert 0.5 * wall <= profile.total_time() <= wall
+
+
+def test_distance_calls_are_counted_per_thread():
+    profiled = play(new_state(35), 30, seed=36)
+    profile = profiled.enable_profiling()
+    profiled.simulate_next_round()
+    alone = profile.counters["distance_calls"]
+
+    # 另一个线程同时结算未开启剖析的局面，不影响计数
+    profile.reset()
+    profiled = play(new_state(35), 30, seed=36)
+    profiled.enable_profiling(profile)
+    other = play(new_state(37), 30, seed=38)
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            other.fork().simulate_next_round()
+
+    thread = threading.Thread(target=churn)
+    thread.start()
+    try:
+        profiled.simulate_next_round()
+    finally:
+        stop.set()
+        thread.join()
+    assert profile.counters["distance_calls"] == alone
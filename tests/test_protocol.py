@@ -0,0 +1,11 @@
+from antwar.protocol import RoundInfo
+
+
+def test_skipped_round_info_compares_unequal():
+    full = RoundInfo.from_raw(3, b"", b"", (1, 2), (50, 50))
+    skipped = RoundInfo.from_raw(3, None, None, (1, 2), (50, 50))
+    assert full == RoundInfo(3, [], [], (1, 2), (50, 50))
+    assert full != skipped
+    assert skipped != full
+    assert skipped != RoundInfo.from_raw(3, None, None, (1, 2), (50, 50))
+    assert skipped == skipped
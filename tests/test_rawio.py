@@ -0,0 +1,137 @@
+import io
+import struct
+import sys
+
+import pytest
+
+from antwar.protocol import Operation, OperationType, encode_operations, parse_operation_message, write_our_operation
+from antwar.rawio import FrameWriter, LineReader, iter_frames, read_frame, stdout_writer, write_to_judger
+
+
+class Trickle(io.RawIOBase):
+    """每次最多返回 ``step`` 个字节的二进制流，模拟管道中被拆开的数据"""
+
+    def __init__(self, data: bytes, step: int):
+        self.data = data
+        self.pos = 0
+        self.step = step
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        n = self.step if n < 0 else min(n, self.step)
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+    read1 = read
+
+
+TEXT = "3\n11 4 5\n中文 ünïcode\n\n12 7 13\n-1 2\n".encode()
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, 7, 1000])
+def test_lines_split_across_chunks(step):
+    for reader in (LineReader(Trickle(TEXT, step)), LineReader(io.BytesIO(TEXT), chunk_size=step)):
+        assert reader.read_int() == 3
+        assert reader.read_line() == b"11 4 5\n"
+        assert reader.read_line() == "中文 ünïcode\n".encode()
+        assert reader.read_lines(2) == b"\n12 7 13\n"
+        assert reader.read_ints() == [-1, 2]
+        with pytest.raises(EOFError):
+            reader.read_line()
+
+
+def test_text_stream_with_non_ascii():
+    reader = LineReader(io.StringIO(TEXT.decode()))
+    assert reader.read_int() == 3
+    reader.skip_lines(1)
+    line = reader.read_line()
+    assert line.decode() == "中文 ünïcode\n"
+    assert len(line) > len(line.decode())
+
+
+@pytest.mark.parametrize("step", [1, 4, 1000])
+def test_last_line_without_newline(step):
+    reader = LineReader(Trickle(b"1 2\n3 4", step))
+    assert reader.read_ints(2) == [1, 2, 3, 4]
+    with pytest.raises(EOFError):
+        reader.read_line()
+    # 缺少换行符的只能是最后一行，多行读取在流结束时报错
+    reader = LineReader(Trickle(b"5\n6", step))
+    with pytest.raises(EOFError):
+        reader.read_lines(3)
+
+
+def frame(payload: bytes) -> bytes:
+    return struct.pack(">I", len(payload)) + payload
+
+
+@pytest.mark.parametrize("step", [1, 3, 1000])
+def test_frames_with_non_ascii_payloads(step):
+    payloads = ["1\n31\n".encode(), "调试信息：ü\n".encode(), b""]
+    data = b"".join(frame(p) for p in payloads)
+    assert list(iter_frames(Trickle(data, step))) == payloads
+    # 长度头是字节数而不是字符数
+    assert struct.unpack(">I", frame(payloads[1])[:4])[0] == len(payloads[1]) != len(payloads[1].decode())
+
+
+@pytest.mark.parametrize("cut", [1, 3, 4, 5, 9])
+def test_eof_in_the_middle_of_a_frame(cut):
+    data = frame("操作\n".encode())
+    stream = Trickle(frame(b"ok") + data[:cut], 2)
+    assert read_frame(stream) == b"ok"
+    with pytest.raises(EOFError):
+        read_frame(stream)
+    assert read_frame(io.BytesIO(b"")) is None
+    with pytest.raises(EOFError):
+        list(iter_frames(io.BytesIO(data[:cut])))
+
+
+OPS = [
+    Operation(OperationType.BUILD_TOWER, 4, 3),
+    Operation(OperationType.UPGRADE_TOWER, 12, 2),
+    Operation(OperationType.DOWNGRADE_TOWER, 7),
+    Operation(OperationType.UPGRADE_ANT_MAXHP),
+]
+
+
+def test_frame_writer_round_trip_and_buffer_reuse():
+    out = io.BytesIO()
+    writer = FrameWriter(out, capacity=8)
+    sent = [OPS * 50, OPS[:1], [], OPS]  # 先发送一帧需要扩容的长消息，之后复用缓冲区发送较短的消息
+    for ops in sent:
+        writer.begin()
+        encode_operations(ops, writer)
+        writer.send()
+    writer.begin()
+    writer.append("调试：ü\n".encode())
+    writer.send()
+
+    data = out.getvalue()
+    frames = list(iter_frames(io.BytesIO(data)))
+    assert [parse_operation_message(f) for f in frames[:-1]] == sent
+    assert frames[-1].decode() == "调试：ü\n"
+    # 各帧首尾相接，长度头均为消息体的字节数，没有残留的旧字节
+    pos = 0
+    for payload in frames:
+        assert struct.unpack(">I", data[pos:pos + 4])[0] == len(payload)
+        assert data[pos + 4:pos + 4 + len(payload)] == payload
+        pos += 4 + len(payload)
+    assert pos == len(data)
+    assert frames[1] == b"1\n11 4 3\n"
+
+
+def test_stdout_writer_round_trip(monkeypatch):
+    out = io.BytesIO()
+    monkeypatch.setattr(sys, "stdout", io.TextIOWrapper(out, encoding="utf-8"))
+    write_our_operation(OPS)
+    write_to_judger("消息")
+    write_our_operation([])
+    assert stdout_writer().source is sys.stdout
+    stream = io.BytesIO(out.getvalue())
+    assert parse_operation_message(read_frame(stream)) == OPS
+    assert read_frame(stream) == "消息".encode()
+    assert parse_operation_message(read_frame(stream)) == []
+    assert read_frame(stream) is None
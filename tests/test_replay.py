@@ -0,0 +1,71 @@
+import os
+import random
+
+import pytest
+
+from antwar.replay import ReplayReader, ReplayWriter
+
+from ._util import new_state, random_ops, snapshot
+
+
+def write_game(path, rounds=70, seed=13, keyframe_interval=16, checksums=True):
+    state = new_state(seed)
+    rng = random.Random(seed)
+    snapshots = []
+    with ReplayWriter(path, seed=seed, keyframe_interval=keyframe_interval, checksums=checksums) as writer:
+        for _ in range(rounds):
+            snapshots.append(snapshot(state))
+            writer.begin_round(state)
+            ops0 = random_ops(state, 0, rng)
+            ops1 = random_ops(state, 1, rng)
+            writer.end_round(ops0, ops1)
+            state.simulate_next_round()
+        writer.close(state)
+    return snapshots
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "game.awr")
+    snapshots = write_game(path)
+    with ReplayReader(path) as reader:
+        # 关闭时写入的最后一个关键帧是结束时的局面
+        assert reader.rounds == list(range(len(snapshots) + 1))
+        assert [snapshot(state) for state in reader][:-1] == snapshots
+        for round in random.Random(0).sample(reader.rounds, 10):
+            assert snapshot(reader.state_at(round)) == snapshots[round]
+
+
+@pytest.mark.parametrize("data", [b"", b"AWRP012345", b"AWRP\x01\x00\x01\x00\x10\x00" + bytes(6), b"garbage" * 10])
+def test_bad_files_raise_value_error(tmp_path, data):
+    path = tmp_path / "bad.awr"
+    path.write_bytes(data)
+    fds = open_fds()
+    with pytest.raises(ValueError):
+        with ReplayReader(str(path)) as reader:
+            list(reader)
+    assert open_fds() == fds
+
+
+def test_header_only_file_is_empty(tmp_path):
+    path = tmp_path / "empty.awr"
+    path.write_bytes(b"AWRP\x01\x00\x01\x00\x10\x00" + bytes(8))
+    with ReplayReader(str(path)) as reader:
+        assert len(reader) == 0 and list(reader) == []
+
+
+def test_corruption_is_detected(tmp_path):
+    path = tmp_path / "game.awr"
+    write_game(str(path))
+    data = bytearray(path.read_bytes())
+    # 破坏靠后的一段记录，索引保持完好
+    rng = random.Random(1)
+    for i in rng.sample(range(len(data) // 2, len(data) - 200), 40):
+        data[i] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with ReplayReader(str(path)) as reader:
+        with pytest.raises(ValueError):
+            list(reader)
@@ -0,0 +1,55 @@
+import random
+import time
+
+from antwar.rollout import RolloutEvaluator, hp_difference
+
+from ._util import new_state, play
+
+
+def random_policy(my_seat, state):
+    random.random()
+    return []
+
+
+def test_serial_evaluation_keeps_caller_random_state():
+    state = play(new_state(11), 10, seed=20)
+    random.seed(1234)
+    expected = random.Random(1234).random()
+    with RolloutEvaluator(random_policy, hp_difference, max_workers=0) as evaluator:
+        results = evaluator.evaluate(state, 0, [[], []], horizon=3, rollouts_per_candidate=2)
+    assert [r.rollouts for r in results] == [2, 2]
+    assert random.random() == expected
+
+
+def random_build_policy(my_seat, state):
+    ops = [op for op in state.legal_operations(my_seat) if random.random() < 0.05]
+    return ops[:1]
+
+
+def slow_policy(my_seat, state):
+    time.sleep(0.02)
+    return []
+
+
+def test_pool_matches_serial():
+    state = play(new_state(12), 20, seed=21)
+    candidates = [[]] + [[op] for op in state.legal_operations(0)][:5]
+    kwargs = dict(horizon=6, rollouts_per_candidate=5, chunk_size=2, seed=7)
+    with RolloutEvaluator(random_build_policy, hp_difference, max_workers=0) as evaluator:
+        serial = evaluator.evaluate(state, 0, candidates, **kwargs)
+    with RolloutEvaluator(random_build_policy, hp_difference, max_workers=2) as evaluator:
+        pooled = evaluator.evaluate(state, 0, candidates, **kwargs)
+    assert serial == pooled
+    assert all(r.rollouts == 5 for r in serial)
+
+
+def test_late_rollouts_do_not_delay_next_evaluation():
+    state = play(new_state(13), 10, seed=22)
+    with RolloutEvaluator(slow_policy, hp_difference, max_workers=2) as evaluator:
+        evaluator.evaluate(state, 0, [[]], horizon=2)  # 预热工作进程
+        # 一次完整推演约需4秒，截止后工作进程应当很快放弃
+        start = time.time()
+        evaluator.evaluate(state, 0, [[], []], horizon=100, time_budget=0.2)
+        results = evaluator.evaluate(state, 0, [[]], horizon=2, time_budget=5)
+        assert results[0].rollouts == 1
+        assert time.time() - start < 2
@@ -0,0 +1,46 @@
+import random
+
+from ._util import new_state, play, random_ops
+
+
+def full_key(state):
+    fork = state.fork()
+    fork.invalidate_state_key()
+    return fork.state_key()
+
+
+def test_incremental_key_matches_full_recompute():
+    state = new_state(8)
+    state.state_key()
+    rng = random.Random(14)
+    for _ in range(80):
+        random_ops(state, 0, rng)
+        random_ops(state, 1, rng)
+        assert state.state_key() == full_key(state)
+        state.simulate_next_round()
+        assert state.state_key() == full_key(state)
+
+
+def test_key_after_fork_and_rollback():
+    state = play(new_state(9), 30, seed=15)
+    key = state.state_key()
+    fork = state.fork()
+    cp = fork.checkpoint()
+    play(fork, 10, seed=16)
+    assert fork.state_key() == full_key(fork)
+    fork.rollback(cp)
+    assert fork.state_key() == key == full_key(fork)
+    play(fork, 10, seed=17)
+    assert fork.state_key() == full_key(fork)
+    assert state.state_key() == key
+
+
+def test_equal_states_have_equal_keys():
+    a = play(new_state(10), 25, seed=18)
+    b = play(new_state(10), 25, seed=18)
+    a.state_key()
+    play(a, 5, seed=19)
+    play(b, 5, seed=19)
+    assert a.state_key() == b.state_key()
+    b.simulate_next_round()
+    assert a.state_key() != b.state_key()
@@ -0,0 +1,46 @@
+import random
+
+from antwar.gamedata import AntState
+from antwar.protocol import RoundInfo, decode_ants, decode_towers
+
+from ._util import new_state, random_ops
+
+
+def round_info_lines(state, rng):
+    # 与评测机回合信息中防御塔和蚂蚁各行相同的格式，行的顺序打乱
+    towers = [f"{t.id} {t.player} {t.coord.x} {t.coord.y} {int(t.type)} {t.cd}\n" for t in state.towers]
+    ants = [
+        f"{a.id} {a.player} {a.coord.x} {a.coord.y} {a.hp} {a.level} {a.age} {int(a.state)}\n"
+        for a in state.ants
+    ]
+    rng.shuffle(towers)
+    rng.shuffle(ants)
+    return "".join(towers).encode(), "".join(ants).encode()
+
+
+def test_round_info_digest_matches_simulated_state():
+    state = new_state(12)
+    rng = random.Random(21)
+    for _ in range(120):
+        random_ops(state, 0, rng)
+        random_ops(state, 1, rng)
+        state.simulate_next_round()
+        # 结算结束时冰冻的蚂蚁已经恢复为存活，回合信息中的蚂蚁同样只有存活状态
+        assert all(ant.state == AntState.ALIVE for ant in state.ants)
+
+        raw_towers, raw_ants = round_info_lines(state, rng)
+        coin, hp = tuple(state.coin), tuple(state.hp)
+        lazy = RoundInfo.from_raw(state.round, raw_towers, raw_ants, coin, hp)
+        parsed = RoundInfo(
+            state.round,
+            decode_towers([int(v) for v in raw_towers.split()]),
+            decode_ants([int(v) for v in raw_ants.split()]),
+            coin,
+            hp,
+        )
+        assert lazy.digest() == parsed.digest() == state.round_digest()
+        assert state.diff_round_info(parsed) == []
+
+    assert state.towers and state.ants
+    tampered = RoundInfo.from_raw(state.round, *round_info_lines(state, rng), tuple(state.coin), (0, 0))
+    assert tampered.digest() != state.round_digest()
@@ -0,0 +1,24 @@
+from antwar.tournament import GameSpec, load_results, run_tournament, standings
+
+
+def idle(my_seat, state):
+    return []
+
+
+def test_failing_game_is_recorded_and_skipped(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    games = [GameSpec("a", "missing", 1), GameSpec("a", "b", 1), GameSpec("b", "a", 1)]
+    bots = {"a": idle, "b": idle}
+    records = run_tournament(bots, games, path, max_workers=0, max_round=5)
+    assert len(records) == 3
+    crashed = [r for r in records if r["reason"] == "crash"]
+    assert [r["key"] for r in crashed] == ["a|missing|1"]
+    assert "KeyError" in crashed[0]["error"]
+    assert [s.games for s in standings(records)] == [2, 2]
+
+    # 再次运行时跳过已经记录的对局，指定 retry_crashed 时重新进行出错的对局
+    assert len(run_tournament(bots, games, path, max_workers=0, max_round=5)) == 3
+    bots["missing"] = idle
+    records = run_tournament(bots, games, path, max_workers=0, max_round=5, retry_crashed=True)
+    assert len(records) == 4 == len(load_results(path))
+    assert records[-1]["key"] == "a|missing|1" and records[-1]["reason"] == "max_round"